@@ -0,0 +1,111 @@
+"""
+Memory and CPU cost of cache serializers for opengraph and structured data payloads
+
+Builds payloads of 10k synthetic pages, shaped like OpenGraphPageProvider and HierarchyBreadcrumbsStructuredDataProvider
+output, and measures the size of values as the backend stores them (pickled) and encode/decode time of every
+serializer against the current format - backend's own pickle of raw data.
+
+Usage (from repository root): python -m benchmarks.cache_serialization
+"""
+import os
+import pickle
+import time
+
+from typing import Any, Callable, List, Optional, Tuple
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+django.setup()
+
+from commontail.models.cache import CacheSerializer, JSONCacheSerializer, MarshalCacheSerializer, \
+    PickleCacheSerializer, ZlibCacheSerializer  # noqa: E402
+
+
+PAGES: int = 10000
+
+BREADCRUMB_ITEM: str = '''
+                    {{
+                        "@type": "ListItem",
+                        "position": {position},
+                        "item": {{
+                            "@id": "https://www.example.com/{path}/",
+                            "name": "{title}"
+                        }}
+                    }}'''
+
+
+def make_opengraph_data(i: int) -> List[Tuple[str, Any]]:
+    return [
+        ('og:type', 'article'),
+        ('og:title', f'Page number {i}: a reasonably long title of a news article'),
+        ('og:image', f'https://www.example.com/media/original_images/image_{i}.jpg'),
+        ('og:image:width', 1200),
+        ('og:image:height', 630),
+        ('og:image:type', 'image/jpeg'),
+        ('og:url', f'https://www.example.com/news/2021/06/page-{i}/'),
+        ('og:description', f'Description of page {i}, which is usually one or two sentences of plain text long. ' * 2),
+        ('og:locale', 'en_US'),
+        ('og:site_name', 'Example site'),
+        ('article:published_time', '2021-06-14'),
+    ]
+
+
+def make_structured_data(i: int) -> str:
+    items: List[str] = [
+        BREADCRUMB_ITEM.format(position=n + 1, path='/'.join(['section', 'subsection', f'page-{i}'][:n + 1]),
+                               title=title)
+        for n, title in enumerate(['Section', 'Subsection', f'Page number {i}'])
+    ]
+
+    return f'''
+    <script type="application/ld+json">
+        {{
+            "@context": "https://schema.org",
+            "@type": "BreadcrumbList",
+            "itemListElement": [{','.join(items)}
+            ]
+        }}
+    </script>
+'''
+
+
+def measure(payloads: List[Any], serializer: Optional[CacheSerializer]) -> Tuple[int, float, float]:
+    encode: Callable[[Any], Any] = serializer.encode if serializer else (lambda d: d)
+    decode: Callable[[Any], Any] = serializer.decode if serializer else (lambda v: v)
+
+    start: float = time.perf_counter()
+    stored: List[bytes] = [pickle.dumps(encode(p), pickle.HIGHEST_PROTOCOL) for p in payloads]  # as backend does
+    encoded: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for value in stored:
+        decode(pickle.loads(value))
+    decoded: float = time.perf_counter() - start
+
+    return sum(len(v) for v in stored), encoded, decoded
+
+
+if __name__ == '__main__':
+    serializers: List[Tuple[str, Optional[CacheSerializer]]] = [
+        ('backend pickle', None),
+        ('pickle', PickleCacheSerializer()),
+        ('marshal', MarshalCacheSerializer()),
+        ('json', JSONCacheSerializer()),
+        ('zlib+pickle', ZlibCacheSerializer(PickleCacheSerializer())),
+        ('zlib+marshal', ZlibCacheSerializer(MarshalCacheSerializer())),
+        ('zlib+json', ZlibCacheSerializer(JSONCacheSerializer())),
+        ('zlib(1024)+marshal', ZlibCacheSerializer(MarshalCacheSerializer(), threshold=1024)),
+    ]
+
+    for title, payloads in (
+        ('opengraph', [make_opengraph_data(i) for i in range(PAGES)]),
+        ('structured data', [make_structured_data(i) for i in range(PAGES)]),
+    ):
+        print(f'{title}, {PAGES} pages:')
+        baseline: Optional[int] = None
+        for name, serializer in serializers:
+            size, encoded, decoded = measure(payloads, serializer)
+            baseline = baseline or size
+            print(f'{name:>18}: {size / 1024:9.1f} KiB ({size / baseline * 100:5.1f}%), '
+                  f'encode {encoded * 1000:7.1f} ms, decode {decoded * 1000:7.1f} ms')
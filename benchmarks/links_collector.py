@@ -0,0 +1,98 @@
+"""
+Query and row counts of PageLinksCollector on a synthetic tree
+
+Creates a test database with a section of SECTIONS subsections, each with PAGES pages, where every page but the section
+has LINKS links, and measures get_linked_pages of the section (with descendants) and of the deepest page (with
+ancestors, and from InheritedPageLink table) for different counts. Rows are counted as instantiated links and pages,
+targets of links excluded.
+
+Usage (from repository root): python -m benchmarks.links_collector
+"""
+import os
+
+from typing import Any, Callable, List
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.db.models.signals import post_init  # noqa: E402
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment  # noqa: E402
+
+from wagtail.core.models import Page, Site  # noqa: E402
+
+from commontail.models import InheritedPageLink, PageLinkCategory, PageLinkCategoryGroup  # noqa: E402
+from tests.models import LinksPage, LinksPageLink  # noqa: E402
+
+
+SECTIONS: int = 20
+PAGES: int = 50
+LINKS: int = 5
+
+
+def build_tree() -> List[LinksPage]:
+    PageLinkCategoryGroup.objects.create(title='All', handle='all')
+    category: PageLinkCategory = PageLinkCategory.objects.create(title='Related')
+    home: Page = Site.objects.get(is_default_site=True).root_page
+    targets: List[Page] = [home.add_child(instance=Page(title=f'Target {i}', slug=f'target-{i}')) for i in range(100)]
+
+    section: LinksPage = home.add_child(instance=LinksPage(title='Section', slug='section'))
+    pages: List[LinksPage] = [section]
+    links: List[LinksPageLink] = []
+    for s in range(SECTIONS):
+        subsection: LinksPage = section.add_child(instance=LinksPage(title=f'Subsection {s}', slug=f'subsection-{s}'))
+        pages.append(subsection)
+        for p in range(PAGES):
+            pages.append(subsection.add_child(instance=LinksPage(title=f'Page {s}.{p}', slug=f'page-{s}-{p}')))
+    for n, page in enumerate(pages[1:]):  # links of the section are collected from descendants only
+        links.extend(
+            LinksPageLink(page=page, target=targets[(n * LINKS + i) % len(targets)], category=category, sort_order=i)
+            for i in range(LINKS)
+        )
+    LinksPageLink.objects.bulk_create(links)
+
+    return pages
+
+
+def measure(title: str, callable_: Callable[[], Any]) -> None:
+    rows: List[int] = [0, 0]
+
+    def count_rows(sender, **kwargs):
+        if sender is LinksPageLink:
+            rows[0] += 1
+        elif issubclass(sender, LinksPage):
+            rows[1] += 1
+
+    connection.queries_log.clear()  # the log is limited - building the tree fills it
+    post_init.connect(count_rows)
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            result: Any = callable_()
+    finally:
+        post_init.disconnect(count_rows)
+
+    print(f'{title:>40}: {len(result):3} links, {len(queries):4} queries, {rows[0]:5} link rows, {rows[1]:5} page rows')
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name: str = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        pages: List[LinksPage] = build_tree()
+        section: LinksPage = pages[0]
+        deepest: LinksPage = pages[-1]
+        print(f'{len(pages)} pages, {LinksPageLink.objects.count()} links:')
+        for count in (5, 20, None):
+            measure(f'section, descendants, count={count}',
+                    lambda: section.get_linked_pages(count=count, include_descendants=True))
+        for count in (5, 20, None):
+            measure(f'deepest page, ancestors, count={count}', lambda: deepest.get_linked_pages(count=count))
+        InheritedPageLink.rebuild()
+        with override_settings(COMMONTAIL_PAGE_LINKS_MATERIALIZED=True):
+            for count in (5, 20, None):
+                measure(f'deepest page, materialized, count={count}', lambda: deepest.get_linked_pages(count=count))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -5,6 +5,7 @@ class CommonConfig(AppConfig):
     name = 'commontail'
 
     def ready(self):
-        from commontail.signals import register_cache_aware_signal_handlers
+        from commontail.signals import register_cache_aware_signal_handlers, register_page_links_signal_handlers
 
         register_cache_aware_signal_handlers()
+        register_page_links_signal_handlers()
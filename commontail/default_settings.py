@@ -1,4 +1,21 @@
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+COMMONTAIL_CACHE_BULK_CHUNK_SIZE: int = 1000
+COMMONTAIL_CACHE_CIRCUIT_BREAKER_COOLDOWN: float = 30
+COMMONTAIL_CACHE_CIRCUIT_BREAKER_FAILURES: Optional[int] = 5
+COMMONTAIL_CACHE_CIRCUIT_BREAKER_SLOW_CALL: Optional[float] = 0.5
+COMMONTAIL_CACHE_DEPENDENCY_ALIAS: str = 'default'
+COMMONTAIL_CACHE_DEPENDENCY_INDEX_MAX_KEYS: int = 1000
+COMMONTAIL_CACHE_DEPENDENCY_MODELS: List[str] = ['wagtailcore.Site', 'commontail.CommonSettings', ]
+COMMONTAIL_CACHE_GENERATION_ALIAS: str = 'default'
+COMMONTAIL_CACHE_LOCAL_MAX_ENTRIES: int = 1000
+COMMONTAIL_CACHE_LOCK_POLL_INTERVAL: float = 0.05
+COMMONTAIL_CACHE_METRICS_ALIAS: str = 'default'
+COMMONTAIL_CACHE_METRICS_SINK: Optional[str] = 'commontail.models.cache.InMemoryCacheMetricsSink'
+COMMONTAIL_CACHE_PAYLOAD_SAMPLE_RATE: float = 0.01
+COMMONTAIL_CACHE_REFRESH_WORKERS: int = 4
+COMMONTAIL_CACHE_SHARD_GROUPS: Dict[str, List[str]] = {}
+COMMONTAIL_CACHE_SHARD_VIRTUAL_NODES: int = 160
 
 COMMONTAIL_CONTENT_STREAM_PAGE_BODY_BLOCK: str = 'commontail.blocks.ContentStreamBlock'
 
@@ -12,8 +29,17 @@ COMMONTAIL_NAMED_URL_SUPPRESS_NOT_FOUND_EXCEPTION: bool = False
 COMMONTAIL_NO_IMAGE_PLACEHOLDER_TITLE: str = '__IMAGE_LATER__'
 
 COMMONTAIL_OPENGRAPH_CACHE_LIFETIME: int = 86400
+COMMONTAIL_OPENGRAPH_CACHE_LIFETIME_JITTER: Optional[float] = None
+COMMONTAIL_OPENGRAPH_CACHE_SERIALIZER: Optional[str] = None
+COMMONTAIL_OPENGRAPH_CACHE_SOFT_LIFETIME: Optional[int] = None
 
+COMMONTAIL_PAGE_LINKS_CACHE_ALIAS: str = 'default'
+COMMONTAIL_PAGE_LINKS_CACHE_LIFETIME: Optional[int] = 3600
 COMMONTAIL_PAGE_LINKS_CATEGORIES_GROUP_DEFAULT_HANDLE: str = 'all'
+COMMONTAIL_PAGE_LINKS_MATERIALIZED: bool = False
+COMMONTAIL_PAGE_LINKS_MATERIALIZED_ANCESTORS_DEPTH: Optional[int] = 3
+COMMONTAIL_PAGE_LINKS_MATERIALIZED_CHUNK_SIZE: int = 500
+COMMONTAIL_PAGE_LINKS_MATERIALIZED_SYNC_LIMIT: Optional[int] = 1000
 COMMONTAIL_PAGE_LINKS_RELATION_NAME: str = 'page_links'
 
 COMMONTAIL_PAGINATION_NEIGHBOURS_COUNT: int = 2
@@ -31,3 +57,6 @@ COMMONTAIL_SITEMAP_DEFAULTS: Tuple[str, float] = ('weekly', 0.5)
 COMMONTAIL_SOCIAL_LINKS_OPEN_IN_NEW_WINDOW: bool = True
 
 COMMONTAIL_STRUCTURED_DATA_CACHE_LIFETIME: int = 86400
+COMMONTAIL_STRUCTURED_DATA_CACHE_LIFETIME_JITTER: Optional[float] = None
+COMMONTAIL_STRUCTURED_DATA_CACHE_SERIALIZER: Optional[str] = None
+COMMONTAIL_STRUCTURED_DATA_CACHE_SOFT_LIFETIME: Optional[int] = None
@@ -0,0 +1,60 @@
+from typing import Dict, Tuple, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from commontail.models.cache import CacheHistogram, CacheMetricLabels, CacheMetricsSink, get_cache_metrics_sink, \
+    render_cache_metrics
+
+
+class Command(BaseCommand):
+    help = 'Prints cache metrics of AbstractCacheAware instances. In-memory sink has only metrics of current ' \
+           'process - use a shared one (e.g. CacheBackendMetricsSink) to see metrics of running servers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['table', 'prometheus'], default='table', help='output format')
+        parser.add_argument('--reset', action='store_true', help='reset metrics after printing them')
+
+    def handle(self, *args, **options):
+        sink: CacheMetricsSink = get_cache_metrics_sink()
+        if sink is None:
+            raise CommandError('Cache metrics are disabled - set COMMONTAIL_CACHE_METRICS_SINK to enable them.')
+
+        if options['format'] == 'prometheus':
+            self.stdout.write(render_cache_metrics(sink), ending='')
+        else:
+            self._write_table(*sink.get_metrics())
+
+        if options['reset']:
+            sink.reset()
+
+    def _write_table(self, counters: Dict[Tuple[CacheMetricLabels, str], int],
+                     histograms: Dict[Tuple[CacheMetricLabels, str], CacheHistogram]):
+        series: List[CacheMetricLabels] = sorted({labels for labels, _ in list(counters) + list(histograms)})
+        if not series:
+            self.stdout.write('No cache metrics collected.')
+            return
+
+        def mean(labels: CacheMetricLabels, name: str, scale: float = 1) -> str:
+            histogram: CacheHistogram = histograms.get((labels, name))
+            if not histogram or not sum(histogram.counts):
+                return '-'
+
+            return f'{histogram.sum / sum(histogram.counts) * scale:.1f}'
+
+        columns: List[str] = ['model', 'suffix', 'alias', 'hits', 'misses', 'hit %', 'invalidations',
+                              'recompute ms', 'set ms', 'payload B']
+        rows: List[List[str]] = [columns]
+        for labels in series:
+            hits: int = counters.get((labels, 'hits'), 0)
+            misses: int = counters.get((labels, 'misses'), 0)
+            rows.append([
+                labels.model, labels.suffix, labels.alias, str(hits), str(misses),
+                f'{hits / (hits + misses) * 100:.1f}' if hits + misses else '-',
+                str(counters.get((labels, 'invalidations'), 0)),
+                mean(labels, 'recompute_seconds', 1000), mean(labels, 'set_seconds', 1000),
+                mean(labels, 'payload_bytes'),
+            ])
+
+        widths: List[int] = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+        for row in rows:
+            self.stdout.write('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wagtail.core.models import Page
+
+from commontail.models import InheritedPageLink
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds materialized inherited links of LinksOwnerPage pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--root', type=int, help='ID of the page, whose subtree is rebuilt')
+        parser.add_argument('--chunk-size', type=int, help='number of pages rebuilt at once')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        path: Optional[str] = None
+        if options['root']:
+            try:
+                path = Page.objects.get(pk=options['root']).path
+            except Page.DoesNotExist as e:
+                raise CommandError(f'Page {options["root"]} doesn\'t exist.') from e
+
+        rebuilt: int = InheritedPageLink.rebuild(path, options['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Inherited links of {rebuilt} pages rebuilt.'))
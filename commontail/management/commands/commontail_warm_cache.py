@@ -0,0 +1,237 @@
+import logging
+import os.path
+
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Deque, Dict, Iterator, List, Optional, Tuple, Type
+
+import django
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import QuerySet
+from django.http import HttpRequest
+
+from wagtail.core.models import Page, Site
+
+from commontail.models.cache import AbstractCacheAwarePage, make_dummy_request
+
+
+logger = logging.getLogger(__name__)
+
+_PKS_BATCH_SIZE: int = 2000
+
+
+def _init_worker() -> None:
+    # processes started with "spawn" don't inherit configured django
+    if not apps.ready:
+        django.setup()
+    # forked ones inherit parent's connections - they're dropped without closing, which would close parent's sockets
+    for connection in connections.all():
+        connection.connection = None
+
+
+def warm_pages(pks: List[int], force: bool = False) -> Tuple[int, int]:
+    """
+    Populates every suffix returned by get_cache_data_callables for pages with given primary keys
+
+    :param pks: pages' primary keys
+    :param force: if True - existing data is recomputed too
+    :return: tuple with numbers of warmed and failed pages
+    """
+    requests: Dict[int, HttpRequest] = dict()
+    warmed: int = 0
+    failed: int = 0
+
+    for page in Page.objects.filter(pk__in=pks).specific():
+        try:
+            site: Optional[Site] = page.get_site()
+            site_id: Optional[int] = site.pk if site else None
+            if site_id not in requests:
+                # one synthetic request per site - data shouldn't depend on the page's own URL
+                requests[site_id] = make_dummy_request(site.root_page if site else page)
+            if force:
+                page.refresh_cache(requests[site_id])
+            else:
+                for suffix, data_callable in page.get_cache_data_callables(requests[site_id]).items():
+                    page.get_or_set_cache_data(suffix, data_callable)
+            warmed += 1
+        except Exception:
+            logger.exception(f'Cache warm-up of page {page.pk} failed.')
+            failed += 1
+
+    return warmed, failed
+
+
+def _warm_pages_in_thread(pks: List[int], force: bool = False) -> Tuple[int, int]:
+    try:
+        return warm_pages(pks, force)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Populates cache of live AbstractCacheAwarePage pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', help='hostname or ID of the site to warm up')
+        parser.add_argument('--root', type=int, help='ID of the page, whose subtree is warmed up')
+        parser.add_argument('--content-type', action='append', dest='content_types', default=[],
+                            help='"app_label.model" of pages to warm up, may be repeated')
+        parser.add_argument('--workers', type=int, default=1, help='number of workers')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread', help='type of workers\' pool')
+        parser.add_argument('--chunk-size', type=int, default=100, help='number of pages passed to a worker at once')
+        parser.add_argument('--checkpoint', help='file with ID of the last warmed page, used to resume interrupted '
+                                                 'runs - delete it to start from the beginning')
+        parser.add_argument('--force', action='store_true', help='recompute data which is already cached')
+
+    def _get_model_classes(self, content_types: List[str]) -> List[Type[AbstractCacheAwarePage]]:
+        model_classes: List[Type[AbstractCacheAwarePage]] = [
+            m for m in apps.get_models() if issubclass(m, AbstractCacheAwarePage)
+        ]
+        if not content_types:
+            return model_classes
+
+        selected: List[Type[AbstractCacheAwarePage]] = []
+        for label in content_types:
+            try:
+                model_class = apps.get_model(label)
+            except (LookupError, ValueError) as e:
+                raise CommandError(f'Unknown content type "{label}".') from e
+            if model_class not in model_classes:
+                raise CommandError(f'"{label}" isn\'t a subclass of AbstractCacheAwarePage.')
+            selected.append(model_class)
+
+        return selected
+
+    def _get_queryset(self, options) -> QuerySet:
+        queryset: QuerySet = Page.objects.live().filter(
+            content_type__in=ContentType.objects.get_for_models(
+                *self._get_model_classes(options['content_types'])
+            ).values()
+        )
+
+        if options['site']:
+            site_lookup: Dict[str, str] = {'pk': options['site']} if options['site'].isdigit() \
+                else {'hostname': options['site']}
+            try:
+                queryset = queryset.descendant_of(Site.objects.get(**site_lookup).root_page, inclusive=True)
+            except Site.DoesNotExist as e:
+                raise CommandError(f'Site "{options["site"]}" doesn\'t exist.') from e
+
+        if options['root']:
+            try:
+                queryset = queryset.descendant_of(Page.objects.get(pk=options['root']), inclusive=True)
+            except Page.DoesNotExist as e:
+                raise CommandError(f'Page {options["root"]} doesn\'t exist.') from e
+
+        return queryset.order_by('pk')
+
+    @staticmethod
+    def _get_chunks(queryset: QuerySet, chunk_size: int, close_connections: bool = False) -> Iterator[List[int]]:
+        batch_size: int = max(chunk_size, _PKS_BATCH_SIZE)
+        if close_connections:
+            # process workers are forked at submits, which happen while chunks are consumed - an open cursor wouldn't
+            # survive that, so pks are read in batches by keyset and connections are closed before chunks are yielded
+            pks: Iterator[int] = Command._iterate_pks_closing_connections(queryset, batch_size)
+        else:
+            pks = queryset.values_list('pk', flat=True).iterator(chunk_size=batch_size)
+
+        chunk: List[int] = []
+        for pk in pks:
+            chunk.append(pk)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _iterate_pks_closing_connections(queryset: QuerySet, batch_size: int) -> Iterator[int]:
+        last: Optional[int] = None
+        while True:
+            batch: List[int] = list(
+                (queryset if last is None else queryset.filter(pk__gt=last)).values_list('pk', flat=True)[:batch_size]
+            )
+            connections.close_all()
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            last = batch[-1]
+
+    @staticmethod
+    def _read_checkpoint(path: Optional[str]) -> Optional[int]:
+        if not path or not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            content: str = f.read().strip()
+
+        return int(content) if content else None
+
+    @staticmethod
+    def _write_checkpoint(path: str, pk: int) -> None:
+        temporary: str = f'{path}.tmp'
+        with open(temporary, 'w') as f:
+            f.write(str(pk))
+        os.replace(temporary, path)
+
+    @staticmethod
+    def _warm_chunks(chunks: Iterator[List[int]], executor: Optional[Executor],
+                     options) -> Iterator[Tuple[List[int], Tuple[int, int]]]:
+        if executor is None:
+            for chunk in chunks:
+                yield chunk, warm_pages(chunk, options['force'])
+            return
+
+        # results are returned in order, so the checkpoint never skips unfinished chunks. Number of submitted chunks
+        # is limited - page IDs of the whole site aren't loaded at once.
+        pending: Deque[Tuple[List[int], Future]] = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(
+                _warm_pages_in_thread if isinstance(executor, ThreadPoolExecutor) else warm_pages,
+                chunk, options['force']
+            )))
+            if len(pending) >= options['workers'] * 2:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers and --chunk-size must be positive.')
+
+        queryset: QuerySet = self._get_queryset(options)
+        checkpoint: Optional[int] = self._read_checkpoint(options['checkpoint'])
+        if checkpoint is not None:
+            queryset = queryset.filter(pk__gt=checkpoint)
+            self.stdout.write(f'Resuming after page {checkpoint}.')
+
+        total: int = queryset.count()
+        processes: bool = options['workers'] > 1 and options['pool'] == 'process'
+        chunks: Iterator[List[int]] = self._get_chunks(queryset, options['chunk_size'], close_connections=processes)
+        executor: Optional[Executor] = None
+        if options['workers'] > 1:
+            if processes:
+                executor = ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker)
+            else:
+                executor = ThreadPoolExecutor(max_workers=options['workers'])
+
+        done: int = 0
+        failed: int = 0
+        try:
+            for chunk, (chunk_warmed, chunk_failed) in self._warm_chunks(chunks, executor, options):
+                done += chunk_warmed + chunk_failed
+                failed += chunk_failed
+                if options['checkpoint']:
+                    self._write_checkpoint(options['checkpoint'], chunk[-1])
+                self.stdout.write(f'{done}/{total} pages processed, {failed} failed.')
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'Cache of {done - failed} pages warmed up.'))
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0062_comment_models_and_pagesubscription'),
+        ('commontail', '0002_links_and_named_references'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InheritedPageLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sort_order', models.IntegerField(verbose_name='sort order')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='commontail.pagelinkcategory', verbose_name='category')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='commontail.pagelinkcategorygroup', verbose_name='group')),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.page', verbose_name='page')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.page', verbose_name='target page')),
+            ],
+            options={
+                'verbose_name': 'inherited page-to-page link',
+                'verbose_name_plural': 'inherited page-to-page links',
+                'ordering': ['sort_order'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inheritedpagelink',
+            index=models.Index(fields=['page', 'group', 'sort_order'], name='commontail__page_id_e15631_idx'),
+        ),
+    ]
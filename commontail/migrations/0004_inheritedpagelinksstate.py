@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0062_comment_models_and_pagesubscription'),
+        ('commontail', '0003_inheritedpagelink'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InheritedPageLinksState',
+            fields=[
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='wagtailcore.page', verbose_name='page')),
+                ('live', models.BooleanField(verbose_name='live')),
+                ('links_hash', models.CharField(max_length=32, verbose_name='hash of own links')),
+            ],
+            options={
+                'verbose_name': 'inherited page-to-page links state',
+                'verbose_name_plural': 'inherited page-to-page links states',
+            },
+        ),
+    ]
@@ -1,16 +1,600 @@
-from collections import namedtuple, UserDict
-from typing import Dict, List, Any, Callable
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import marshal
+import pickle
+import random
+import sys
+import threading
+import time
+import zlib
 
+from collections import Counter, namedtuple, OrderedDict, UserDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+from io import StringIO
+from typing import Dict, FrozenSet, List, Any, Callable, Optional, Iterable, Tuple, Set, Iterator, Union
+from urllib.parse import ParseResult, urlparse
+from uuid import uuid4
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.core.cache import caches, BaseCache
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections, models
+from django.db.models import QuerySet
+from django.http import HttpRequest
+from django.utils.module_loading import import_string
+
+from wagtail.core.models import COMMENTS_RELATION_NAME, Page, Site
+
+
+__all__ = ['CACHED_NONE', 'CACHE_METRIC_BUCKETS', 'CacheEnvelope', 'CacheHistogram', 'CacheMetricLabels',
+           'CacheSuffixMeta', 'UnknownCacheSuffixException', 'CacheSuffixDict', 'CacheInvalidationBatch',
+           'CacheSerializer', 'CacheShardRing', 'CacheCircuitBreaker', 'CacheMetricsSink', 'CacheBackendMetricsSink',
+           'InMemoryCacheMetricsSink', 'JSONCacheSerializer', 'MarshalCacheSerializer', 'PickleCacheSerializer',
+           'ZlibCacheSerializer', 'LocalCache', 'add_cache_dependencies', 'call_cache', 'collect_cache_dependencies',
+           'compressed_marshal_serializer', 'compressed_pickle_serializer', 'get_cache_dependency_generation_key',
+           'get_cache_dependency_key', 'get_cache_alias', 'get_cache_circuit_breaker', 'get_cache_dependency_token',
+           'get_cache_generations',
+           'get_cache_metrics_sink', 'get_cache_serializer', 'get_cache_refresh_executor', 'get_local_cache',
+           'increment_cache_generation', 'make_dummy_request', 'register_cache_dependency', 'render_cache_metrics',
+           'AbstractCacheAware', 'AbstractCacheAwarePage', ]
+
+
+logger = logging.getLogger(__name__)
+
+
+class _CachedNone:
+    """
+    Marks data which was computed and turned out to be None, as opposed to missing data
+    """
+
+    def __reduce__(self):
+        return 'CACHED_NONE'  # unpickles to the module-level singleton
+
+    def __repr__(self):
+        return 'CACHED_NONE'
+
+
+CACHED_NONE: _CachedNone = _CachedNone()
+
+CacheEnvelope = namedtuple('CacheEnvelope', ['data', 'soft_expires'])
+
+CacheSuffixMeta = namedtuple('CacheSuffixMeta', ['alias', 'lifetime', 'single_flight', 'lock_timeout', 'lock_wait',
+                                                 'soft_lifetime', 'local_lifetime', 'negative_lifetime',
+                                                 'lifetime_jitter', 'serializer', 'dependency_models'],
+                             defaults=(False, 30, 5.0, None, None, None, None, None, None))
+CacheSuffixMeta.__doc__ = """
+Cache settings of a single suffix
+
+:param alias: cache alias
+:param lifetime: cache entry lifetime in seconds
+:param single_flight: if True - only one worker recomputes missing data, others wait for its result
+:param lock_timeout: lifetime of a single-flight lock in seconds, limits the time lock can be held by failed worker
+:param lock_wait: maximum time in seconds to wait for other worker's result before computing data directly
+:param soft_lifetime: if set - entries older than this number of seconds are still returned, but refreshed in
+    background (stale-while-revalidate)
+:param local_lifetime: if set - entries are also kept in process memory for this number of seconds, may be used only
+    by classes with cache_versioned set to True and should be much shorter than lifetime, because other processes'
+    dependency invalidations can't reach this copy (see LocalCache). Class's generation counters are kept in process
+    memory for the shortest local_lifetime of its suffixes too, so other processes' invalidations are seen with this
+    delay
+:param negative_lifetime: lifetime of None results in seconds, lifetime is used if not set and 0 disables caching of
+    None results
+:param lifetime_jitter: if set - lifetime of every key is shortened by up to this fraction of it, so entries stored
+    at the same time don't expire at the same time. The shortening is derived from the key, so it's the same in every
+    process
+:param serializer: if set - CacheSerializer used to store data instead of backend's own serialization
+:param dependency_models: labels of models, changes of which invalidate every entry of the suffix. Their generation
+    counters are included in keys instead of adding every key to dependency indexes - it's meant for dependencies
+    shared by most of entries, like Site or settings, indexes of which would be too big
+"""
+
+
+class CacheSerializer:
+    """
+    Converts suffix's data to bytes stored in cache instead of letting the backend pickle it
+
+    Stored bytes start with a tag made of serializer's name and version - data with another tag is treated as missing,
+    so changing the format of a suffix doesn't require flushing the cache. Increment version when dumps output changes.
+    """
+
+    name: str = ''
+    version: int = 1
+
+    def decode(self, value: Any) -> Any:
+        """
+        Restores data from stored value
+
+        :param value: stored value
+        :return: data
+        :raises ValueError: if value wasn't encoded by this serializer
+        """
+        tag: bytes = self.get_tag()
+        if not isinstance(value, bytes) or not value.startswith(tag):
+            raise ValueError(f'Cache value wasn\'t encoded by "{self.name}" serializer version {self.version}.')
+
+        return self.loads(value[len(tag):])
+
+    def dumps(self, data: Any) -> bytes:
+        raise NotImplementedError
+
+    def encode(self, data: Any) -> bytes:
+        return self.get_tag() + self.dumps(data)
+
+    def get_tag(self) -> bytes:
+        return f'{self.name}.{self.version}:'.encode()
+
+    def loads(self, payload: bytes) -> Any:
+        raise NotImplementedError
+
+
+class PickleCacheSerializer(CacheSerializer):
+
+    name: str = 'pickle'
+
+    def dumps(self, data: Any) -> bytes:
+        return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, payload: bytes) -> Any:
+        return pickle.loads(payload)
+
+
+class MarshalCacheSerializer(CacheSerializer):
+    """
+    Fastest and most compact format for data made of builtin types only, e.g. opengraph data
+
+    Marshal format may change between python versions, so it's a part of the tag.
+    """
+
+    name: str = f'marshal-py{sys.version_info[0]}{sys.version_info[1]}'
+
+    def dumps(self, data: Any) -> bytes:
+        return marshal.dumps(data)
+
+    def loads(self, payload: bytes) -> Any:
+        return marshal.loads(payload)
+
+
+class JSONCacheSerializer(CacheSerializer):
+    """
+    Portable format, readable by other languages - tuples are restored as lists, str subclasses as str
+    """
+
+    name: str = 'json'
+
+    def dumps(self, data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+    def loads(self, payload: bytes) -> Any:
+        return json.loads(payload)
+
+
+class ZlibCacheSerializer(CacheSerializer):
+    """
+    Compresses output of another serializer if it's longer than threshold
+    """
+
+    def __init__(self, serializer: Optional[CacheSerializer] = None, threshold: int = 256, level: int = 6):
+        self.serializer: CacheSerializer = serializer or PickleCacheSerializer()
+        self.threshold: int = threshold
+        self.level: int = level
+        self.name: str = f'zlib-{self.serializer.name}'
+        self.version: int = self.serializer.version
+
+    def dumps(self, data: Any) -> bytes:
+        payload: bytes = self.serializer.dumps(data)
+        if len(payload) <= self.threshold:
+            return b'r' + payload
+
+        return b'z' + zlib.compress(payload, self.level)
+
+    def loads(self, payload: bytes) -> Any:
+        return self.serializer.loads(zlib.decompress(payload[1:]) if payload[:1] == b'z' else payload[1:])
+
+
+def get_cache_serializer(path: Optional[str]) -> Optional[CacheSerializer]:
+    """
+    Returns serializer by dotted path to its instance or class, used in settings
+
+    :param path: dotted path or None
+    :return: CacheSerializer or None, meaning backend's own serialization
+    """
+    if not path:
+        return None
+
+    serializer: Any = import_string(path)
+
+    return serializer() if isinstance(serializer, type) else serializer
+
+
+compressed_marshal_serializer: CacheSerializer = ZlibCacheSerializer(MarshalCacheSerializer())
+compressed_pickle_serializer: CacheSerializer = ZlibCacheSerializer(PickleCacheSerializer())
+
+
+_CACHE_CALL_FAILED: Any = object()
+
+_LIFETIME_JITTER_STEPS: int = 100
+
+
+_dependencies: ContextVar[Optional[Set[str]]] = ContextVar('commontail_cache_dependencies', default=None)
+
+
+def add_cache_dependencies(alias: str, key: str, tokens: Iterable[str]) -> bool:
+    """
+    Adds cache key to reverse indexes of dependencies - key is deleted when any of them changes
+
+    Every index is limited to COMMONTAIL_CACHE_DEPENDENCY_INDEX_MAX_KEYS keys: oldest keys are dropped from it and
+    aren't invalidated by the dependency anymore. Indexes are updated without locking, so concurrent updates of the
+    same index may lose keys too - lifetime of cache entries limits staleness in both cases. Dependencies shared by lots
+    of entries should be declared in dependency_models of their suffixes instead (see CacheSuffixMeta).
+    :param alias: cache alias of the key
+    :param key: cache key
+    :param tokens: dependency tokens (see get_cache_dependency_token)
+    :return: False if indexes couldn't be updated - the key mustn't be stored then
+    """
+    index_keys: List[str] = [get_cache_dependency_key(t) for t in tokens]
+    if not index_keys:
+        return True
+
+    index_alias: str = settings.COMMONTAIL_CACHE_DEPENDENCY_ALIAS
+    indexes: Optional[Dict[str, List[Tuple[str, str]]]] = call_cache(index_alias, 'get_many', index_keys)
+    if indexes is None:
+        return False  # storing indexes without keys, which couldn't be read, would lose them
+    entry: Tuple[str, str] = (alias, key)
+    max_keys: int = settings.COMMONTAIL_CACHE_DEPENDENCY_INDEX_MAX_KEYS
+
+    for index_key in index_keys:
+        index: List[Tuple[str, str]] = indexes.setdefault(index_key, [])
+        if entry in index:
+            continue
+        index.append(entry)
+        if len(index) > max_keys:
+            del index[:len(index) - max_keys]
+
+    failed_keys: Optional[List[str]] = call_cache(index_alias, 'set_many', indexes, None)
+
+    return failed_keys is not None and not failed_keys
+
+
+async def _run_cache_io(func: Callable, *args) -> Any:
+    # django 3.2 has no async cache API and later versions implement it with sync_to_async anyway - running the whole
+    # sync operation in one thread costs one thread switch instead of one per cache call. Cache calls don't touch the
+    # database, so they don't have to wait for the single thread database queries are executed in.
+    return await sync_to_async(func, thread_sensitive=False)(*args)
+
+
+def _call_in_thread(func: Callable, *args) -> Any:
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def _call_collecting_dependencies(func: Callable, *args) -> Tuple[Any, Set[str]]:
+    with collect_cache_dependencies() as dependencies:
+        data: Any = func(*args)
+
+    return data, dependencies
+
+
+@contextmanager
+def collect_cache_dependencies() -> Iterator[Set[str]]:
+    """
+    Collects dependency tokens registered with register_cache_dependency inside the context
+
+    Dependencies of nested contexts are added to outer ones too.
+    """
+    outer: Optional[Set[str]] = _dependencies.get()
+    collected: Set[str] = set()
+    reset_token = _dependencies.set(collected)
+    try:
+        yield collected
+    finally:
+        _dependencies.reset(reset_token)
+        if outer is not None:
+            outer.update(collected)
+
+
+class CacheCircuitBreaker:
+    """
+    Stops calls to a failing or slow cache alias for a cooldown period
+
+    After COMMONTAIL_CACHE_CIRCUIT_BREAKER_FAILURES consecutive failed calls or calls slower than
+    COMMONTAIL_CACHE_CIRCUIT_BREAKER_SLOW_CALL seconds the breaker opens: calls are skipped, so data is computed
+    directly. After COMMONTAIL_CACHE_CIRCUIT_BREAKER_COOLDOWN seconds it half-opens and lets a single call through to
+    probe the alias - its success closes the breaker, failure opens it again.
+    """
+
+    CLOSED: str = 'closed'
+    OPEN: str = 'open'
+    HALF_OPEN: str = 'half-open'
+
+    def __init__(self, alias: str, failures: Optional[int], slow_call: Optional[float], cooldown: float):
+        self.alias: str = alias
+        self.failures: Optional[int] = failures
+        self.slow_call: Optional[float] = slow_call
+        self.cooldown: float = cooldown
+        self.state: str = self.CLOSED
+        self._errors: int = 0
+        self._opened_at: float = 0.0
+        self._probing: bool = False
+        self._lock: threading.Lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if not self.failures:
+            return True
+
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                logger.info(f'Probing cache "{self.alias}" after cooldown.')
+                return True
+
+        return False
+
+    def record(self, elapsed: Optional[float]) -> None:
+        """
+        Records result of a call
+
+        :param elapsed: duration of successful call in seconds, None for failed one
+        :return: None
+        """
+        if not self.failures:
+            return
+
+        bad: bool = elapsed is None or (self.slow_call is not None and elapsed > self.slow_call)
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if bad:
+                    self._open()
+                    logger.warning(f'Cache "{self.alias}" probe failed, skipping it for {self.cooldown} seconds more.')
+                else:
+                    self.state = self.CLOSED
+                    self._errors = 0
+                    logger.info(f'Cache "{self.alias}" recovered.')
+            elif not bad:
+                self._errors = 0
+            elif self.state == self.CLOSED:
+                self._errors += 1
+                if self._errors >= self.failures:
+                    self._open()
+                    logger.warning(f'Cache "{self.alias}" failed or was slow {self._errors} times in a row, skipping '
+                                   f'it for {self.cooldown} seconds.')
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+
+
+class CacheShardRing:
+    """
+    Consistent hashing ring, which maps cache keys to physical aliases of a shard group
+
+    Every alias is placed on the ring at virtual_nodes points, key belongs to the alias of the first point after key's
+    hash. Adding or removing an alias remaps only keys between its points and previous ones - about 1/N of all keys.
+    """
+
+    def __init__(self, aliases: List[str], virtual_nodes: int):
+        if not aliases:
+            raise ValueError('Shard group must contain at least one cache alias.')
+
+        points: List[Tuple[int, str]] = sorted(
+            (self._hash(f'{alias}#{i}'), alias) for alias in aliases for i in range(virtual_nodes)
+        )
+        self._hashes: List[int] = [h for h, _ in points]
+        self._aliases: List[str] = [a for _, a in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+    def get_alias(self, key: str) -> str:
+        index: int = bisect.bisect(self._hashes, self._hash(key))
+
+        return self._aliases[index % len(self._aliases)]
+
+
+_shard_rings: Dict[str, Tuple[Tuple[Tuple[str, ...], int], CacheShardRing]] = dict()
+
+
+def get_cache_alias(alias: str, key: str) -> str:
+    """
+    Returns physical cache alias for the key
 
-from wagtail.core.models import Page
+    :param alias: cache alias or name of a shard group from COMMONTAIL_CACHE_SHARD_GROUPS
+    :param key: cache key
+    :return: alias itself or group's alias, chosen by consistent hashing of the key
+    """
+    group: Optional[List[str]] = settings.COMMONTAIL_CACHE_SHARD_GROUPS.get(alias)
+    if not group:
+        return alias
 
+    params: Tuple[Tuple[str, ...], int] = (tuple(group), settings.COMMONTAIL_CACHE_SHARD_VIRTUAL_NODES)
+    ring: Optional[Tuple[Tuple[Tuple[str, ...], int], CacheShardRing]] = _shard_rings.get(alias)
+    if ring is None or ring[0] != params:
+        ring = _shard_rings[alias] = (params, CacheShardRing(*params))
 
-__all__ = ['CacheSuffixMeta', 'UnknownCacheSuffixException', 'CacheSuffixDict', 'AbstractCacheAware',
-           'AbstractCacheAwarePage', ]
+    return ring[1].get_alias(key)
 
 
-CacheSuffixMeta = namedtuple('CacheSuffixMeta', ['alias', 'lifetime'])
+_circuit_breakers: Dict[str, CacheCircuitBreaker] = dict()
+_circuit_breakers_lock: threading.Lock = threading.Lock()
+
+
+def get_cache_circuit_breaker(alias: str) -> CacheCircuitBreaker:
+    """
+    Returns process-wide circuit breaker of cache alias
+
+    :param alias: cache alias
+    :return: CacheCircuitBreaker
+    """
+    params: Tuple[Optional[int], Optional[float], float] = (
+        settings.COMMONTAIL_CACHE_CIRCUIT_BREAKER_FAILURES,
+        settings.COMMONTAIL_CACHE_CIRCUIT_BREAKER_SLOW_CALL,
+        settings.COMMONTAIL_CACHE_CIRCUIT_BREAKER_COOLDOWN,
+    )
+    breaker: Optional[CacheCircuitBreaker] = _circuit_breakers.get(alias)
+    if breaker is None or (breaker.failures, breaker.slow_call, breaker.cooldown) != params:
+        with _circuit_breakers_lock:
+            breaker = _circuit_breakers[alias] = CacheCircuitBreaker(alias, *params)
+
+    return breaker
+
+
+def call_cache(alias: str, method: Union[str, Callable[..., Any]], *args, fallback: Any = None, **kwargs) -> Any:
+    """
+    Calls cache method through alias's circuit breaker
+
+    Failures are logged and reported to the breaker instead of being raised. Skipped invalidations (delete, delete_many,
+    incr) leave stale data in cache after it recovers, so callers should check their results and log them.
+    :param alias: cache alias
+    :param method: name of cache method or callable, which gets the cache as its first argument
+    :param fallback: value returned if the call is skipped or fails
+    :return: method's result or fallback
+    """
+    cache: BaseCache = caches[alias]  # unknown aliases are configuration errors - they are raised as usual
+    breaker: CacheCircuitBreaker = get_cache_circuit_breaker(alias)
+    if not breaker.allow():
+        return fallback
+
+    start: float = time.perf_counter()
+    try:
+        result: Any = method(cache, *args, **kwargs) if callable(method) else getattr(cache, method)(*args, **kwargs)
+    except Exception:
+        logger.warning(f'Call of "{getattr(method, "__name__", method)}" method of cache "{alias}" failed.',
+                       exc_info=True)
+        breaker.record(None)
+
+        return fallback
+
+    breaker.record(time.perf_counter() - start)
+
+    return result
+
+
+def get_cache_dependency_generation_key(label: str) -> str:
+    return f'commontail_generation__dependency__{label.lower()}'
+
+
+def get_cache_dependency_key(token: str) -> str:
+    return f'commontail_dependency__{token}'
+
+
+def get_cache_dependency_token(instance: models.Model) -> str:
+    return f'{instance._meta.label_lower}:{instance.pk}'
+
+
+def register_cache_dependency(instance: Optional[models.Model]) -> None:
+    """
+    Marks cache data being computed as dependent on model instance, does nothing outside of collect_cache_dependencies
+
+    :param instance: model instance, None is ignored
+    :return: None
+    """
+    collected: Optional[Set[str]] = _dependencies.get()
+    if collected is not None and instance is not None and instance.pk is not None:
+        collected.add(get_cache_dependency_token(instance))
+
+
+def _get_initial_cache_generation() -> int:
+    # if a counter is evicted it must not restart from a value it already had - otherwise stale entries, stored under
+    # keys with this value, would become visible again
+    return int(time.time() * 1000)
+
+
+def get_cache_generations(keys: List[str], local_lifetime: Optional[int] = None) -> Dict[str, int]:
+    """
+    Returns current values of generation counters, initializing missing ones
+
+    :param keys: generation counters' cache keys
+    :param local_lifetime: if set - values are also kept in process memory for this number of seconds, so increments
+    made by other processes are seen with this delay
+    :return: dict with counters' keys and values
+    """
+    alias: str = settings.COMMONTAIL_CACHE_GENERATION_ALIAS
+    result: Dict[str, int] = dict()
+    key: str
+    if local_lifetime:
+        for key in keys:
+            value: Optional[int] = get_local_cache().get(f'{alias}:{key}')
+            if value is not None:
+                result[key] = value
+        keys = [key for key in keys if key not in result]
+        if not keys:
+            return result
+
+    loaded: Any = call_cache(alias, 'get_many', keys, fallback=_CACHE_CALL_FAILED)
+    if loaded is not _CACHE_CALL_FAILED:
+        result.update(loaded)
+        if local_lifetime:
+            for key, value in loaded.items():
+                get_local_cache().set(f'{alias}:{key}', value, local_lifetime)
+
+    for key in keys:
+        if key not in result:
+            # if the cache is unavailable - new value makes every versioned key a miss, as it should
+            initial: int = _get_initial_cache_generation()
+            result[key] = initial if call_cache(alias, 'add', key, initial, None, fallback=True) \
+                else call_cache(alias, 'get', key, initial, fallback=initial)
+
+    return result
+
+
+def increment_cache_generation(key: str) -> bool:
+    """
+    Increments generation counter - this invalidates every cache key built with it
+
+    :param key: generation counter's cache key
+    :return: False if the cache failed or was skipped by its circuit breaker
+    """
+    alias: str = settings.COMMONTAIL_CACHE_GENERATION_ALIAS
+    get_local_cache().delete(f'{alias}:{key}')
+
+    return call_cache(alias, _increment_cache_generation, key, fallback=False)
+
+
+def _increment_cache_generation(cache: BaseCache, key: str) -> bool:
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, _get_initial_cache_generation(), None):
+            cache.incr(key)
+
+    return True
+
+
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+_refresh_executor_lock: threading.Lock = threading.Lock()
+
+
+def get_cache_refresh_executor() -> ThreadPoolExecutor:
+    """
+    Returns process-wide executor used to refresh stale cache entries in background
+
+    :return: ThreadPoolExecutor with COMMONTAIL_CACHE_REFRESH_WORKERS workers
+    """
+    global _refresh_executor
+
+    with _refresh_executor_lock:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=settings.COMMONTAIL_CACHE_REFRESH_WORKERS,
+                                                   thread_name_prefix='commontail-cache-refresh')
+
+    return _refresh_executor
 
 
 class UnknownCacheSuffixException(KeyError):
@@ -28,10 +612,470 @@ class CacheSuffixDict(UserDict):
         return result
 
 
+class LocalCache:
+    """
+    Bounded in-process LRU cache with per-entry lifetime
+
+    Used as the first tier in front of Django cache aliases. Entries are written through on set and dropped on delete
+    in this process only, so other processes may serve a stale copy until its lifetime ends - unless the key itself
+    changes, as it does for AbstractCacheAware classes with cache_versioned set to True.
+    """
+
+    def __init__(self, max_entries: int):
+        self._max_entries: int = max_entries
+        self._data: OrderedDict = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+
+                return None
+
+            if expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def set(self, key: str, value: Any, lifetime: int) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + lifetime, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_entries:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'max_entries': self._max_entries,
+            }
+
+
+_local_cache: Optional[LocalCache] = None
+
+
+def get_local_cache() -> LocalCache:
+    """
+    Returns process-wide in-memory cache tier
+
+    :return: LocalCache limited to COMMONTAIL_CACHE_LOCAL_MAX_ENTRIES entries
+    """
+    global _local_cache
+
+    if _local_cache is None:
+        _local_cache = LocalCache(settings.COMMONTAIL_CACHE_LOCAL_MAX_ENTRIES)
+
+    return _local_cache
+
+
+CacheMetricLabels = namedtuple('CacheMetricLabels', ['model', 'suffix', 'alias'])
+
+CacheHistogram = namedtuple('CacheHistogram', ['buckets', 'counts', 'sum'])
+CacheHistogram.__doc__ = """
+Histogram of observed values
+
+:param buckets: upper bounds of buckets
+:param counts: numbers of values in every bucket (not cumulative), the last one is for values above all bounds
+:param sum: sum of observed values
+"""
+
+CACHE_METRIC_BUCKETS: Dict[str, Tuple[float, ...]] = {
+    'payload_bytes': (256, 1024, 4096, 16384, 65536, 262144, 1048576),
+    'recompute_seconds': (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+    'set_seconds': (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+}
+
+
+def _get_bucket_index(buckets: Tuple[float, ...], value: float) -> int:
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            return i
+
+    return len(buckets)
+
+
+class CacheMetricsSink:
+    """
+    Receives cache metrics of AbstractCacheAware instances
+
+    Counters: hits, misses, invalidations. Histograms: recompute_seconds, set_seconds, payload_bytes (see
+    CACHE_METRIC_BUCKETS).
+    """
+
+    def get_metrics(self) -> Tuple[Dict[Tuple[CacheMetricLabels, str], int],
+                                   Dict[Tuple[CacheMetricLabels, str], CacheHistogram]]:
+        """
+        Returns collected metrics
+
+        :return: tuple of dicts with counters' and histograms' values by labels and metric name
+        """
+        raise NotImplementedError
+
+    def increment(self, labels: CacheMetricLabels, name: str, value: int = 1) -> None:
+        raise NotImplementedError
+
+    def observe(self, labels: CacheMetricLabels, name: str, value: float) -> None:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        raise NotImplementedError
+
+
+class InMemoryCacheMetricsSink(CacheMetricsSink):
+    """
+    Keeps metrics in memory of current process - every process of a multi-process server has its own values
+    """
+
+    def __init__(self):
+        self._counters: Dict[Tuple[CacheMetricLabels, str], int] = dict()
+        self._histograms: Dict[Tuple[CacheMetricLabels, str], Tuple[List[int], List[float]]] = dict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def get_metrics(self) -> Tuple[Dict[Tuple[CacheMetricLabels, str], int],
+                                   Dict[Tuple[CacheMetricLabels, str], CacheHistogram]]:
+        with self._lock:
+            return dict(self._counters), {
+                (labels, name): CacheHistogram(CACHE_METRIC_BUCKETS[name], list(counts), total[0])
+                for (labels, name), (counts, total) in self._histograms.items()
+            }
+
+    def increment(self, labels: CacheMetricLabels, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[(labels, name)] = self._counters.get((labels, name), 0) + value
+
+    def observe(self, labels: CacheMetricLabels, name: str, value: float) -> None:
+        buckets: Tuple[float, ...] = CACHE_METRIC_BUCKETS[name]
+        with self._lock:
+            counts, total = self._histograms.setdefault((labels, name), ([0] * (len(buckets) + 1), [0]))
+            counts[_get_bucket_index(buckets, value)] += 1
+            total[0] += value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+class CacheBackendMetricsSink(CacheMetricsSink):
+    """
+    Keeps metrics in COMMONTAIL_CACHE_METRICS_ALIAS cache, so they are shared between processes
+
+    Every value costs one or two incr calls. Histograms' sums are stored in millionths. Series are listed in a
+    registry entry, updated without locking - a series registered concurrently with another one may be lost from it
+    until its process restarts.
+    """
+
+    REGISTRY_KEY: str = 'commontail_metrics__registry'
+
+    def __init__(self):
+        self._registered: Set[Tuple[CacheMetricLabels, str]] = set()
+
+    @property
+    def _cache(self) -> BaseCache:
+        return caches[settings.COMMONTAIL_CACHE_METRICS_ALIAS]
+
+    @staticmethod
+    def _call(operation: Callable[[BaseCache], Any]) -> None:
+        # metrics must never break a request - failures are handled by the alias's breaker, as call_cache does. It isn't
+        # used directly, because missing counters raise ValueError on incr, which isn't a failure.
+        alias: str = settings.COMMONTAIL_CACHE_METRICS_ALIAS
+        breaker: CacheCircuitBreaker = get_cache_circuit_breaker(alias)
+        if not breaker.allow():
+            return
+
+        start: float = time.perf_counter()
+        try:
+            operation(caches[alias])
+        except Exception:
+            logger.warning(f'Metrics call of cache "{alias}" failed.', exc_info=True)
+            breaker.record(None)
+
+            return
+
+        breaker.record(time.perf_counter() - start)
+
+    @staticmethod
+    def _get_key(labels: CacheMetricLabels, name: str, part: Any) -> str:
+        series: str = hashlib.md5(f'{labels.model}|{labels.suffix}|{labels.alias}'.encode()).hexdigest()
+
+        return f'commontail_metrics__{series}__{name}__{part}'
+
+    @staticmethod
+    def _incr_in(cache: BaseCache, key: str, value: int) -> None:
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            if not cache.add(key, value, None):
+                cache.incr(key, value)
+
+    def _incr(self, key: str, value: int) -> None:
+        self._call(lambda cache: self._incr_in(cache, key, value))
+
+    def _register_in(self, cache: BaseCache, labels: CacheMetricLabels, name: str) -> None:
+        registry: List[Tuple[Tuple[str, str, str], str]] = cache.get(self.REGISTRY_KEY, [])
+        if (tuple(labels), name) not in registry:
+            cache.set(self.REGISTRY_KEY, registry + [(tuple(labels), name)], None)
+        self._registered.add((labels, name))
+
+    def _register(self, labels: CacheMetricLabels, name: str) -> None:
+        if (labels, name) not in self._registered:
+            self._call(lambda cache: self._register_in(cache, labels, name))
+
+    def get_metrics(self) -> Tuple[Dict[Tuple[CacheMetricLabels, str], int],
+                                   Dict[Tuple[CacheMetricLabels, str], CacheHistogram]]:
+        counters: Dict[Tuple[CacheMetricLabels, str], int] = dict()
+        histograms: Dict[Tuple[CacheMetricLabels, str], CacheHistogram] = dict()
+        series: List[Tuple[CacheMetricLabels, str]] = [
+            (CacheMetricLabels(*labels), name) for labels, name in self._cache.get(self.REGISTRY_KEY, [])
+        ]
+        keys: List[str] = []
+        for labels, name in series:
+            if name in CACHE_METRIC_BUCKETS:
+                keys.extend(self._get_key(labels, name, i) for i in range(len(CACHE_METRIC_BUCKETS[name]) + 1))
+                keys.append(self._get_key(labels, name, 'sum'))
+            else:
+                keys.append(self._get_key(labels, name, 'count'))
+        values: Dict[str, int] = self._cache.get_many(keys)
+
+        for labels, name in series:
+            if name in CACHE_METRIC_BUCKETS:
+                buckets: Tuple[float, ...] = CACHE_METRIC_BUCKETS[name]
+                histograms[(labels, name)] = CacheHistogram(
+                    buckets,
+                    [values.get(self._get_key(labels, name, i), 0) for i in range(len(buckets) + 1)],
+                    values.get(self._get_key(labels, name, 'sum'), 0) / 1000000,
+                )
+            else:
+                counters[(labels, name)] = values.get(self._get_key(labels, name, 'count'), 0)
+
+        return counters, histograms
+
+    def increment(self, labels: CacheMetricLabels, name: str, value: int = 1) -> None:
+        self._register(labels, name)
+        self._incr(self._get_key(labels, name, 'count'), value)
+
+    def observe(self, labels: CacheMetricLabels, name: str, value: float) -> None:
+        self._register(labels, name)
+        self._incr(self._get_key(labels, name, _get_bucket_index(CACHE_METRIC_BUCKETS[name], value)), 1)
+        self._incr(self._get_key(labels, name, 'sum'), int(value * 1000000))
+
+    def reset(self) -> None:
+        keys: List[str] = [self.REGISTRY_KEY]
+        for labels, name in self._cache.get(self.REGISTRY_KEY, []):
+            labels = CacheMetricLabels(*labels)
+            if name in CACHE_METRIC_BUCKETS:
+                keys.extend(self._get_key(labels, name, i) for i in range(len(CACHE_METRIC_BUCKETS[name]) + 1))
+                keys.append(self._get_key(labels, name, 'sum'))
+            else:
+                keys.append(self._get_key(labels, name, 'count'))
+        self._cache.delete_many(keys)
+        self._registered.clear()
+
+
+_metrics_sink: Optional[Tuple[str, CacheMetricsSink]] = None
+
+
+def get_cache_metrics_sink() -> Optional[CacheMetricsSink]:
+    """
+    Returns process-wide metrics sink
+
+    :return: instance of COMMONTAIL_CACHE_METRICS_SINK class or None if metrics are disabled
+    """
+    global _metrics_sink
+
+    path: Optional[str] = settings.COMMONTAIL_CACHE_METRICS_SINK
+    if not path:
+        return None
+
+    if _metrics_sink is None or _metrics_sink[0] != path:
+        _metrics_sink = (path, import_string(path)())
+
+    return _metrics_sink[1]
+
+
+def _escape_metric_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_cache_metrics(sink: Optional[CacheMetricsSink] = None) -> str:
+    """
+    Renders metrics in Prometheus text exposition format
+
+    :param sink: metrics sink, current one by default
+    :return: text with metrics
+    """
+    sink = sink or get_cache_metrics_sink()
+    if sink is None:
+        return ''
+
+    counters, histograms = sink.get_metrics()
+    lines: List[str] = []
+
+    def format_labels(labels: CacheMetricLabels, **extra: str) -> str:
+        pairs: Dict[str, str] = {**labels._asdict(), **extra}
+
+        return ','.join(f'{k}="{_escape_metric_label(str(v))}"' for k, v in pairs.items())
+
+    for name in sorted({n for _, n in counters.keys()}):
+        lines.append(f'# TYPE commontail_cache_{name}_total counter')
+        for (labels, n), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f'commontail_cache_{name}_total{{{format_labels(labels)}}} {value}')
+
+    for name in sorted({n for _, n in histograms.keys()}):
+        lines.append(f'# TYPE commontail_cache_{name} histogram')
+        for (labels, n), histogram in sorted(histograms.items()):
+            if n != name:
+                continue
+            cumulative: int = 0
+            for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append(f'commontail_cache_{name}_bucket{{{format_labels(labels, le=str(bound))}}} {cumulative}')
+            lines.append(f'commontail_cache_{name}_sum{{{format_labels(labels)}}} {histogram.sum}')
+            lines.append(f'commontail_cache_{name}_count{{{format_labels(labels)}}} {cumulative}')
+
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def make_dummy_request(page: Page) -> HttpRequest:
+    """
+    Creates a synthetic request to the page's URL, used to compute request-dependent data outside of request-response
+    cycle
+
+    Host and scheme are taken from root_url of the page's site (or of the default site, if the page isn't routable).
+    :param page: page instance
+    :return: HttpRequest
+    """
+    url_parts: Optional[Tuple[int, str, str]] = page.get_url_parts()
+    if url_parts is not None:
+        root_url, path = url_parts[1], url_parts[2]
+    else:
+        site: Optional[Site] = Site.objects.filter(is_default_site=True).first()
+        root_url, path = site.root_url if site else 'http://localhost', '/'
+
+    url: ParseResult = urlparse(root_url)
+    port: int = url.port or (443 if url.scheme == 'https' else 80)
+    request: WSGIRequest = WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'SERVER_NAME': url.hostname,
+        'SERVER_PORT': port,
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': url.netloc,
+        'wsgi.version': (1, 0),
+        'wsgi.input': StringIO(),
+        'wsgi.errors': StringIO(),
+        'wsgi.url_scheme': url.scheme,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    })
+    request.is_dummy = True
+
+    return request
+
+
+class CacheInvalidationBatch:
+    """
+    Collects cache invalidations to execute them at once: one delete_many call per alias and one incr per generation
+    counter, whatever number of times the same key was added
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, Set[str]] = dict()
+        self._local_keys: Set[str] = set()
+        self._generations: Set[str] = set()
+        self._dependencies: Set[str] = set()
+
+    def __bool__(self):
+        return bool(self._keys or self._local_keys or self._generations or self._dependencies)
+
+    def add_dependency(self, token: str) -> None:
+        """
+        Adds every key, depending on the token, to the batch - reverse index is read while flushing
+
+        :param token: dependency token (see get_cache_dependency_token)
+        :return: None
+        """
+        self._dependencies.add(token)
+
+    def add_generation(self, key: str) -> None:
+        self._generations.add(key)
+
+    def add_key(self, alias: str, key: str, local: bool = False) -> None:
+        self._keys.setdefault(alias, set()).add(key)
+        if local:
+            self._local_keys.add(f'{alias}:{key}')
+
+    def flush(self) -> bool:
+        """
+        Executes collected invalidations through circuit breakers of their aliases, failures are logged
+
+        :return: False if some of invalidations failed - their entries stay in cache until they expire
+        """
+        failed: bool = False
+        if self._dependencies:
+            index_alias: str = settings.COMMONTAIL_CACHE_DEPENDENCY_ALIAS
+            index_keys: List[str] = [get_cache_dependency_key(t) for t in self._dependencies]
+            self._dependencies = set()
+            indexes: Optional[Dict[str, List[Tuple[str, str]]]] = call_cache(index_alias, 'get_many', index_keys)
+            if indexes is None:
+                failed = True
+            else:
+                for index in indexes.values():
+                    for alias, key in index:
+                        self.add_key(alias, key, local=True)
+                failed = call_cache(index_alias, 'delete_many', index_keys, fallback=_CACHE_CALL_FAILED) \
+                    is _CACHE_CALL_FAILED
+
+        keys, self._keys = self._keys, dict()
+        local_keys, self._local_keys = self._local_keys, set()
+        generations, self._generations = self._generations, set()
+
+        for local_key in local_keys:
+            get_local_cache().delete(local_key)
+        for alias, alias_keys in keys.items():
+            if call_cache(alias, 'delete_many', list(alias_keys), fallback=_CACHE_CALL_FAILED) is _CACHE_CALL_FAILED:
+                failed = True
+        for generation in generations:
+            if not increment_cache_generation(generation):
+                failed = True
+
+        if failed:
+            logger.error('Cache invalidation failed, stale entries are served until they expire.')
+
+        return not failed
+
+
 class AbstractCacheAware:
 
     CACHE_ACTION_NONE: int = 0
     CACHE_ACTION_CLEAR: int = 1
+    CACHE_ACTION_REFRESH: int = 2  # clear and recompute data returned by get_cache_data_callables after commit
 
     CACHE_POLICIES: Dict[str, int] = {
         'save': CACHE_ACTION_CLEAR,
@@ -40,49 +1084,703 @@ class AbstractCacheAware:
 
     cache_suffixes: CacheSuffixDict = CacheSuffixDict()
 
-    def clear_cache(self) -> None:
-        aliases_keys: Dict[str, List[str]] = dict()
+    # saves with update_fields limited to these fields don't trigger the 'save' policy
+    cache_ignored_update_fields: FrozenSet[str] = frozenset()
+
+    # if True - cache keys include instance, model and suffix generation counters, and clear_cache increments
+    # instance's counter instead of deleting every suffix's key
+    cache_versioned: bool = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # only versioned keys change when other processes invalidate them, so only they may be kept in process memory
+        if not cls.cache_versioned and any(meta.local_lifetime for meta in cls.cache_suffixes.values()):
+            raise TypeError(f'Cache suffixes with local_lifetime may be used only with cache_versioned set to True, '
+                            f'{cls.__qualname__} isn\'t versioned.')
+
+    def acquire_cache_lock(self, suffix: str) -> Optional[str]:
+        """
+        Tries to acquire a lock for recomputation of suffix's data, shared between processes through suffix's cache
+
+        :param suffix: cache suffix
+        :return: lock token to be passed to release_cache_lock or None if lock is held by someone else
+        """
+        meta: CacheSuffixMeta = self.get_cache_meta(suffix)
+        token: str = uuid4().hex
+
+        # if the cache is unavailable - lock is "acquired", so data is computed directly without waiting
+        alias: str = get_cache_alias(meta.alias, self.get_cache_key(suffix))  # lock lives with the data
 
-        for suffix, meta in self.cache_suffixes.items():
-            if meta.alias in aliases_keys:
-                aliases_keys[meta.alias].append(self.get_cache_key(suffix))
+        return token if call_cache(alias, 'add', self.get_cache_lock_key(suffix), token, meta.lock_timeout,
+                                   fallback=True) else None
+
+    async def aclear_cache(self, batch: Optional[CacheInvalidationBatch] = None) -> None:
+        """
+        Async version of clear_cache
+        """
+        await _run_cache_io(self.clear_cache, batch)
+
+    async def _acompute_cache_data(self, suffix: str, data_callable: Callable,
+                                   dependencies: Optional[List[models.Model]]) -> Tuple[Any, Set[str]]:
+        start: float = time.perf_counter()
+        with collect_cache_dependencies() as collected:
+            for dependency in dependencies or ():
+                register_cache_dependency(dependency)
+            if asyncio.iscoroutinefunction(data_callable):
+                data: Any = await data_callable()
             else:
-                aliases_keys[meta.alias] = [self.get_cache_key(suffix)]
+                # synchronous callables usually query the database, which django allows in a single thread only
+                data = await sync_to_async(data_callable)()
+        self._observe_cache_metric(suffix, 'recompute_seconds', time.perf_counter() - start)
 
-        for alias, keys in aliases_keys.items():
-            caches[alias].delete_many(keys)
+        return data, collected
+
+    async def aget_cache_data(self, suffix: str) -> Any:
+        """
+        Async version of get_cache_data
+        """
+        return await _run_cache_io(self.get_cache_data, suffix)
+
+    async def aget_or_set_cache_data(self, suffix: str, data_callable: Callable,
+                                     dependencies: Optional[Iterable[models.Model]] = None) -> Any:
+        """
+        Async version of get_or_set_cache_data
+
+        :param suffix: cache suffix
+        :param data_callable: coroutine function or callable without arguments, returning data to be cached -
+            synchronous callables are executed with sync_to_async
+        :param dependencies: model instances the data depends on
+        :return: data
+        """
+        dependencies = list(dependencies) if dependencies else None
+        entry: Any = await _run_cache_io(self._lookup_cache_entry, suffix)
+
+        if entry is not None:
+            if isinstance(entry, CacheEnvelope) and entry.soft_expires <= time.time():
+                sync_callable: Callable = async_to_sync(data_callable) if asyncio.iscoroutinefunction(data_callable) \
+                    else data_callable
+                if dependencies:
+                    sync_callable = self._with_cache_dependencies(sync_callable, dependencies)
+                await _run_cache_io(self.schedule_cache_refresh, suffix, sync_callable)
+
+            return self._unwrap_cache_entry(entry)
+
+        self._forget_cache_prefetched(suffix)
+        meta: CacheSuffixMeta = self.get_cache_meta(suffix)
+        if meta.single_flight:
+            return await self._aget_or_set_cache_data_single_flight(suffix, meta, data_callable, dependencies)
+
+        data, collected = await self._acompute_cache_data(suffix, data_callable, dependencies)
+        await _run_cache_io(self.set_cache_data, suffix, data, collected)
+
+        return data
+
+    async def _aget_or_set_cache_data_single_flight(self, suffix: str, meta: CacheSuffixMeta, data_callable: Callable,
+                                                    dependencies: Optional[List[models.Model]]) -> Any:
+        deadline: float = time.monotonic() + meta.lock_wait
+
+        while True:
+            token: Optional[str] = await _run_cache_io(self.acquire_cache_lock, suffix)
+            if token:
+                try:
+                    entry: Any = await _run_cache_io(self._get_cache_entry, suffix)
+                    if entry is not None:
+                        return self._unwrap_cache_entry(entry)
+                    data, collected = await self._acompute_cache_data(suffix, data_callable, dependencies)
+                    await _run_cache_io(self.set_cache_data, suffix, data, collected)
+                finally:
+                    await _run_cache_io(self.release_cache_lock, suffix, token)
+
+                return data
+
+            if time.monotonic() >= deadline:
+                return (await self._acompute_cache_data(suffix, data_callable, dependencies))[0]
+
+            await asyncio.sleep(settings.COMMONTAIL_CACHE_LOCK_POLL_INTERVAL)
+            entry: Any = await _run_cache_io(self._get_cache_entry, suffix)
+            if entry is not None:
+                return self._unwrap_cache_entry(entry)
+
+    async def aset_cache_data(self, suffix: str, data: Any, dependencies: Optional[Iterable[str]] = None) -> None:
+        """
+        Async version of set_cache_data
+        """
+        await _run_cache_io(self.set_cache_data, suffix, data, list(dependencies) if dependencies else None)
+
+    def clear_cache(self, batch: Optional[CacheInvalidationBatch] = None) -> None:
+        """
+        Invalidates every suffix's data of this instance
+
+        :param batch: if passed - invalidations are added to it instead of being executed immediately
+        :return: None
+        """
+        flush: bool = batch is None
+        if flush:
+            batch = CacheInvalidationBatch()
+
+        if self.cache_versioned:
+            batch.add_generation(self.get_cache_generation_key())
+        else:
+            for suffix, meta in self.cache_suffixes.items():
+                key: str = self.get_cache_key(suffix)
+                batch.add_key(get_cache_alias(meta.alias, key), key, bool(meta.local_lifetime))
+        for suffix in self.cache_suffixes.keys():
+            self._count_cache_metric(suffix, 'invalidations')
+
+        self._cache_generations = None
+        self._cache_prefetched = None
+
+        if flush:
+            batch.flush()
+
+    @classmethod
+    def clear_cache_bulk(cls, instances: Union[QuerySet, Iterable['AbstractCacheAware']],
+                         chunk_size: Optional[int] = None) -> int:
+        """
+        Invalidates every suffix's data of many instances - keys are deleted with one delete_many call per physical
+        alias for every chunk of instances
+
+        Instances of classes with cache_versioned set to True are invalidated by increments of their generation counters
+        instead. Querysets of pages are mapped to instances of rows' specific classes with primary keys only, pages of
+        classes overriding get_cache_prefix are loaded.
+        :param instances: instances or queryset of this class
+        :param chunk_size: number of instances per chunk, COMMONTAIL_CACHE_BULK_CHUNK_SIZE if None
+        :return: number of invalidated instances
+        """
+        chunk_size = chunk_size or settings.COMMONTAIL_CACHE_BULK_CHUNK_SIZE
+        if isinstance(instances, QuerySet):
+            instances = cls._get_cache_bulk_instances(instances, chunk_size)
+
+        batch: CacheInvalidationBatch = CacheInvalidationBatch()
+        invalidations: Counter = Counter()
+        count: int = 0
+        instance: AbstractCacheAware
+        for instance in instances:
+            if instance.cache_versioned:
+                batch.add_generation(instance.get_cache_generation_key())
+            else:
+                for suffix, meta in instance.cache_suffixes.items():
+                    key: str = instance.get_cache_key(suffix)
+                    batch.add_key(get_cache_alias(meta.alias, key), key, bool(meta.local_lifetime))
+            for suffix in instance.cache_suffixes.keys():
+                invalidations[instance.get_cache_metric_labels(suffix)] += 1
+
+            instance._cache_generations = None
+            instance._cache_prefetched = None
+
+            count += 1
+            if count % chunk_size == 0:
+                batch.flush()
+        batch.flush()
+
+        sink: Optional[CacheMetricsSink] = get_cache_metrics_sink()
+        if sink is not None:
+            for labels, value in invalidations.items():
+                sink.increment(labels, 'invalidations', value)
+
+        return count
+
+    @classmethod
+    def clear_cache_for_model(cls) -> None:
+        """
+        Invalidates cache of every instance of this class, works only if cache_versioned is True
+
+        :return: None
+        """
+        increment_cache_generation(cls.get_cache_model_generation_key())
+
+    @staticmethod
+    def clear_cache_for_suffix(suffix: str) -> None:
+        """
+        Invalidates suffix's cache of every instance of every class with cache_versioned set to True
+
+        :param suffix: cache suffix
+        :return: None
+        """
+        increment_cache_generation(AbstractCacheAware.get_cache_suffix_generation_key(suffix))
+
+    def _compute_cache_data(self, suffix: str, data_callable: Callable, *args) -> Tuple[Any, Set[str]]:
+        start: float = time.perf_counter()
+        result: Tuple[Any, Set[str]] = _call_collecting_dependencies(data_callable, *args)
+        self._observe_cache_metric(suffix, 'recompute_seconds', time.perf_counter() - start)
+
+        return result
+
+    def _count_cache_metric(self, suffix: str, name: str, value: int = 1) -> None:
+        sink: Optional[CacheMetricsSink] = get_cache_metrics_sink()
+        if sink is not None:
+            sink.increment(self.get_cache_metric_labels(suffix), name, value)
+
+    @staticmethod
+    def _decode_cache_entry(meta: CacheSuffixMeta, value: Any) -> Any:
+        if meta.serializer is None or value is None:
+            return value
+
+        data: Any = value.data if isinstance(value, CacheEnvelope) else value
+        if data is CACHED_NONE:
+            return value
+        try:
+            data = meta.serializer.decode(data)
+        except Exception:
+            return None  # stored in another format or corrupted - it's a miss
+
+        return CacheEnvelope(data, value.soft_expires) if isinstance(value, CacheEnvelope) else data
 
     def delete_cache_suffix(self, suffix: str) -> None:
-        caches[self.get_cache_meta(suffix).alias].delete(self.get_cache_key(suffix))
+        self._forget_cache_prefetched(suffix)
+        meta: CacheSuffixMeta = self.get_cache_meta(suffix)
+        key: str = self.get_cache_key(suffix)
+        alias: str = get_cache_alias(meta.alias, key)
+        if meta.local_lifetime:
+            get_local_cache().delete(f'{alias}:{key}')
+        caches[alias].delete(key)
+        self._count_cache_metric(suffix, 'invalidations')
+
+    def get_cache_data_callables(self, request: Optional[HttpRequest] = None) -> Dict[str, Callable]:
+        """
+        Returns callables computing suffixes' data, used to prime the cache eagerly
+
+        :param request: request to compute data for
+        :return: dict with suffixes and callables without arguments
+        """
+        return dict()
 
     def get_cache_data(self, suffix: str) -> Any:
-        return caches[self.get_cache_meta(suffix).alias].get(self.get_cache_key(suffix))
+        return self._unwrap_cache_entry(self._lookup_cache_entry(suffix))
+
+    @staticmethod
+    def _encode_cache_entry(meta: CacheSuffixMeta, key: str, entry: Any) -> Optional[Any]:
+        data: Any = entry.data if isinstance(entry, CacheEnvelope) else entry
+        if meta.serializer is None or data is CACHED_NONE:
+            return entry
+
+        try:
+            data = meta.serializer.encode(data)
+        except Exception:
+            # the value is still returned to the caller, it just isn't cached
+            logger.warning(f'Encoding of "{key}" cache entry failed, skipping it.', exc_info=True)
+            return None
+
+        return CacheEnvelope(data, entry.soft_expires) if isinstance(entry, CacheEnvelope) else data
+
+    def _forget_cache_prefetched(self, suffix: str) -> None:
+        if getattr(self, '_cache_prefetched', None):
+            self._cache_prefetched.pop(suffix, None)
+
+    @classmethod
+    def _get_cache_bulk_instances(cls, queryset: QuerySet, chunk_size: int) -> Iterator['AbstractCacheAware']:
+        return queryset.iterator(chunk_size=chunk_size)
+
+    def _get_cache_entry(self, suffix: str) -> Any:
+        prefetched: Optional[Dict[str, Any]] = getattr(self, '_cache_prefetched', None)
+        if prefetched and suffix in prefetched:
+            return prefetched[suffix]
+
+        meta: CacheSuffixMeta = self.get_cache_meta(suffix)
+        key: str = self.get_cache_key(suffix)
+        alias: str = get_cache_alias(meta.alias, key)
+        if not meta.local_lifetime:
+            return self._decode_cache_entry(meta, call_cache(alias, 'get', key))
+
+        local_key: str = f'{alias}:{key}'
+        entry: Any = get_local_cache().get(local_key)
+        if entry is None:
+            entry = self._decode_cache_entry(meta, call_cache(alias, 'get', key))
+            if entry is not None:
+                get_local_cache().set(local_key, entry, self._get_cache_local_lifetime(meta, entry))
+
+        return entry
+
+    def _get_cache_dependency_generation_keys(self, suffix: Optional[str] = None) -> List[str]:
+        metas: Iterable[CacheSuffixMeta] = self.cache_suffixes.values() if suffix is None \
+            else [self.get_cache_meta(suffix)]
+
+        return sorted({get_cache_dependency_generation_key(label) for meta in metas
+                       for label in meta.dependency_models or ()})
+
+    def _get_cache_generation_keys(self) -> List[str]:
+        keys: List[str] = self._get_cache_dependency_generation_keys()
+        if not self.cache_versioned:
+            return keys
+
+        return [self.get_cache_generation_key(), self.get_cache_model_generation_key()] + [
+            self.get_cache_suffix_generation_key(suffix) for suffix in self.cache_suffixes.keys()
+        ] + keys
+
+    def _get_cache_generations(self) -> Dict[str, int]:
+        if getattr(self, '_cache_generations', None) is None:
+            self._cache_generations = get_cache_generations(self._get_cache_generation_keys(),
+                                                            self._get_cache_generations_local_lifetime())
+
+        return self._cache_generations
+
+    @classmethod
+    def _get_cache_generations_local_lifetime(cls) -> Optional[int]:
+        # local copies of entries are already served this long after invalidations, so counters' copies don't add to it
+        return min((meta.local_lifetime for meta in cls.cache_suffixes.values() if meta.local_lifetime), default=None)
+
+    def get_cache_generation_key(self) -> str:
+        return f'{self.get_cache_prefix()}__generation'
 
     def get_cache_key(self, suffix: str) -> str:
+        if self.cache_versioned:
+            return f'{self.get_cache_prefix()}__{self.get_cache_version(suffix)}__{suffix}'
+        if self.get_cache_meta(suffix).dependency_models:
+            return f'{self.get_cache_prefix()}__{self._get_cache_dependency_version(suffix)}__{suffix}'
+
         return f'{self.get_cache_prefix()}__{suffix}'
 
+    @staticmethod
+    def _get_cache_lifetime(meta: CacheSuffixMeta, entry: Any, key: Optional[str] = None) -> Optional[int]:
+        data: Any = entry.data if isinstance(entry, CacheEnvelope) else entry
+        lifetime: Optional[int] = meta.lifetime
+        if data is CACHED_NONE and meta.negative_lifetime is not None:
+            lifetime = meta.negative_lifetime
+
+        if key is None or not meta.lifetime_jitter or not lifetime:
+            return lifetime
+
+        # a limited number of steps keeps set_many calls of prefetch_cache_data grouped by lifetime
+        step: int = zlib.crc32(key.encode()) % _LIFETIME_JITTER_STEPS
+
+        return max(1, lifetime - int(lifetime * meta.lifetime_jitter * step / _LIFETIME_JITTER_STEPS))
+
+    @classmethod
+    def _get_cache_local_lifetime(cls, meta: CacheSuffixMeta, entry: Any) -> int:
+        lifetime: Optional[int] = cls._get_cache_lifetime(meta, entry)
+
+        return meta.local_lifetime if lifetime is None else min(meta.local_lifetime, lifetime)
+
+    def get_cache_lock_key(self, suffix: str) -> str:
+        return f'{self.get_cache_key(suffix)}__lock'
+
     def get_cache_meta(self, suffix: str) -> CacheSuffixMeta:
         try:
             return self.cache_suffixes[suffix]
         except KeyError as e:
             raise UnknownCacheSuffixException from e
 
+    def get_cache_metric_labels(self, suffix: str) -> CacheMetricLabels:
+        return CacheMetricLabels(f'{type(self).__module__}.{type(self).__qualname__}', suffix,
+                                 self.get_cache_meta(suffix).alias)
+
+    @classmethod
+    def get_cache_model_generation_key(cls) -> str:
+        return f'commontail_generation__model__{cls.__module__}.{cls.__qualname__}'
+
     def get_cache_prefix(self) -> str:
         raise NotImplementedError
 
-    def get_or_set_cache_data(self, suffix: str, data_callable: Callable) -> Any:
-        data: Any = self.get_cache_data(suffix)
+    @staticmethod
+    def get_cache_suffix_generation_key(suffix: str) -> str:
+        return f'commontail_generation__suffix__{suffix}'
 
-        if data is None:
-            data = data_callable()
-            self.set_cache_data(suffix, data)
+    def _get_cache_dependency_version(self, suffix: str) -> str:
+        generations: Dict[str, int] = self._get_cache_generations()
+
+        return '.'.join(str(generations[k]) for k in self._get_cache_dependency_generation_keys(suffix))
+
+    def _get_cache_indexed_dependencies(self, suffix: str, tokens: Iterable[str]) -> List[str]:
+        # dependencies on models of dependency_models are covered by keys' versions
+        labels: Set[str] = {label.lower() for label in self.get_cache_meta(suffix).dependency_models or ()}
+
+        return [token for token in tokens if token.partition(':')[0] not in labels]
+
+    def get_cache_version(self, suffix: str) -> str:
+        generations: Dict[str, int] = self._get_cache_generations()
+        self.get_cache_meta(suffix)  # raises UnknownCacheSuffixException for unknown suffixes
+        version: str = '.'.join(str(generations[k]) for k in (
+            self.get_cache_generation_key(),
+            self.get_cache_model_generation_key(),
+            self.get_cache_suffix_generation_key(suffix),
+        ))
+        dependency_version: str = self._get_cache_dependency_version(suffix)
+
+        return f'{version}.{dependency_version}' if dependency_version else version
+
+    def get_or_set_cache_data(self, suffix: str, data_callable: Callable,
+                              dependencies: Optional[Iterable[models.Model]] = None) -> Any:
+        """
+        Returns suffix's data from cache, computing and storing it if it's missing
+
+        Model instances, registered with register_cache_dependency while data_callable is running, are recorded as
+        dependencies along with explicitly passed ones - changes of any of them invalidate stored data.
+        :param suffix: cache suffix
+        :param data_callable: callable without arguments, returning data to be cached
+        :param dependencies: model instances the data depends on
+        :return: data
+        """
+        if dependencies:
+            dependencies = list(dependencies)
+            data_callable = self._with_cache_dependencies(data_callable, dependencies)
+
+        entry: Any = self._lookup_cache_entry(suffix)
+
+        if entry is not None:
+            if isinstance(entry, CacheEnvelope) and entry.soft_expires <= time.time():
+                self.schedule_cache_refresh(suffix, data_callable)
+
+            return self._unwrap_cache_entry(entry)
+
+        self._forget_cache_prefetched(suffix)
+        meta: CacheSuffixMeta = self.get_cache_meta(suffix)
+        if meta.single_flight:
+            return self._get_or_set_cache_data_single_flight(suffix, meta, data_callable)
+
+        data, collected = self._compute_cache_data(suffix, data_callable)
+        self.set_cache_data(suffix, data, collected)
 
         return data
 
-    def set_cache_data(self, suffix: str, data: Any) -> None:
+    def _get_or_set_cache_data_single_flight(self, suffix: str, meta: CacheSuffixMeta,
+                                             data_callable: Callable) -> Any:
+        deadline: float = time.monotonic() + meta.lock_wait
+
+        while True:
+            token: Optional[str] = self.acquire_cache_lock(suffix)
+            if token:
+                try:
+                    # the previous holder may have stored the data between our miss and the lock
+                    entry: Any = self._get_cache_entry(suffix)
+                    if entry is not None:
+                        return self._unwrap_cache_entry(entry)
+                    data, collected = self._compute_cache_data(suffix, data_callable)
+                    self.set_cache_data(suffix, data, collected)
+                finally:
+                    self.release_cache_lock(suffix, token)
+
+                return data
+
+            if time.monotonic() >= deadline:
+                # the lock holder is too slow - don't wait any longer, but leave storing the data to it
+                return self._compute_cache_data(suffix, data_callable)[0]
+
+            time.sleep(settings.COMMONTAIL_CACHE_LOCK_POLL_INTERVAL)
+            entry: Any = self._get_cache_entry(suffix)
+            if entry is not None:
+                return self._unwrap_cache_entry(entry)
+
+    @classmethod
+    def prefetch_cache_data(cls, instances: Iterable['AbstractCacheAware'],
+                            suffixes: Dict[str, Optional[Callable[['AbstractCacheAware'], Any]]],
+                            max_workers: Optional[int] = None) -> None:
+        """
+        Loads suffixes' data of many instances with one get_many call per cache alias
+
+        Loaded data is attached to instances, so following get_cache_data and get_or_set_cache_data calls don't touch
+        the cache at all. Missing data is computed by suffix's callable (if it's not None) and stored back with one
+        set_many call per alias and lifetime. Example for a list of pages:
+        OpenGraphAwarePage.prefetch_cache_data(pages, {
+            OPENGRAPH_CACHE_SUFFIX: lambda p: OpenGraphAware.get_opengraph_data(p, request),
+        })
+
+        :param instances: cache-aware instances
+        :param suffixes: dict with suffixes and callables computing suffix's data from instance
+        :param max_workers: if set - missing data is computed in a thread pool of this size
+        :return: None
+        """
+        instances = list(instances)
+
+        versioned: List[AbstractCacheAware] = [
+            i for i in instances if getattr(i, '_cache_generations', None) is None and i._get_cache_generation_keys()
+        ]
+        if versioned:
+            local_lifetimes: Set[Optional[int]] = {i._get_cache_generations_local_lifetime() for i in versioned}
+            generations: Dict[str, int] = get_cache_generations(
+                list({k for i in versioned for k in i._get_cache_generation_keys()}),
+                None if None in local_lifetimes else min(local_lifetimes),
+            )
+            for instance in versioned:
+                instance._cache_generations = {k: generations[k] for k in instance._get_cache_generation_keys()}
+
+        aliases_keys: Dict[str, Dict[str, Tuple[AbstractCacheAware, str, CacheSuffixMeta]]] = dict()
+        for instance in instances:
+            for suffix in suffixes.keys():
+                meta: CacheSuffixMeta = instance.get_cache_meta(suffix)
+                key: str = instance.get_cache_key(suffix)
+                alias: str = get_cache_alias(meta.alias, key)
+                if meta.local_lifetime:
+                    local_entry: Any = get_local_cache().get(f'{alias}:{key}')
+                    if local_entry is not None:
+                        instance._count_cache_metric(suffix, 'hits')
+                        instance._remember_cache_prefetched(suffix, local_entry)
+                        continue
+                aliases_keys.setdefault(alias, dict())[key] = (instance, suffix, meta)
+
+        misses: List[Tuple[AbstractCacheAware, str]] = []
+        for alias, keys in aliases_keys.items():
+            entries: Dict[str, Any] = call_cache(alias, 'get_many', list(keys.keys()), fallback={})
+            for key, (instance, suffix, meta) in keys.items():
+                entry: Any = cls._decode_cache_entry(meta, entries.get(key))
+                instance._count_cache_metric(suffix, 'misses' if entry is None else 'hits')
+                data_callable: Optional[Callable] = suffixes[suffix]
+                if entry is None and data_callable:
+                    misses.append((instance, suffix))
+                    continue
+                if isinstance(entry, CacheEnvelope) and entry.soft_expires <= time.time() and data_callable:
+                    instance.schedule_cache_refresh(suffix, lambda c=data_callable, i=instance: c(i))
+                if entry is not None and meta.local_lifetime:
+                    get_local_cache().set(f'{alias}:{key}', entry, cls._get_cache_local_lifetime(meta, entry))
+                instance._remember_cache_prefetched(suffix, entry)
+
+        if not misses:
+            return
+
+        if max_workers:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                computed: List[Tuple[Any, Set[str]]] = list(executor.map(
+                    lambda m: _call_in_thread(m[0]._compute_cache_data, m[1], suffixes[m[1]], m[0]), misses
+                ))
+        else:
+            computed = [instance._compute_cache_data(suffix, suffixes[suffix], instance) for instance, suffix in misses]
+
+        values: Dict[Tuple[str, Optional[int]], Dict[str, Any]] = dict()
+        for (instance, suffix), (data, collected) in zip(misses, computed):
+            meta = instance.get_cache_meta(suffix)
+            key = instance.get_cache_key(suffix)
+            entry = instance._wrap_cache_data(meta, data)
+            instance._remember_cache_prefetched(suffix, entry)
+            alias = get_cache_alias(meta.alias, key)
+            if not add_cache_dependencies(alias, key, instance._get_cache_indexed_dependencies(suffix, collected)):
+                continue
+            stored: Any = cls._encode_cache_entry(meta, key, entry)
+            if stored is None:
+                continue
+            instance._observe_cache_payload(suffix, stored)
+            values.setdefault((alias, cls._get_cache_lifetime(meta, entry, key)), dict())[key] = stored
+            if meta.local_lifetime:
+                get_local_cache().set(f'{alias}:{key}', entry, cls._get_cache_local_lifetime(meta, entry))
+
+        for (alias, lifetime), data in values.items():
+            call_cache(alias, 'set_many', data, lifetime)
+
+    def _lookup_cache_entry(self, suffix: str) -> Any:
+        entry: Any = self._get_cache_entry(suffix)
+        self._count_cache_metric(suffix, 'misses' if entry is None else 'hits')
+
+        return entry
+
+    def _observe_cache_metric(self, suffix: str, name: str, value: float) -> None:
+        sink: Optional[CacheMetricsSink] = get_cache_metrics_sink()
+        if sink is not None:
+            sink.observe(self.get_cache_metric_labels(suffix), name, value)
+
+    def _observe_cache_payload(self, suffix: str, entry: Any) -> None:
+        if get_cache_metrics_sink() is None:
+            return
+
+        data: Any = entry.data if isinstance(entry, CacheEnvelope) else entry
+        if isinstance(data, (bytes, str)):
+            size: int = len(data)  # serialized data is measured for free
+        else:
+            # pickling just to measure the size would double the cost of every write, so it's sampled
+            if random.random() >= settings.COMMONTAIL_CACHE_PAYLOAD_SAMPLE_RATE:
+                return
+            try:
+                size = len(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+            except Exception:
+                return  # failing to measure the size shouldn't change behaviour of cache backends which don't pickle
+
+        self._observe_cache_metric(suffix, 'payload_bytes', size)
+
+    def refresh_cache(self, request: Optional[HttpRequest] = None) -> None:
+        """
+        Clears cache and stores fresh data of every suffix returned by get_cache_data_callables
+
+        :param request: request to compute data for
+        :return: None
+        """
+        self.clear_cache()
+        for suffix, data_callable in self.get_cache_data_callables(request).items():
+            self.set_cache_data(suffix, *self._compute_cache_data(suffix, data_callable))
+
+    def _refresh_cache_data_locked(self, suffix: str, data_callable: Callable, token: str) -> None:
+        try:
+            self.set_cache_data(suffix, *self._compute_cache_data(suffix, data_callable))
+        except Exception:
+            logger.exception(f'Background refresh of "{self.get_cache_key(suffix)}" cache entry failed.')
+        finally:
+            self.release_cache_lock(suffix, token)
+            connections.close_all()
+
+    def release_cache_lock(self, suffix: str, token: str) -> None:
+        lock_key: str = self.get_cache_lock_key(suffix)
+        alias: str = get_cache_alias(self.get_cache_meta(suffix).alias, self.get_cache_key(suffix))
+        # not atomic, but lock_timeout limits the damage if the lock expires between these calls
+        if call_cache(alias, 'get', lock_key) == token:
+            caches[alias].delete(lock_key)
+
+    def _remember_cache_prefetched(self, suffix: str, entry: Any) -> None:
+        if getattr(self, '_cache_prefetched', None) is None:
+            self._cache_prefetched = dict()
+        self._cache_prefetched[suffix] = entry
+
+    def schedule_cache_refresh(self, suffix: str, data_callable: Callable) -> None:
+        """
+        Recomputes suffix's data in background unless some other worker is already doing it
+
+        Override this method to use another background execution mechanism, e.g. a task queue.
+        :param suffix: cache suffix
+        :param data_callable: callable returning fresh data
+        :return: None
+        """
+        token: Optional[str] = self.acquire_cache_lock(suffix)
+        if token:
+            get_cache_refresh_executor().submit(self._refresh_cache_data_locked, suffix, data_callable, token)
+
+    def set_cache_data(self, suffix: str, data: Any, dependencies: Optional[Iterable[str]] = None) -> None:
+        """
+        Stores suffix's data in cache
+
+        :param suffix: cache suffix
+        :param data: data to be stored
+        :param dependencies: dependency tokens (see get_cache_dependency_token)
+        :return: None
+        """
+        self._forget_cache_prefetched(suffix)
         meta: CacheSuffixMeta = self.get_cache_meta(suffix)
-        cache: BaseCache = caches[meta.alias]
-        cache.set(self.get_cache_key(suffix), data, meta.lifetime)
+        key: str = self.get_cache_key(suffix)
+        alias: str = get_cache_alias(meta.alias, key)
+        # index is updated first - this way the entry can't be left without it
+        if dependencies and not add_cache_dependencies(alias, key,
+                                                       self._get_cache_indexed_dependencies(suffix, dependencies)):
+            return
+        entry: Any = self._wrap_cache_data(meta, data)
+        stored: Any = self._encode_cache_entry(meta, key, entry)
+        if stored is None:
+            return
+        self._observe_cache_payload(suffix, stored)
+        start: float = time.perf_counter()
+        call_cache(alias, 'set', key, stored, self._get_cache_lifetime(meta, entry, key))
+        self._observe_cache_metric(suffix, 'set_seconds', time.perf_counter() - start)
+        if meta.local_lifetime:
+            get_local_cache().set(f'{alias}:{key}', entry, self._get_cache_local_lifetime(meta, entry))
+
+    @staticmethod
+    def _unwrap_cache_entry(entry: Any) -> Any:
+        data: Any = entry.data if isinstance(entry, CacheEnvelope) else entry
+
+        return None if data is CACHED_NONE else data
+
+    @staticmethod
+    def _with_cache_dependencies(data_callable: Callable, dependencies: List[models.Model]) -> Callable:
+
+        def wrapper():
+            for dependency in dependencies:
+                register_cache_dependency(dependency)
+
+            return data_callable()
+
+        return wrapper
+
+    @staticmethod
+    def _wrap_cache_data(meta: CacheSuffixMeta, data: Any) -> Any:
+        if data is None:
+            data = CACHED_NONE
+        if meta.soft_lifetime:
+            return CacheEnvelope(data, time.time() + meta.soft_lifetime)
+
+        return data
 
 
 class AbstractCacheAwarePage(AbstractCacheAware, Page):
@@ -90,5 +1788,88 @@ class AbstractCacheAwarePage(AbstractCacheAware, Page):
     class Meta:
         abstract = True
 
+    CACHE_POLICIES: Dict[str, int] = {
+        'save': AbstractCacheAware.CACHE_ACTION_CLEAR,
+        'delete': AbstractCacheAware.CACHE_ACTION_CLEAR,
+        'publish': AbstractCacheAware.CACHE_ACTION_REFRESH,
+        'unpublish': AbstractCacheAware.CACHE_ACTION_CLEAR,
+        'move': AbstractCacheAware.CACHE_ACTION_CLEAR,
+    }
+
+    # revision, moderation and locking bookkeeping doesn't change live content
+    cache_ignored_update_fields: FrozenSet[str] = frozenset({
+        COMMENTS_RELATION_NAME, 'draft_title', 'has_unpublished_changes', 'latest_revision_created_at', 'locked',
+        'locked_at', 'locked_by', 'submitted_for_moderation',
+    })
+
+    # if True (with cache_versioned) - keys also include generation counters of every ancestor's subtree, so changes of
+    # an ancestor invalidate all its descendants' cache with O(depth) cache operations (see clear_cache_for_subtree)
+    cache_subtree_versioned: bool = False
+
+    @staticmethod
+    def clear_cache_for_subtree(path: str) -> None:
+        """
+        Invalidates cache of every page in subtree, works only for classes with cache_subtree_versioned set to True
+
+        :param path: treebeard path of subtree's root
+        :return: None
+        """
+        increment_cache_generation(AbstractCacheAwarePage.get_cache_subtree_generation_key(path))
+
+    @classmethod
+    def _get_cache_bulk_instances(cls, queryset: QuerySet, chunk_size: int) -> Iterator['AbstractCacheAwarePage']:
+        # keys of pages depend on primary keys and suffixes of specific classes only - there is no need to load whole
+        # pages, unless their classes override get_cache_prefix. Rows of classes without cache are skipped.
+        rows: Iterator[Tuple[int, int]] = queryset.values_list('pk', 'content_type_id').iterator(chunk_size=chunk_size)
+        while True:
+            chunk: List[Tuple[int, int]] = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+
+            loaded: Dict[type, List[int]] = dict()
+            for pk, content_type_id in chunk:
+                specific_class: Optional[type] = ContentType.objects.get_for_id(content_type_id).model_class()
+                if specific_class is None or not issubclass(specific_class, AbstractCacheAware):
+                    continue
+                if specific_class.get_cache_prefix is AbstractCacheAwarePage.get_cache_prefix:
+                    yield specific_class(pk=pk)
+                else:
+                    loaded.setdefault(specific_class, []).append(pk)
+            for specific_class, pks in loaded.items():
+                yield from specific_class.objects.filter(pk__in=pks)
+
+    def _get_cache_generation_keys(self) -> List[str]:
+        keys: List[str] = super()._get_cache_generation_keys()
+        if self.cache_subtree_versioned:
+            keys.extend(self._get_cache_subtree_generation_keys())
+
+        return keys
+
     def get_cache_prefix(self) -> str:
         return f'page{self.pk}'
+
+    @staticmethod
+    def get_cache_subtree_generation_key(path: str) -> str:
+        return f'commontail_generation__subtree__{path}'
+
+    def _get_cache_subtree_generation_keys(self) -> List[str]:
+        return [
+            self.get_cache_subtree_generation_key(self.path[:i])
+            for i in range(self.steplen, len(self.path) + 1, self.steplen)
+        ]
+
+    def get_cache_version(self, suffix: str) -> str:
+        version: str = super().get_cache_version(suffix)
+        if not self.cache_subtree_versioned:
+            return version
+
+        # there may be a lot of ancestors - their counters are hashed to keep keys short
+        generations: Dict[str, int] = self._get_cache_generations()
+        subtree_version: str = hashlib.md5('.'.join(
+            str(generations[k]) for k in self._get_cache_subtree_generation_keys()
+        ).encode()).hexdigest()[:12]
+
+        return f'{version}.{subtree_version}'
+
+    def refresh_cache(self, request: Optional[HttpRequest] = None) -> None:
+        super().refresh_cache(request if request is not None else make_dummy_request(self))
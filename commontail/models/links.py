@@ -1,9 +1,15 @@
-from collections import OrderedDict
-from typing import Optional, List, Iterable, Union, Tuple
+import hashlib
+import heapq
 
+from collections import namedtuple, OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Optional, List, Iterable, Union, Tuple, Type
+
+from django.apps import apps
 from django.conf import settings
-from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext as _, gettext_lazy as _lazy
 
 from modelcluster.models import ClusterableModel, ParentalKey
@@ -14,12 +20,17 @@ from wagtail.documents.edit_handlers import DocumentChooserPanel
 from wagtail.images import get_image_model_string
 from wagtail.images.edit_handlers import ImageChooserPanel
 
+from .cache import AbstractCacheAwarePage, call_cache, get_cache_generations, increment_cache_generation
 from .utils import AbstractIconAware
 
 
-__all__ = ['AbstractPageLink', 'BaseLinksCollector', 'BaseLinkFields', 'LinkedDocument', 'LinkedImage', 'LinkFields',
-           'LinksOwnerPage', 'PageLinkCategory', 'PageLinkCategoryGroup', 'PageLinkCategoryToPageLinkCategoryGroup',
-           'PageLinksCollector', ]
+__all__ = ['AbstractPageLink', 'BaseLinksCollector', 'BaseLinkFields', 'InheritedPageLink', 'InheritedPageLinksState',
+           'LinkedDocument', 'LinkedImage', 'LinkedPageRecord', 'LinkFields', 'LinksOwnerPage', 'PageLinkCategory',
+           'PageLinkCategoryGroup', 'PageLinkCategoryToPageLinkCategoryGroup', 'PageLinksCollector', ]
+
+
+# lightweight, cheap to pickle, representation of a linked page, used by LinksOwnerPage.get_cached_linked_pages
+LinkedPageRecord = namedtuple('LinkedPageRecord', ['target_id', 'url', 'title', 'category_id'])
 
 
 class BaseLinkFields(models.Model):
@@ -256,7 +267,7 @@ class PageLinkCategory(models.Model):
         if is_new:
             group: PageLinkCategoryGroup = PageLinkCategoryGroup.objects.get(
                 handle=settings.COMMONTAIL_PAGE_LINKS_CATEGORIES_GROUP_DEFAULT_HANDLE)
-            max_order: int = group.category_relations.aggregate(models.Max('sort_order'))['sort_order__max']
+            max_order: int = group.category_relations.aggregate(models.Max('sort_order'))['sort_order__max'] or 0
 
             PageLinkCategoryToPageLinkCategoryGroup.objects.create(
                 category=self,
@@ -375,6 +386,35 @@ class BaseLinksCollector:
 
         return qs
 
+    def _get_budget(self, collected_ids: list, collected: int = 0) -> Optional[int]:
+        # number of items still needed - it's passed to queries as LIMIT
+        return max(self._count - len(collected_ids) - collected, 0) if self._count else None
+
+    @staticmethod
+    def _iterate_limited(qs: models.QuerySet, limit: Optional[int]) -> Iterable:
+        # items may be skipped by the consumer, so the next slice is fetched only if the previous one wasn't enough
+        if not limit:
+            yield from qs
+            return
+
+        offset: int = 0
+        while True:
+            items: list = list(qs[offset:offset + limit])
+            yield from items
+            if len(items) < limit:
+                return
+            offset += limit
+
+    @classmethod
+    def _get_source_filters_excludes(cls, source: str, filters: Optional[dict],
+                                     excludes: Optional[dict]) -> Tuple[Optional[dict], Optional[dict]]:
+        return (
+            cls.source_filters.get(source, None) if not filters else {**cls.source_filters.get(source, dict()),
+                                                                      **filters},
+            cls.source_excludes.get(source, None) if not excludes else {**cls.source_excludes.get(source, dict()),
+                                                                        **excludes},
+        )
+
     def _create_collect_qs(self, o: object, collected_ids: list, filters: dict, excludes: dict,
                            select_related: Iterable) -> models.QuerySet:
         qs: models.QuerySet = getattr(o, self._relation_name).all()
@@ -432,10 +472,11 @@ class BaseLinksCollector:
 
     def collect_generic(self, o: object, collected_ids: list, filters: dict, excludes: dict,
                         select_related: Iterable) -> list:
-        if hasattr(0, self._relation_name):
-            return list(self._create_collect_qs(o, collected_ids, filters, excludes, select_related))
-        else:
+        if not hasattr(o, self._relation_name) or self._get_budget(collected_ids) == 0:
             return []
+        qs: models.QuerySet = self._create_collect_qs(o, collected_ids, filters, excludes, select_related)
+
+        return list(qs[:self._get_budget(collected_ids)] if self._count else qs)
 
     def collect_generic_multiple(self, o_list: list, collected_ids: list, filters: dict, excludes: dict,
                                  select_related: Iterable) -> list:
@@ -443,8 +484,9 @@ class BaseLinksCollector:
         result: list = []
 
         for c in filter(lambda x: hasattr(x, self._relation_name), o_list):
-            c_list = list(self._create_collect_qs(c, collected_ids + current_collected_ids, filters, excludes,
-                                                  select_related))
+            c_qs: models.QuerySet = self._create_collect_qs(c, collected_ids + current_collected_ids, filters, excludes,
+                                                            select_related)
+            c_list = list(c_qs[:self._get_budget(collected_ids, len(result))] if self._count else c_qs)
             result.extend(c_list)
 
             if self._count and (len(collected_ids) + len(result)) >= self._count:
@@ -455,16 +497,47 @@ class BaseLinksCollector:
         return result
 
     def exists(self, filters: dict = None, excludes: dict = None) -> bool:
-        return any((getattr(self, f'exists_in_{source}')(
-            filters=self.source_filters.get(source, None) if not filters else {
-                **self.source_filters.get(source, dict()),
-                **filters
-            },
-            excludes=self.source_excludes.get(source, None) if not excludes else {
-                **self.source_excludes.get(source, dict()),
-                **excludes
-            },
-        ) for source in self.collect_sources))
+        # querysets of sources with exists_querysets_in_* methods are checked at once, with a single query
+        querysets: List[models.QuerySet] = []
+        for source in self.collect_sources:
+            kwargs: dict = {
+                'filters': self.source_filters.get(source, None) if not filters else {
+                    **self.source_filters.get(source, dict()),
+                    **filters
+                },
+                'excludes': self.source_excludes.get(source, None) if not excludes else {
+                    **self.source_excludes.get(source, dict()),
+                    **excludes
+                },
+            }
+            get_querysets: Optional[Callable[..., List[models.QuerySet]]] = getattr(
+                self, f'exists_querysets_in_{source}', None)
+            if get_querysets is not None:
+                querysets.extend(get_querysets(**kwargs))
+            elif getattr(self, f'exists_in_{source}')(**kwargs):
+                return True
+
+        return self.exists_any(querysets)
+
+    @staticmethod
+    def exists_any(querysets: Iterable[models.QuerySet]) -> bool:
+        """
+        Checks if any of querysets has rows with one EXISTS query over their union
+
+        :param querysets: querysets to check
+        :return: True if any of querysets isn't empty
+        """
+        values: List[models.QuerySet] = []
+        for qs in querysets:
+            if not isinstance(qs, models.QuerySet):  # in-memory relations of modelcluster's unsaved objects
+                if qs.exists():
+                    return True
+                continue
+            values.append(qs.values('pk'))
+        if not values:
+            return False
+
+        return (values[0].union(*values[1:], all=True) if len(values) > 1 else values[0]).exists()
 
     def exists_generic(self, o: object, filters: dict, excludes: dict):
         return self._apply_filters_excludes(getattr(o, self._relation_name), filters, excludes).exists()
@@ -476,7 +549,13 @@ class BaseLinksCollector:
         ))
 
     def exists_in_self(self, filters: dict, excludes: dict) -> bool:
-        return hasattr(self._obj, self._relation_name) and self.exists_generic(self._obj, filters, excludes)
+        return self.exists_any(self.exists_querysets_in_self(filters, excludes))
+
+    def exists_querysets_in_self(self, filters: dict, excludes: dict) -> List[models.QuerySet]:
+        if not hasattr(self._obj, self._relation_name):
+            return []
+
+        return [self._apply_filters_excludes(getattr(self._obj, self._relation_name).all(), filters, excludes)]
 
 
 class PageLinksCollector(BaseLinksCollector):
@@ -494,42 +573,240 @@ class PageLinksCollector(BaseLinksCollector):
         self._include_descendants = include_descendants
         self._ancestors_depth = ancestors_depth
 
-    def _get_ancestors_qs(self):
-        return Page.objects.live().ancestor_of(self._obj).type(LinksOwnerPage).specific()
+    def _get_ancestors_owners(self) -> Optional[dict]:
+        if self._ancestors_depth is None:
+            return None
+        obj: Page = self._obj
+        ancestors: models.QuerySet = Page.objects.live().filter(
+            path__in=[obj.path[:i] for i in range(obj.steplen, len(obj.path), obj.steplen)]
+        ).type(LinksOwnerPage)
+        owners: dict = {'in': ancestors.values('pk')}
+        if self._ancestors_depth:
+            # depth of the farthest of ancestors_depth nearest ancestors - all of them if there are fewer ancestors
+            depth: int = self._ancestors_depth
+            owners['depth__gte'] = Coalesce(
+                models.Subquery(ancestors.order_by('-depth').values('depth')[depth - 1:depth]), models.Value(0)
+            )
+
+        return owners
+
+    def _create_owned_collect_qs(self, link_model: Type[models.Model], owner_field: str, owners: dict, reverse: bool,
+                                 collected_ids: list, filters: dict, excludes: dict,
+                                 select_related: Iterable) -> models.QuerySet:
+        qs: models.QuerySet = link_model.objects.filter(
+            **{f'{owner_field}__{k}': v for k, v in owners.items()}
+        ).annotate(
+            links_owner_path=models.F(f'{owner_field}__path')
+        ).order_by(
+            '-links_owner_path' if reverse else 'links_owner_path', *link_model._meta.ordering, 'pk'
+        )
+        if select_related:
+            qs = qs.select_related(*select_related)
+        if collected_ids:
+            qs = qs.exclude(**{f'{self._id_field}__in': collected_ids})
+
+        return self._apply_filters_excludes(qs, filters, excludes)
+
+    def _create_owned_querysets(self, owners: dict, filters: dict, excludes: dict) -> List[models.QuerySet]:
+        return [
+            self._apply_filters_excludes(link_model.objects.filter(
+                **{f'{owner_field}__{k}': v for k, v in owners.items()}
+            ), filters, excludes)
+            for link_model, owner_field in self.get_link_relations(self._relation_name)
+        ]
+
+    def _collect_owned(self, owners: dict, reverse: bool, collected_ids: list, filters: dict, excludes: dict,
+                       select_related: Iterable) -> list:
+        # links of all owners are fetched with one query per link model (usually it's a single query), limited by
+        # the remaining budget. Querysets are ordered by owner's path, so every owner's links form a contiguous group -
+        # links already collected from previous owners are skipped, as collect_generic_multiple does with a query per
+        # owner.
+        budget: Optional[int] = self._get_budget(collected_ids)
+        if budget == 0:
+            return []
+        querysets: List[Iterable] = [
+            self._iterate_limited(self._create_owned_collect_qs(
+                link_model, owner_field, owners, reverse, collected_ids, filters, excludes, select_related
+            ), budget)
+            for link_model, owner_field in self.get_link_relations(self._relation_name)
+        ]
+        if not querysets:
+            return []
+        links: Iterable = querysets[0] if len(querysets) == 1 else heapq.merge(
+            *querysets, key=lambda link: link.links_owner_path, reverse=reverse
+        )
+        result: list = []
+        previous_ids: set = set()
+        owner_ids: set = set()
+        owner_path: Optional[str] = None
+
+        for link in links:
+            if link.links_owner_path != owner_path:
+                previous_ids.update(owner_ids)
+                owner_ids = set()
+                owner_path = link.links_owner_path
+
+            link_id = getattr(link, self._id_field)
+            if link_id in previous_ids:
+                continue
+            result.append(link)
+            owner_ids.add(link_id)
+            if budget and len(result) >= budget:
+                break
+
+        return result
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_link_relations(relation_name: str) -> List[Tuple[Type[models.Model], str]]:
+        """
+        Returns models of links, related to LinksOwnerPage subclasses with relation_name
+
+        :param relation_name: name of the reverse relation
+        :return: list of tuples with link models and names of their foreign keys to owner pages
+        """
+        result: List[Tuple[Type[models.Model], str]] = []
+        for model in apps.get_models():
+            if not issubclass(model, LinksOwnerPage):
+                continue
+            try:
+                relation = model._meta.get_field(relation_name)
+            except FieldDoesNotExist:
+                continue
+            if relation.one_to_many and (relation.related_model, relation.field.name) not in result:
+                result.append((relation.related_model, relation.field.name))
+
+        return result
 
-    def _get_descendants_qs(self):
-        return Page.objects.live().descendant_of(self._obj).type(LinksOwnerPage).specific()
+    def _get_descendants_owners(self) -> Optional[dict]:
+        if not self._include_descendants:
+            return None
+
+        return {'in': Page.objects.live().descendant_of(self._obj).type(LinksOwnerPage).values('pk')}
 
     def collect_from_ancestors(self, collected_ids: list, filters: dict, excludes: dict,
                                select_related: Iterable) -> list:
-        if self._ancestors_depth is None:
+        owners: Optional[dict] = self._get_ancestors_owners()
+        if owners is None:
             return []
-        ancestors = self._get_ancestors_qs()
 
-        return self.collect_generic_multiple(
-            ancestors if not self._ancestors_depth else ancestors.reverse()[:self._ancestors_depth],
-            collected_ids, filters, excludes, select_related
-        )
+        # nearest ancestors go first if depth is limited, root's descendants otherwise
+        return self._collect_owned(owners, bool(self._ancestors_depth), collected_ids, filters, excludes,
+                                   select_related)
 
     def collect_from_descendants(self, collected_ids: list, filters: dict, excludes: dict,
                                  select_related: Iterable) -> list:
-        if not self._include_descendants:
+        owners: Optional[dict] = self._get_descendants_owners()
+        if owners is None:
             return []
-        descendants = self._get_descendants_qs()
 
-        return self.collect_generic_multiple(descendants, collected_ids, filters, excludes, select_related)
+        return self._collect_owned(owners, False, collected_ids, filters, excludes, select_related)
+
+    @classmethod
+    def collect_bulk(cls, objects: Iterable['LinksOwnerPage'], relation_name: str, id_field: str,
+                     count: int = None, include_descendants: bool = False, ancestors_depth: Optional[int] = 2,
+                     filters: dict = None, excludes: dict = None,
+                     select_related: Union[str, Iterable] = None) -> Dict[int, list]:
+        """
+        Collects links of many pages with a constant number of queries
+
+        Ancestors, shared by pages, are selected once, and links of all pages, ancestors and descendants are fetched
+        with one query per source and link model. Links are deduplicated and limited in python.
+        :param objects: pages
+        :param relation_name: name of the reverse relation
+        :param id_field: field to deduplicate links by
+        :param count: maximum number of links per page
+        :param include_descendants: if True - links of descendants are collected too
+        :param ancestors_depth: number of the nearest ancestors to inherit links from, all if 0, none if None
+        :param filters: filters of links
+        :param excludes: excludes of links
+        :param select_related: related fields to select with links
+        :return: dict with pages' primary keys and lists of links, same as returned by collect with flat set to True
+        """
+        if select_related and type(select_related) == str:
+            select_related = [select_related]
+        pages: List[Page] = list(objects)
+        relations: List[Tuple[Type[models.Model], str]] = cls.get_link_relations(relation_name)
 
-    def exists_in_ancestors(self, filters: dict, excludes: dict) -> bool:
-        if self._ancestors_depth is None:
-            return False
+        def _fetch(source: str, owner_pks: Iterable[int]) -> Dict[int, list]:
+            result: Dict[int, list] = dict()
+            owner_pks = list(owner_pks)
+            if not owner_pks:
+                return result
+            for link_model, owner_field in relations:
+                qs: models.QuerySet = link_model.objects.filter(
+                    **{f'{owner_field}__in': owner_pks}
+                ).order_by(*link_model._meta.ordering, 'pk')
+                if select_related:
+                    qs = qs.select_related(*select_related)
+                attname: str = link_model._meta.get_field(owner_field).attname
+                for link in cls._apply_filters_excludes(qs, *cls._get_source_filters_excludes(source, filters,
+                                                                                              excludes)):
+                    result.setdefault(getattr(link, attname), []).append(link)
+
+            return result
+
+        def _get_owners(owners: List[Tuple[int, str]], page: Page, descendants: bool) -> List[int]:
+            if descendants:
+                return [pk for pk, path in owners if path.startswith(page.path) and len(path) > len(page.path)]
+            ancestors: List[int] = [
+                pk for pk, path in owners if page.path.startswith(path) and len(path) < len(page.path)
+            ]
+            # nearest ancestors go first if depth is limited, root's descendants otherwise
+            return ancestors[::-1][:ancestors_depth] if ancestors_depth else ancestors
+
+        owners_qs: models.QuerySet = Page.objects.live().type(LinksOwnerPage).order_by('path')
+        ancestors: List[Tuple[int, str]] = []
+        if ancestors_depth is not None and pages:
+            ancestors = list(owners_qs.filter(path__in={
+                p.path[:i] for p in pages for i in range(p.steplen, len(p.path), p.steplen)
+            }).values_list('pk', 'path'))
+        descendants: List[Tuple[int, str]] = []
+        if include_descendants and pages:
+            condition: models.Q = models.Q()
+            for p in pages:
+                condition |= models.Q(path__startswith=p.path, depth__gt=p.depth)
+            descendants = list(owners_qs.filter(condition).values_list('pk', 'path'))
+
+        links: Dict[str, Dict[int, list]] = {
+            'self': _fetch('self', (p.pk for p in pages)),
+            'ancestors': _fetch('ancestors', (pk for pk, _ in ancestors)),
+            'descendants': _fetch('descendants', (pk for pk, _ in descendants)),
+        }
+
+        collected: Dict[int, list] = dict()
+        for page in pages:
+            page_links: list = list(links['self'].get(page.pk, []))
+            for source, owners in (('ancestors', ancestors), ('descendants', descendants)):
+                # the same rules as of _collect_owned - links collected before are skipped
+                previous_ids: set = {getattr(link, id_field) for link in page_links}
+                for owner in _get_owners(owners, page, source == 'descendants'):
+                    owner_ids: set = set()
+                    for link in links[source].get(owner, []):
+                        link_id = getattr(link, id_field)
+                        if link_id not in previous_ids:
+                            page_links.append(link)
+                            owner_ids.add(link_id)
+                    previous_ids.update(owner_ids)
+            collected[page.pk] = page_links[:count] if count else page_links
+
+        return collected
 
-        return self.exists_generic_multiple(self._get_ancestors_qs(), filters, excludes)
+    def exists_in_ancestors(self, filters: dict, excludes: dict) -> bool:
+        return self.exists_any(self.exists_querysets_in_ancestors(filters, excludes))
 
     def exists_in_descendants(self, filters: dict, excludes: dict) -> bool:
-        if not self._include_descendants:
-            return False
+        return self.exists_any(self.exists_querysets_in_descendants(filters, excludes))
 
-        return self.exists_generic_multiple(self._get_descendants_qs(), filters, excludes)
+    def exists_querysets_in_ancestors(self, filters: dict, excludes: dict) -> List[models.QuerySet]:
+        owners: Optional[dict] = self._get_ancestors_owners()
+
+        return [] if owners is None else self._create_owned_querysets(owners, filters, excludes)
+
+    def exists_querysets_in_descendants(self, filters: dict, excludes: dict) -> List[models.QuerySet]:
+        owners: Optional[dict] = self._get_descendants_owners()
+
+        return [] if owners is None else self._create_owned_querysets(owners, filters, excludes)
 
 
 class LinksOwnerPage(Page):
@@ -539,6 +816,99 @@ class LinksOwnerPage(Page):
 
     links_collector_class = PageLinksCollector
 
+    @staticmethod
+    def clear_linked_pages_cache(path: Optional[str] = None) -> None:
+        """
+        Invalidates results of get_cached_linked_pages
+
+        :param path: treebeard path of a page, which links or live status have changed - results of the page, its
+        descendants and (with include_descendants) its ancestors are invalidated. Results of every page are
+        invalidated if None.
+        :return: None
+        """
+        for key in LinksOwnerPage.get_linked_pages_invalidation_keys(path):
+            increment_cache_generation(key)
+
+    @staticmethod
+    def get_linked_pages_invalidation_keys(path: Optional[str] = None) -> List[str]:
+        """
+        Returns generation keys, which are incremented by clear_linked_pages_cache
+
+        :param path: treebeard path of a page or None
+        :return: list of keys
+        """
+        if path is None:
+            return [LinksOwnerPage.get_linked_pages_generation_key()]
+
+        # results of the page and its inheritors use subtree counters of their ancestors, results with descendants -
+        # also descendants' counter of the page itself
+        return [AbstractCacheAwarePage.get_cache_subtree_generation_key(path)] + [
+            LinksOwnerPage.get_linked_pages_descendants_generation_key(path[:i])
+            for i in range(Page.steplen, len(path) + 1, Page.steplen)
+        ]
+
+    def _get_linked_pages_generation_keys(self, include_descendants: bool) -> List[str]:
+        keys: List[str] = [self.get_linked_pages_generation_key()] + [
+            AbstractCacheAwarePage.get_cache_subtree_generation_key(self.path[:i])
+            for i in range(self.steplen, len(self.path) + 1, self.steplen)
+        ]
+        if include_descendants:
+            keys.append(self.get_linked_pages_descendants_generation_key(self.path))
+
+        return keys
+
+    @staticmethod
+    def _get_linked_pages_cache_value(value) -> str:
+        if isinstance(value, models.Model):
+            return f'{value._meta.label_lower}:{value.pk}'
+        if isinstance(value, models.QuerySet):
+            return str(value.query)
+        if isinstance(value, dict):
+            return repr(sorted((k, LinksOwnerPage._get_linked_pages_cache_value(v)) for k, v in value.items()))
+        if isinstance(value, (list, tuple, set)):
+            return repr([LinksOwnerPage._get_linked_pages_cache_value(v) for v in value])
+
+        return repr(value)
+
+    def get_cached_linked_pages(self, handle: Union[PageLinkCategoryGroup, str] = None, count: int = None,
+                                filters: dict = None, excludes: dict = None, live_only: bool = True,
+                                group: bool = False, include_descendants: bool = False,
+                                ancestors_depth: Optional[int] = 3, **kwargs) -> Union[dict, list]:
+        """
+        Returns get_linked_pages result as LinkedPageRecord tuples, stored in COMMONTAIL_PAGE_LINKS_CACHE_ALIAS cache
+
+        Cache is invalidated by changes of links and publishing events of their owners (for owners' subtrees), by
+        publishing events of link targets and their ancestors (for owners linking to them) and by changes of
+        categories and their groups (for every page, see clear_linked_pages_cache).
+        :return: list of records or dict with categories' titles and lists of records if group is True
+        """
+        # ancestors' counters are hashed to keep keys short
+        generation_keys: List[str] = self._get_linked_pages_generation_keys(include_descendants)
+        generations: Dict[str, int] = get_cache_generations(generation_keys)
+        generation: str = hashlib.md5('.'.join(str(generations[k]) for k in generation_keys).encode()).hexdigest()[:12]
+        parameters: str = self._get_linked_pages_cache_value([
+            handle, count, filters, excludes, live_only, group, include_descendants, ancestors_depth, kwargs
+        ])
+        key: str = f'commontail_linked_pages__{self.pk}__{generation}__{hashlib.md5(parameters.encode()).hexdigest()}'
+        alias: str = settings.COMMONTAIL_PAGE_LINKS_CACHE_ALIAS
+
+        result: Optional[Union[dict, list]] = call_cache(alias, 'get', key)
+        if result is not None:
+            return result
+
+        links: list = self.get_linked_pages(handle, count, filters=filters, excludes=excludes, select_related='target',
+                                            live_only=live_only, include_descendants=include_descendants,
+                                            ancestors_depth=ancestors_depth, **kwargs)
+        result = [LinkedPageRecord(link.target_id, link.target.url, link.target.title, link.category_id)
+                  for link in links]
+        if group:
+            result = self._group_linked_pages(
+                self._get_linked_page_categories(self._get_linked_page_filters(handle, None, live_only)[0]), result
+            )
+        call_cache(alias, 'set', key, result, settings.COMMONTAIL_PAGE_LINKS_CACHE_LIFETIME)
+
+        return result
+
     @staticmethod
     def _get_linked_page_filters(handle: Union[PageLinkCategoryGroup, str, None], filters: Optional[dict],
                                  live_only: bool) -> Tuple[PageLinkCategoryGroup, dict]:
@@ -577,11 +947,20 @@ class LinksOwnerPage(Page):
                          excludes: dict = None, select_related: Union[str, Iterable] = None, live_only: bool = True,
                          group: bool = False, include_descendants: bool = False,
                          ancestors_depth: Optional[int] = 3, **kwargs) -> Union[dict, list]:
-        categories_group, linked_page_filters = self._get_linked_page_filters(handle, filters, live_only)
-
         if select_related is None:
             select_related = 'target'
 
+        if settings.COMMONTAIL_PAGE_LINKS_MATERIALIZED and (flat or group) and not filters and not excludes \
+                and not include_descendants and not kwargs \
+                and ancestors_depth == settings.COMMONTAIL_PAGE_LINKS_MATERIALIZED_ANCESTORS_DEPTH:
+            materialized: Union[dict, list, None] = self._get_materialized_linked_pages(
+                handle, count, select_related, live_only, group
+            )
+            if materialized is not None:
+                return materialized
+
+        categories_group, linked_page_filters = self._get_linked_page_filters(handle, filters, live_only)
+
         collected_links = self.links_collector_class(
             self, relation_name=settings.COMMONTAIL_PAGE_LINKS_RELATION_NAME, id_field='target_id', count=count,
             include_descendants=include_descendants, ancestors_depth=ancestors_depth, **kwargs
@@ -593,9 +972,84 @@ class LinksOwnerPage(Page):
         if not group:
             return collected_links
 
-        categories = categories_group.category_relations.all().select_related('category').values(
-            'category__pk', 'category__title')
+        return self._group_linked_pages(self._get_linked_page_categories(categories_group), collected_links)
 
+    def _get_materialized_linked_pages(self, handle: Union[PageLinkCategoryGroup, str, None], count: Optional[int],
+                                       select_related: Union[str, Iterable], live_only: bool,
+                                       group: bool) -> Union[dict, list, None]:
+        if handle is None:
+            handle = settings.COMMONTAIL_PAGE_LINKS_CATEGORIES_GROUP_DEFAULT_HANDLE
+        categories_group: Optional[PageLinkCategoryGroup] = handle if isinstance(handle, PageLinkCategoryGroup) \
+            else None
+        if group and categories_group is None:
+            categories_group = self._get_linked_page_filters(handle, None, live_only)[0]
+
+        qs: models.QuerySet = InheritedPageLink.objects.filter(page_id=self.pk).select_related(
+            *([select_related] if type(select_related) == str else select_related)
+        )
+        # the group is joined by handle, so without grouping it's a single query
+        qs = qs.filter(group=categories_group) if categories_group is not None else qs.filter(group__handle=handle)
+        if live_only:
+            qs = qs.filter(target__live=True)
+        if count:
+            qs = qs[:count]
+        links: list = list(qs)
+        if not links:
+            # pages, which haven't been materialized yet, are served by the collector
+            if not InheritedPageLinksState.objects.filter(page_id=self.pk).exists():
+                return None
+            if categories_group is None and not PageLinkCategoryGroup.objects.filter(handle=handle).exists():
+                raise ValueError(f'Unknown link category group with "{handle}" handle.')
+
+        if not group:
+            return links
+
+        return self._group_linked_pages(self._get_linked_page_categories(categories_group), links)
+
+    @classmethod
+    def get_linked_pages_bulk(cls, pages: Iterable['LinksOwnerPage'], handle: Union[PageLinkCategoryGroup, str] = None,
+                              count: int = None, filters: dict = None, excludes: dict = None,
+                              select_related: Union[str, Iterable] = None, live_only: bool = True, group: bool = False,
+                              include_descendants: bool = False,
+                              ancestors_depth: Optional[int] = 3) -> Dict[int, Union[dict, list]]:
+        """
+        Returns linked pages of many pages at once with a constant number of queries, see get_linked_pages
+
+        :return: dict with pages' primary keys and results of get_linked_pages with flat set to True
+        """
+        categories_group, linked_page_filters = cls._get_linked_page_filters(handle, filters, live_only)
+
+        if select_related is None:
+            select_related = 'target'
+
+        collected: Dict[int, list] = cls.links_collector_class.collect_bulk(
+            pages, relation_name=settings.COMMONTAIL_PAGE_LINKS_RELATION_NAME, id_field='target_id', count=count,
+            include_descendants=include_descendants, ancestors_depth=ancestors_depth, filters=linked_page_filters,
+            excludes=excludes, select_related=select_related
+        )
+
+        if not group:
+            return collected
+
+        categories: List[dict] = cls._get_linked_page_categories(categories_group)
+
+        return {pk: cls._group_linked_pages(categories, links) for pk, links in collected.items()}
+
+    @staticmethod
+    def get_linked_pages_generation_key() -> str:
+        return 'commontail_generation__linked_pages'
+
+    @staticmethod
+    def get_linked_pages_descendants_generation_key(path: str) -> str:
+        return f'commontail_generation__linked_pages_descendants__{path}'
+
+    @staticmethod
+    def _get_linked_page_categories(categories_group: PageLinkCategoryGroup) -> List[dict]:
+        return list(categories_group.category_relations.all().select_related('category').values(
+            'category__pk', 'category__title'))
+
+    @staticmethod
+    def _group_linked_pages(categories: List[dict], collected_links: list) -> OrderedDict:
         categories_map = {cr['category__pk']: cr['category__title'] for cr in categories}
 
         result = OrderedDict(((cr['category__title'], []) for cr in categories))
@@ -628,3 +1082,205 @@ class LinksOwnerPage(Page):
             filters=linked_page_filters,
             excludes=excludes
         )
+
+
+class InheritedPageLink(models.Model):
+    """
+    Materialized result of LinksOwnerPage.get_linked_pages for every page and category group
+
+    Rows take inheritance (with COMMONTAIL_PAGE_LINKS_MATERIALIZED_ANCESTORS_DEPTH), and deduplication by target into
+    account, live status of targets is checked while reading. Rows are rebuilt by signal handlers if
+    COMMONTAIL_PAGE_LINKS_MATERIALIZED is True, full rebuild is done by commontail_rebuild_inherited_links command.
+    Pages without InheritedPageLinksState are served by the collector.
+    """
+
+    class Meta:
+        verbose_name = _lazy('inherited page-to-page link')
+        verbose_name_plural = _lazy('inherited page-to-page links')
+        ordering = ['sort_order']
+        indexes = [
+            models.Index(fields=['page', 'group', 'sort_order']),
+        ]
+
+    page = models.ForeignKey(
+        'wagtailcore.Page',
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_lazy('page'),
+    )
+
+    group = models.ForeignKey(
+        PageLinkCategoryGroup,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_lazy('group'),
+    )
+
+    sort_order = models.IntegerField(
+        verbose_name=_lazy('sort order'),
+    )
+
+    category = models.ForeignKey(
+        PageLinkCategory,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_lazy('category'),
+    )
+
+    target = models.ForeignKey(
+        'wagtailcore.Page',
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_lazy('target page'),
+    )
+
+    def __str__(self):
+        return f'{self.category.title}: {self.target.title}'
+
+    @staticmethod
+    def _get_pages_queryset(path: Optional[str]) -> models.QuerySet:
+        pages_qs: models.QuerySet = Page.objects.type(LinksOwnerPage)
+
+        return pages_qs.filter(path__startswith=path) if path is not None else pages_qs
+
+    @classmethod
+    def count_pages(cls, path: Optional[str] = None) -> int:
+        """
+        Returns number of pages, which rows are rebuilt by rebuild with the same path
+
+        :param path: treebeard path of subtree's root, all pages are counted if None
+        :return: number of pages
+        """
+        return cls._get_pages_queryset(path).count()
+
+    @classmethod
+    def invalidate(cls, path: Optional[str] = None) -> None:
+        """
+        Deletes rows and states of pages in subtree, so they're served by the collector until rebuilt
+
+        :param path: treebeard path of subtree's root, all pages are invalidated if None
+        """
+        rows_qs: models.QuerySet = cls.objects.all()
+        states_qs: models.QuerySet = InheritedPageLinksState.objects.all()
+        if path is not None:
+            rows_qs = rows_qs.filter(page__path__startswith=path)
+            states_qs = states_qs.filter(page__path__startswith=path)
+        with transaction.atomic():
+            states_qs.delete()
+            rows_qs.delete()
+
+    @classmethod
+    def rebuild(cls, path: Optional[str] = None, chunk_size: Optional[int] = None,
+                groups: Optional[Iterable[int]] = None) -> int:
+        """
+        Rebuilds rows of LinksOwnerPage pages
+
+        :param path: treebeard path of subtree's root, all pages are rebuilt if None
+        :param chunk_size: number of pages rebuilt at once, COMMONTAIL_PAGE_LINKS_MATERIALIZED_CHUNK_SIZE if None
+        :param groups: primary keys of category groups to rebuild, states of pages aren't changed if set. All groups
+        are rebuilt if None.
+        :return: number of rebuilt pages
+        """
+        chunk_size = chunk_size or settings.COMMONTAIL_PAGE_LINKS_MATERIALIZED_CHUNK_SIZE
+        groups_qs: models.QuerySet = PageLinkCategoryGroup.objects.prefetch_related('category_relations')
+        if groups is not None:
+            groups_qs = groups_qs.filter(pk__in=list(groups))
+        categories_groups: List[Tuple[PageLinkCategoryGroup, List[int]]] = [
+            (g, [cr.category_id for cr in g.category_relations.all()]) for g in groups_qs
+        ]
+        if groups is not None and not categories_groups:
+            return 0
+
+        count: int = 0
+        chunk: List[Page] = []
+        for page in cls._get_pages_queryset(path).order_by('path').iterator(chunk_size=chunk_size):
+            chunk.append(page)
+            if len(chunk) == chunk_size:
+                count += cls._rebuild_pages(chunk, categories_groups, groups is None)
+                chunk = []
+        if chunk:
+            count += cls._rebuild_pages(chunk, categories_groups, groups is None)
+
+        return count
+
+    @classmethod
+    def _rebuild_pages(cls, pages: List[Page], categories_groups: List[Tuple[PageLinkCategoryGroup, List[int]]],
+                       with_states: bool) -> int:
+        rows: List[InheritedPageLink] = []
+        for categories_group, categories_ids in categories_groups:
+            if not categories_ids:
+                continue
+            collected: Dict[int, list] = LinksOwnerPage.links_collector_class.collect_bulk(
+                pages, settings.COMMONTAIL_PAGE_LINKS_RELATION_NAME, 'target_id',
+                ancestors_depth=settings.COMMONTAIL_PAGE_LINKS_MATERIALIZED_ANCESTORS_DEPTH,
+                filters={'category_id__in': categories_ids}
+            )
+            rows.extend(
+                cls(page_id=pk, group=categories_group, sort_order=i, category_id=link.category_id,
+                    target_id=link.target_id)
+                for pk, links in collected.items() for i, link in enumerate(links)
+            )
+
+        pks: List[int] = [p.pk for p in pages]
+        with transaction.atomic():
+            rows_qs: models.QuerySet = cls.objects.filter(page__in=pks)
+            if not with_states:
+                rows_qs = rows_qs.filter(group__in=[g for g, _ in categories_groups])
+            rows_qs.delete()
+            cls.objects.bulk_create(rows)
+            if with_states:
+                hashes: Dict[int, str] = InheritedPageLinksState.get_links_hashes(pks)
+                InheritedPageLinksState.objects.filter(page__in=pks).delete()
+                InheritedPageLinksState.objects.bulk_create(
+                    InheritedPageLinksState(page_id=p.pk, live=p.live, links_hash=hashes[p.pk]) for p in pages
+                )
+
+        return len(pages)
+
+
+class InheritedPageLinksState(models.Model):
+    """
+    State of a page, which InheritedPageLink rows were built with
+
+    Live status matters for inheritance, hash of own links is used to skip rebuilds, when links are saved without
+    changes (e.g. modelcluster saves every child object on publishing).
+    """
+
+    class Meta:
+        verbose_name = _lazy('inherited page-to-page links state')
+        verbose_name_plural = _lazy('inherited page-to-page links states')
+
+    page = models.OneToOneField(
+        'wagtailcore.Page',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name=_lazy('page'),
+    )
+
+    live = models.BooleanField(
+        verbose_name=_lazy('live'),
+    )
+
+    links_hash = models.CharField(
+        max_length=32,
+        verbose_name=_lazy('hash of own links'),
+    )
+
+    @staticmethod
+    def get_links_hashes(pks: Iterable[int]) -> Dict[int, str]:
+        """
+        Returns hashes of fields of own links, which InheritedPageLink rows depend on
+
+        :param pks: primary keys of LinksOwnerPage pages
+        :return: dictionary with page's primary key as a key and hash as a value
+        """
+        pks = list(pks)
+        links: Dict[int, list] = {pk: [] for pk in pks}
+        for link_model, owner_field in PageLinksCollector.get_link_relations(
+                settings.COMMONTAIL_PAGE_LINKS_RELATION_NAME):
+            for owner_id, *fields in link_model.objects.filter(**{f'{owner_field}__in': pks}).values_list(
+                    f'{owner_field}_id', 'target_id', 'category_id', 'inherit', 'sort_order'):
+                links[owner_id].append((link_model._meta.label_lower, *fields))
+
+        return {pk: hashlib.md5(repr(sorted(page_links)).encode()).hexdigest() for pk, page_links in links.items()}
@@ -7,9 +7,11 @@ from django.conf import settings
 from django.http import HttpRequest
 from django.utils.translation import to_locale
 
+from wagtail.core.models import Site
+from wagtail.images import get_image_model_string
 from wagtail.images.models import AbstractImage, AbstractRendition
 
-from .cache import AbstractCacheAwarePage, CacheSuffixMeta
+from .cache import AbstractCacheAwarePage, CacheSuffixMeta, get_cache_serializer, register_cache_dependency
 from .settings import get_logo
 
 
@@ -42,6 +44,7 @@ def get_opengraph_image_data(image: Optional[AbstractImage]) -> Optional[Dict[st
     if not image:
         return
 
+    register_cache_dependency(image)
     rendition: AbstractRendition = image.get_rendition('original')
 
     return {
@@ -164,7 +167,9 @@ class OpenGraphPageProvider(AbstractOpenGraphProvider):
         if not image_data:
             return
 
-        image_data[''] = f"{data_object.get_site().root_url}{image_data['']}"  # convert relative URL to absolute
+        site: Site = data_object.get_site()
+        register_cache_dependency(site)
+        image_data[''] = f"{site.root_url}{image_data['']}"  # convert relative URL to absolute
 
         return image_data
 
@@ -191,7 +196,10 @@ class OpenGraphPageProvider(AbstractOpenGraphProvider):
         return to_locale(settings.LANGUAGE_CODE)
 
     def get_site_name(self, data_object: 'OpenGraphAwarePage', request: HttpRequest) -> str:
-        return data_object.get_site().site_name
+        site: Site = data_object.get_site()
+        register_cache_dependency(site)
+
+        return site.site_name
 
     def get_article(self, data_object: 'OpenGraphAwarePage', request: HttpRequest) -> Dict[str, Any]:
         result = dict()
@@ -239,11 +247,28 @@ class OpenGraphAwarePage(OpenGraphAware, AbstractCacheAwarePage):
         abstract = True
 
     cache_suffixes = AbstractCacheAwarePage.cache_suffixes + {
-        OPENGRAPH_CACHE_SUFFIX: CacheSuffixMeta('default', settings.COMMONTAIL_OPENGRAPH_CACHE_LIFETIME)
+        OPENGRAPH_CACHE_SUFFIX: CacheSuffixMeta(
+            'default', settings.COMMONTAIL_OPENGRAPH_CACHE_LIFETIME,
+            soft_lifetime=settings.COMMONTAIL_OPENGRAPH_CACHE_SOFT_LIFETIME,
+            lifetime_jitter=settings.COMMONTAIL_OPENGRAPH_CACHE_LIFETIME_JITTER,
+            serializer=get_cache_serializer(settings.COMMONTAIL_OPENGRAPH_CACHE_SERIALIZER),
+            dependency_models=(*settings.COMMONTAIL_CACHE_DEPENDENCY_MODELS, get_image_model_string()),
+        )
     }
 
     opengraph_provider: Optional[AbstractOpenGraphProvider] = OpenGraphPageProvider()
 
+    def get_cache_data_callables(self, request: Optional[HttpRequest] = None) -> Dict[str, Callable]:
+        return {
+            **super().get_cache_data_callables(request),
+            OPENGRAPH_CACHE_SUFFIX: lambda: super(OpenGraphAwarePage, self).get_opengraph_data(request),
+        }
+
+    async def aget_opengraph_data(self, request: HttpRequest) -> List[Tuple[str, Any]]:
+        return await self.aget_or_set_cache_data(
+            OPENGRAPH_CACHE_SUFFIX, lambda: super(OpenGraphAwarePage, self).get_opengraph_data(request)
+        )
+
     def get_opengraph_data(self, request: HttpRequest) -> List[Tuple[str, Any]]:
         return self.get_or_set_cache_data(OPENGRAPH_CACHE_SUFFIX, lambda: super().get_opengraph_data(request))
 
@@ -13,6 +13,8 @@ from wagtail.images import get_image_model_string
 from wagtail.images.edit_handlers import ImageChooserPanel
 from wagtail.images.models import AbstractRendition, AbstractImage
 
+from .cache import register_cache_dependency
+
 
 __all__ = ['CommonSettings', 'get_logo', 'get_logo_rendition', 'get_logo_original_path', 'get_logo_rendition_path',
            'get_docs_background', 'get_docs_background_path', 'PerPageSettingsMixin']
@@ -75,10 +77,13 @@ def get_logo(site: Optional[Site] = None, request: Optional[HttpRequest] = None,
         else:
             site: Site = Site.find_for_request(request)
 
+    common_settings: CommonSettings = CommonSettings.for_site(site)
+    register_cache_dependency(common_settings)
+
     if square:
-        return CommonSettings.for_site(site).logo_square
+        return common_settings.logo_square
     else:
-        return CommonSettings.for_site(site).logo
+        return common_settings.logo
 
 
 def get_logo_rendition(site: Optional[Site] = None, request: Optional[HttpRequest] = None, square: bool = False,
@@ -1,6 +1,6 @@
 import abc
 
-from typing import Optional, List, Type
+from typing import Optional, List, Type, Dict, Callable
 
 from django.conf import settings
 from django.http import HttpRequest
@@ -9,7 +9,7 @@ from django.utils.safestring import mark_safe
 
 from wagtail.core.models import Page, Site
 
-from .cache import AbstractCacheAwarePage, CacheSuffixMeta
+from .cache import AbstractCacheAwarePage, CacheSuffixMeta, get_cache_serializer
 from .hierarchyonly import HierarchyOnlyPage
 
 
@@ -77,10 +77,33 @@ class StructuredDataAwarePage(StructuredDataAware, AbstractCacheAwarePage):
         abstract = True
 
     cache_suffixes = AbstractCacheAwarePage.cache_suffixes + {
-        STRUCTURED_DATA_CACHE_SUFFIX: CacheSuffixMeta('default', settings.COMMONTAIL_STRUCTURED_DATA_CACHE_LIFETIME)
+        STRUCTURED_DATA_CACHE_SUFFIX: CacheSuffixMeta(
+            'default', settings.COMMONTAIL_STRUCTURED_DATA_CACHE_LIFETIME,
+            soft_lifetime=settings.COMMONTAIL_STRUCTURED_DATA_CACHE_SOFT_LIFETIME,
+            lifetime_jitter=settings.COMMONTAIL_STRUCTURED_DATA_CACHE_LIFETIME_JITTER,
+            serializer=get_cache_serializer(settings.COMMONTAIL_STRUCTURED_DATA_CACHE_SERIALIZER)
+        )
     }
 
     structured_data_providers = [HierarchyBreadcrumbsStructuredDataProvider, ]
 
+    def _compute_structured_data(self, request: HttpRequest) -> str:
+        # cached as plain str, which is smaller when pickled and supported by every serializer - it's marked safe again
+        # after retrieval
+        return str.__str__(super().get_structured_data(request))  # str() would return SafeString itself
+
+    def get_cache_data_callables(self, request: Optional[HttpRequest] = None) -> Dict[str, Callable]:
+        return {
+            **super().get_cache_data_callables(request),
+            STRUCTURED_DATA_CACHE_SUFFIX: lambda: self._compute_structured_data(request),
+        }
+
+    async def aget_structured_data(self, request: HttpRequest) -> str:
+        return mark_safe(await self.aget_or_set_cache_data(
+            STRUCTURED_DATA_CACHE_SUFFIX, lambda: self._compute_structured_data(request)
+        ))
+
     def get_structured_data(self, request: HttpRequest) -> str:
-        return self.get_or_set_cache_data(STRUCTURED_DATA_CACHE_SUFFIX, lambda: super().get_structured_data(request))
+        return mark_safe(
+            self.get_or_set_cache_data(STRUCTURED_DATA_CACHE_SUFFIX, lambda: self._compute_structured_data(request))
+        )
@@ -1 +1,2 @@
 from .cache import *
+from .links import *
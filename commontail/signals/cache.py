@@ -1,31 +1,270 @@
+import logging
+import threading
+
+from contextlib import contextmanager
+from typing import Any, Callable, FrozenSet, List, Type, Iterator, Dict, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
 from django.db.models.signals import post_save, post_delete
 
-from ..models import AbstractCacheAware
+from wagtail.core.models import Page
+from wagtail.core.signals import page_published, page_unpublished, pre_page_move, post_page_move
+from wagtail.images import get_image_model
+
+from ..models import AbstractCacheAware, AbstractCacheAwarePage, CacheInvalidationBatch, get_cache_dependency_token, \
+    get_cache_dependency_generation_key, increment_cache_generation
+
+
+__all__ = ['cache_aware_signals_disabled', 'cache_invalidation_batch', 'cache_signals_disabled',
+           'get_cache_aware_models', 'get_cache_dependency_models', 'get_transaction_data', 'invalidate_generation',
+           'register_cache_aware_signal_handlers', ]
+
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
 
+@contextmanager
+def cache_aware_signals_disabled() -> Iterator[None]:
+    """
+    Disables cache-aware signal handlers in current thread, e.g. during bulk loads
+
+    Cache isn't cleared for instances saved or deleted inside this context - clear it explicitly afterwards if needed.
+    """
+    previous: bool = getattr(_state, 'disabled', False)
+    _state.disabled = True
+    try:
+        yield
+    finally:
+        _state.disabled = previous
+
+
+def cache_signals_disabled() -> bool:
+    """
+    Returns True inside cache_aware_signals_disabled context - cache-related handlers of other modules should skip
+    their invalidations too
+    """
+    return getattr(_state, 'disabled', False)
+
+
+@contextmanager
+def cache_invalidation_batch(using: Optional[str] = None) -> Iterator[CacheInvalidationBatch]:
+    """
+    Collects invalidations caused by cache-aware signal handlers in current thread and executes them once on exit
+
+    If the context is exited inside a transaction - invalidations are executed after it's committed. Nested contexts
+    share the outermost batch.
+    :param using: database alias
+    """
+    batch: Optional[CacheInvalidationBatch] = getattr(_state, 'batch', None)
+    if batch is not None:
+        yield batch
+
+        return
 
-__all__ = ['register_cache_aware_signal_handlers', ]
+    batch = _state.batch = CacheInvalidationBatch()
+    try:
+        yield batch
+    finally:
+        _state.batch = None
+        transaction.on_commit(batch.flush, using=using)
 
 
-def cache_aware_action(instance: AbstractCacheAware, action: str) -> None:
-    policy: int = instance.CACHE_POLICIES[action]
+def get_transaction_data(name: str, factory: Callable[[], Any], flush: Callable[[Any], None],
+                         using: Optional[str] = None) -> Any:
+    """
+    Returns data collected in current thread's transaction, which is passed to flush after the transaction is committed
+
+    Data of rolled back transactions is discarded. Data collected in savepoints, which were rolled back after some data
+    had been collected in outer transaction, is flushed with it. Must be called inside atomic block only.
+    :param name: name of data, unique for every kind of it
+    :param factory: callable without arguments, creating empty data
+    :param flush: callable, getting collected data after commit
+    :param using: database alias
+    :return: data
+    """
+    connection: Any = transaction.get_connection(using)
+    pending: Optional[Dict[Tuple[str, str], Tuple[Any, Callable]]] = getattr(_state, 'transaction_data', None)
+    if pending is None:
+        pending = _state.transaction_data = dict()
+    key: Tuple[str, str] = (name, connection.alias)
+
+    if key in pending:
+        data, callback = pending[key]
+        # callbacks of rolled back transactions are discarded by django - their data mustn't be flushed by next ones
+        if any(entry[1] is callback for entry in connection.run_on_commit):
+            return data
+
+    data = factory()
+
+    def callback():
+        if pending.get(key, (None, None))[1] is callback:
+            del pending[key]
+        flush(data)
+
+    pending[key] = (data, callback)
+    transaction.on_commit(callback, using=using)
+
+    return data
+
+
+def _get_invalidation_batch(using: Optional[str]) -> CacheInvalidationBatch:
+    batch: Optional[CacheInvalidationBatch] = getattr(_state, 'batch', None)
+    if batch is not None:
+        return batch
+
+    return get_transaction_data('commontail_cache_invalidation', CacheInvalidationBatch, CacheInvalidationBatch.flush,
+                                using)
+
+
+def _get_current_batch(using: Optional[str]) -> Optional[CacheInvalidationBatch]:
+    if getattr(_state, 'batch', None) is None and not transaction.get_connection(using).in_atomic_block:
+        return None  # nothing to wait for - invalidate immediately
+
+    return _get_invalidation_batch(using)
+
+
+def cache_aware_action(instance: AbstractCacheAware, action: str, using: Optional[str] = None) -> None:
+    policy: int = instance.CACHE_POLICIES.get(action, AbstractCacheAware.CACHE_ACTION_NONE)
     if policy == AbstractCacheAware.CACHE_ACTION_NONE:
         return
     elif policy == AbstractCacheAware.CACHE_ACTION_CLEAR:
-        instance.clear_cache()
+        instance.clear_cache(_get_current_batch(using))
+    elif policy == AbstractCacheAware.CACHE_ACTION_REFRESH:
+        # data is recomputed from committed state only
+        transaction.on_commit(lambda: _refresh_cache(instance), using=using)
+
+
+def _refresh_cache(instance: AbstractCacheAware) -> None:
+    # exceptions of on_commit callbacks are raised - they mustn't turn already committed changes into errors
+    try:
+        instance.refresh_cache()
+    except Exception:
+        logger.exception(f'Cache refresh of "{instance.get_cache_prefix()}" after commit failed.')
 
 
 def cache_aware_post_save(sender, **kwargs):
-    instance = kwargs['instance']
-    if isinstance(instance, AbstractCacheAware):
-        cache_aware_action(instance, 'save')
+    if cache_signals_disabled():
+        return
+
+    instance: AbstractCacheAware = kwargs['instance']
+    update_fields: Optional[FrozenSet[str]] = kwargs.get('update_fields')
+    if update_fields and update_fields <= instance.cache_ignored_update_fields:
+        return
+    cache_aware_action(instance, 'save', kwargs.get('using'))
 
 
 def cache_aware_post_delete(sender, **kwargs):
-    instance = kwargs['instance']
-    if isinstance(instance, AbstractCacheAware):
-        cache_aware_action(instance, 'delete')
+    if not cache_signals_disabled():
+        cache_aware_action(kwargs['instance'], 'delete', kwargs.get('using'))
+
+
+def invalidate_generation(key: str, using: Optional[str] = None) -> None:
+    """
+    Increments generation counter after current transaction is committed or immediately outside of transactions
+
+    :param key: generation counter's cache key
+    :param using: database alias
+    """
+    batch: Optional[CacheInvalidationBatch] = _get_current_batch(using)
+    if batch is None:
+        increment_cache_generation(key)
+    else:
+        batch.add_generation(key)
+
+
+def _invalidate_subtree(path: str) -> None:
+    invalidate_generation(AbstractCacheAwarePage.get_cache_subtree_generation_key(path))
+
+
+def _cache_aware_page_action(instance: Page, action: str) -> None:
+    if cache_signals_disabled():
+        return
+
+    # it's one incr per event - cheap enough to do it for any page, as ancestors usually aren't cache-aware
+    _invalidate_subtree(instance.path)
+
+    if not isinstance(instance, AbstractCacheAware):
+        # post_page_move sends a generic Page instance
+        if not instance.specific_class or not issubclass(instance.specific_class, AbstractCacheAware):
+            return
+        instance = instance.specific
+    cache_aware_action(instance, action)
+
+
+def cache_aware_page_published(sender, **kwargs):
+    _cache_aware_page_action(kwargs['instance'], 'publish')
+
+
+def cache_aware_page_unpublished(sender, **kwargs):
+    _cache_aware_page_action(kwargs['instance'], 'unpublish')
+
+
+def cache_aware_pre_page_move(sender, **kwargs):
+    # subtree's paths change after the move, so counters of its old position must be changed too
+    if not cache_signals_disabled():
+        _invalidate_subtree(kwargs['instance'].path)
+
+
+def cache_aware_post_page_move(sender, **kwargs):
+    _cache_aware_page_action(kwargs['instance'], 'move')
+
+
+def cache_dependency_changed(sender, **kwargs):
+    # fixtures are loaded with raw=True - they don't invalidate anything
+    if cache_signals_disabled() or kwargs.get('raw'):
+        return
+
+    batch: Optional[CacheInvalidationBatch] = _get_current_batch(kwargs.get('using'))
+    flush: bool = batch is None
+    if flush:
+        batch = CacheInvalidationBatch()
+    batch.add_dependency(get_cache_dependency_token(kwargs['instance']))
+    # nothing could depend on an instance, which has just been created
+    if not kwargs.get('created'):
+        batch.add_generation(get_cache_dependency_generation_key(sender._meta.label_lower))
+    if flush:
+        batch.flush()
+
+
+def get_cache_aware_models() -> List[Type[models.Model]]:
+    return [m for m in apps.get_models() if issubclass(m, AbstractCacheAware)]
+
+
+def get_cache_dependency_models() -> List[Type[models.Model]]:
+    dependency_models: List[Type[models.Model]] = [
+        apps.get_model(label) for label in settings.COMMONTAIL_CACHE_DEPENDENCY_MODELS
+    ]
+    image_model: Type[models.Model] = get_image_model()
+    if image_model not in dependency_models:
+        dependency_models.append(image_model)
+
+    return dependency_models
 
 
 def register_cache_aware_signal_handlers():
-    post_save.connect(cache_aware_post_save)
-    post_delete.connect(cache_aware_post_delete)
+    # handlers are connected per sender, so saving of other models doesn't pay for them at all
+    for model in get_cache_aware_models():
+        post_save.connect(cache_aware_post_save, sender=model,
+                          dispatch_uid=f'commontail_cache_aware_post_save_{model._meta.label_lower}')
+        post_delete.connect(cache_aware_post_delete, sender=model,
+                            dispatch_uid=f'commontail_cache_aware_post_delete_{model._meta.label_lower}')
+
+    for model in get_cache_dependency_models():
+        for signal in (post_save, post_delete):
+            signal.connect(cache_dependency_changed, sender=model,
+                           dispatch_uid=f'commontail_cache_dependency_changed_{model._meta.label_lower}')
+
+    # publishing events of every page type are handled - any page may be an ancestor of cache-aware one
+    for model in (m for m in apps.get_models() if issubclass(m, Page)):
+        for signal, handler in (
+            (page_published, cache_aware_page_published),
+            (page_unpublished, cache_aware_page_unpublished),
+            (pre_page_move, cache_aware_pre_page_move),
+            (post_page_move, cache_aware_post_page_move),
+        ):
+            signal.connect(handler, sender=model,
+                           dispatch_uid=f'commontail_{handler.__name__}_{model._meta.label_lower}')
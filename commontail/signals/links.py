@@ -0,0 +1,317 @@
+import logging
+
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, pre_save
+
+from wagtail.core.models import Page
+from wagtail.core.signals import page_published, page_unpublished, pre_page_move, post_page_move
+
+from ..models import AbstractPageLink, CacheInvalidationBatch, InheritedPageLink, InheritedPageLinksState, \
+    LinksOwnerPage, PageLinkCategory, PageLinkCategoryGroup, PageLinkCategoryToPageLinkCategoryGroup, PageLinksCollector
+from .cache import cache_signals_disabled, get_transaction_data
+
+
+__all__ = ['get_page_link_models', 'rebuild_inherited_links', 'register_page_links_signal_handlers', ]
+
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingChanges:
+
+    def __init__(self):
+        # materialized rows
+        self.subtrees: Set[str] = set()
+        self.owners: Set[int] = set()
+        self.relations: Set[Tuple[int, int]] = set()
+        # cache - subtrees' paths (None is every page), owners with changed links and targets' subtrees
+        self.cache_paths: Set[Optional[str]] = set()
+        self.cache_owners: Set[int] = set()
+        self.cache_targets: Set[str] = set()
+
+
+@contextmanager
+def _pending_changes(using: Optional[str]) -> Iterator[_PendingChanges]:
+    if transaction.get_connection(using).in_atomic_block:
+        yield get_transaction_data('commontail_page_links', _PendingChanges, _flush, using)
+
+        return
+
+    # nothing to wait for - changes are processed immediately
+    pending: _PendingChanges = _PendingChanges()
+    yield pending
+    _flush(pending)
+
+
+def rebuild_inherited_links(path: str, using: Optional[str] = None) -> None:
+    """
+    Schedules rebuild of InheritedPageLink rows of a subtree after current transaction is committed
+
+    Subtrees scheduled in the same transaction are merged, so a page is rebuilt once.
+    :param path: treebeard path of subtree's root
+    :param using: database alias
+    """
+    with _pending_changes(using) as pending:
+        pending.subtrees.add(path)
+
+
+def _check_owners(pks: Iterable[int], using: Optional[str] = None) -> None:
+    # owners are compared with their states after commit - subtrees are rebuilt only if live status or own links
+    # have changed
+    with _pending_changes(using) as pending:
+        pending.owners.update(pks)
+
+
+def _check_relations(relations: Iterable[Tuple[int, int]], using: Optional[str] = None) -> None:
+    with _pending_changes(using) as pending:
+        pending.relations.update(relations)
+
+
+def _invalidate_linked_pages(paths: Iterable[Optional[str]] = (), owners: Iterable[int] = (),
+                             targets: Iterable[str] = (), using: Optional[str] = None) -> None:
+    # paths of owners and of pages linking to targets are resolved once per transaction, modelcluster saves every link
+    # on publishing
+    if cache_signals_disabled():
+        return
+
+    with _pending_changes(using) as pending:
+        pending.cache_paths.update(paths)
+        pending.cache_owners.update(owners)
+        pending.cache_targets.update(targets)
+
+
+def _merge_subtrees(paths: Dict[str, Optional[Set[int]]]) -> Dict[str, Optional[Set[int]]]:
+    # nested subtrees are rebuilt with their outermost root, groups of None mean every group
+    roots: Dict[str, Optional[Set[int]]] = dict()
+    last: Optional[str] = None
+    for path in sorted(paths):
+        if last is not None and path.startswith(last):
+            if roots[last] is not None:
+                roots[last] = None if paths[path] is None else roots[last] | paths[path]
+        else:
+            last = path
+            roots[path] = paths[path]
+
+    return roots
+
+
+def _rebuild(path: str, groups: Optional[Set[int]]) -> None:
+    limit: Optional[int] = settings.COMMONTAIL_PAGE_LINKS_MATERIALIZED_SYNC_LIMIT
+    if limit is not None and InheritedPageLink.count_pages(path) > limit:
+        # big subtrees aren't rebuilt inside a request - they're served by the collector until the command is run
+        logger.warning(f'Inherited links of subtree {path} are invalidated, run commontail_rebuild_inherited_links '
+                       f'to rebuild them.')
+        InheritedPageLink.invalidate(path)
+
+        return
+
+    InheritedPageLink.rebuild(path, groups=groups)
+
+
+def _get_changed_owners_paths(pks: Set[int]) -> Set[str]:
+    states: Dict[int, InheritedPageLinksState] = {
+        s.page_id: s for s in InheritedPageLinksState.objects.filter(page__in=pks)
+    }
+    hashes: Dict[int, str] = InheritedPageLinksState.get_links_hashes(pks)
+
+    return {
+        path for pk, path, live in Page.objects.filter(pk__in=pks).values_list('pk', 'path', 'live')
+        if pk not in states or states[pk].live != live or states[pk].links_hash != hashes[pk]
+    }
+
+
+def _get_relations_paths(relations: Set[Tuple[int, int]]) -> Dict[str, Set[int]]:
+    # only owners with links of changed categories (and their subtrees) are affected
+    categories: Dict[int, Set[int]] = dict()
+    for group_id, category_id in relations:
+        categories.setdefault(category_id, set()).add(group_id)
+    paths: Dict[str, Set[int]] = dict()
+    for link_model, owner_field in PageLinksCollector.get_link_relations(settings.COMMONTAIL_PAGE_LINKS_RELATION_NAME):
+        for path, category_id in link_model.objects.filter(category_id__in=categories).values_list(
+                f'{owner_field}__path', 'category_id').distinct():
+            paths.setdefault(path, set()).update(categories[category_id])
+
+    return paths
+
+
+def _flush(pending: _PendingChanges) -> None:
+    # it's run after commit - errors mustn't turn committed changes into errors. Affected pages are invalidated and
+    # served by the collector instead, cache is invalidated after rows are rebuilt, so it can't store old rows.
+    if pending.subtrees or pending.owners or pending.relations:
+        _flush_materialized(pending)
+    if pending.cache_paths or pending.cache_owners or pending.cache_targets:
+        try:
+            _flush_cache(pending)
+        except Exception:
+            logger.exception('Invalidation of linked pages cache failed.')
+
+
+def _flush_materialized(pending: _PendingChanges) -> None:
+    subtrees: Set[str] = pending.subtrees
+    try:
+        if pending.owners:
+            subtrees |= _get_changed_owners_paths(pending.owners)
+        paths: Dict[str, Optional[Set[int]]] = dict.fromkeys(subtrees)
+        if pending.relations:
+            for path, groups in _get_relations_paths(pending.relations).items():
+                if path not in paths:
+                    paths[path] = groups
+    except Exception:
+        logger.exception('Check of changed inherited links failed, every page is invalidated - run '
+                         'commontail_rebuild_inherited_links to rebuild them.')
+        _invalidate(None)
+
+        return
+
+    for path, groups in _merge_subtrees(paths).items():
+        try:
+            _rebuild(path, groups)
+        except Exception:
+            logger.exception(f'Rebuild of inherited links of subtree {path} failed, the subtree is invalidated.')
+            _invalidate(path)
+
+
+def _flush_cache(pending: _PendingChanges) -> None:
+    paths: Set[Optional[str]] = pending.cache_paths
+    if None not in paths:
+        if pending.cache_owners:
+            paths.update(Page.objects.filter(pk__in=pending.cache_owners).values_list('path', flat=True))
+        if pending.cache_targets:
+            paths.update(_get_linking_owners_paths(pending.cache_targets))
+    batch: CacheInvalidationBatch = CacheInvalidationBatch()
+    for path in ([None] if None in paths else paths):
+        for key in LinksOwnerPage.get_linked_pages_invalidation_keys(path):
+            batch.add_generation(key)
+    batch.flush()
+
+
+def _invalidate(path: Optional[str]) -> None:
+    try:
+        InheritedPageLink.invalidate(path)
+    except Exception:
+        logger.exception(f'Invalidation of inherited links of subtree {path} failed.')
+
+
+def _get_owner_field(link_model: Type[models.Model]) -> str:
+    return dict(PageLinksCollector.get_link_relations(settings.COMMONTAIL_PAGE_LINKS_RELATION_NAME))[link_model]
+
+
+def _get_linking_owners_paths(paths: Iterable[str]) -> Set[str]:
+    # targets' URLs, titles and live status are stored in cache
+    roots: List[str] = []
+    for path in sorted(paths):
+        if not roots or not path.startswith(roots[-1]):
+            roots.append(path)
+    targets: Q = Q()
+    for path in roots:
+        targets |= Q(target__path__startswith=path)
+
+    owners_paths: Set[str] = set()
+    for link_model, owner_field in PageLinksCollector.get_link_relations(settings.COMMONTAIL_PAGE_LINKS_RELATION_NAME):
+        owners_paths.update(link_model.objects.filter(targets).values_list(
+            f'{owner_field}__path', flat=True).distinct())
+
+    return owners_paths
+
+
+def page_links_changed(sender, **kwargs):
+    if kwargs.get('raw'):
+        return
+
+    owner_id: int = getattr(kwargs['instance'], f'{_get_owner_field(sender)}_id')
+    _invalidate_linked_pages(owners=[owner_id], using=kwargs.get('using'))
+    if settings.COMMONTAIL_PAGE_LINKS_MATERIALIZED:
+        _check_owners([owner_id], kwargs.get('using'))
+
+
+def page_links_categories_changed(sender, **kwargs):
+    # titles of categories are used by grouped results, so every change invalidates cache of every page
+    if not kwargs.get('raw'):
+        _invalidate_linked_pages([None], using=kwargs.get('using'))
+
+
+def inherited_links_relation_pre_save(sender, **kwargs):
+    instance: PageLinkCategoryToPageLinkCategoryGroup = kwargs['instance']
+    if not settings.COMMONTAIL_PAGE_LINKS_MATERIALIZED or kwargs.get('raw') or instance.pk is None:
+        return
+
+    instance._inherited_links_previous = sender.objects.filter(pk=instance.pk).values_list(
+        'group_id', 'category_id'
+    ).first()
+
+
+def inherited_links_relation_changed(sender, **kwargs):
+    # titles, handles and order of categories and groups don't change rows, deleted groups delete their rows, while
+    # categories used by links can't be deleted - only changes of relations matter
+    instance: PageLinkCategoryToPageLinkCategoryGroup = kwargs['instance']
+    if not settings.COMMONTAIL_PAGE_LINKS_MATERIALIZED or kwargs.get('raw'):
+        return
+
+    relations: Set[Tuple[int, int]] = {(instance.group_id, instance.category_id)}
+    previous: Optional[Tuple[int, int]] = instance.__dict__.pop('_inherited_links_previous', None) \
+        if kwargs['signal'] is post_save else None
+    if previous is not None:
+        if previous in relations:
+            return
+        relations.add(previous)
+    _check_relations(relations, kwargs.get('using'))
+
+
+def page_links_page_live_changed(sender, **kwargs):
+    # live status of owners changes inheritance of their subtrees, targets' live status is checked while reading
+    # materialized rows, but it's stored in cache
+    instance: Page = kwargs['instance']
+    is_owner: bool = issubclass(instance.specific_class or Page, LinksOwnerPage)
+    if is_owner and settings.COMMONTAIL_PAGE_LINKS_MATERIALIZED:
+        _check_owners([instance.pk])
+    _invalidate_linked_pages([instance.path] if is_owner else [], targets=[instance.path])
+
+
+def page_links_pre_page_move(sender, **kwargs):
+    # results with descendants of old ancestors include links of the subtree
+    _invalidate_linked_pages([kwargs['instance'].path])
+
+
+def page_links_post_page_move(sender, **kwargs):
+    _invalidate_linked_pages([kwargs['instance'].path], targets=[kwargs['instance'].path])
+    if settings.COMMONTAIL_PAGE_LINKS_MATERIALIZED:
+        rebuild_inherited_links(kwargs['instance'].path)
+
+
+def get_page_link_models() -> List[Type[models.Model]]:
+    return [m for m in apps.get_models() if issubclass(m, AbstractPageLink)]
+
+
+def register_page_links_signal_handlers():
+    # only links collected by LinksOwnerPage.get_linked_pages are cached and materialized
+    for model, _ in PageLinksCollector.get_link_relations(settings.COMMONTAIL_PAGE_LINKS_RELATION_NAME):
+        for signal in (post_save, post_delete):
+            signal.connect(page_links_changed, sender=model,
+                           dispatch_uid=f'commontail_page_links_changed_{model._meta.label_lower}')
+
+    for model in (PageLinkCategory, PageLinkCategoryGroup, PageLinkCategoryToPageLinkCategoryGroup):
+        for signal in (post_save, post_delete):
+            signal.connect(page_links_categories_changed, sender=model,
+                           dispatch_uid=f'commontail_page_links_categories_changed_{model._meta.label_lower}')
+
+    pre_save.connect(inherited_links_relation_pre_save, sender=PageLinkCategoryToPageLinkCategoryGroup,
+                     dispatch_uid='commontail_inherited_links_relation_pre_save')
+    for signal in (post_save, post_delete):
+        signal.connect(inherited_links_relation_changed, sender=PageLinkCategoryToPageLinkCategoryGroup,
+                       dispatch_uid='commontail_inherited_links_relation_changed')
+
+    for model in (m for m in apps.get_models() if issubclass(m, Page)):
+        for signal, handler in (
+            (page_published, page_links_page_live_changed),
+            (page_unpublished, page_links_page_live_changed),
+            (pre_page_move, page_links_pre_page_move),
+            (post_page_move, page_links_post_page_move),
+        ):
+            signal.connect(handler, sender=model,
+                           dispatch_uid=f'commontail_{handler.__name__}_{model._meta.label_lower}')
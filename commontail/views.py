@@ -0,0 +1,17 @@
+from django.http import HttpRequest, HttpResponse
+
+from .models.cache import render_cache_metrics
+
+
+__all__ = ['cache_metrics', ]
+
+
+def cache_metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Returns cache metrics in Prometheus text exposition format
+
+    The view isn't protected in any way - restrict access to it when adding it to urlpatterns.
+    :param request: HttpRequest
+    :return: HttpResponse
+    """
+    return HttpResponse(render_cache_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,51 @@
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+
+
+__all__ = ['FaultInjectingCache', ]
+
+
+class FaultInjectingCache(LocMemCache):
+    """
+    Local memory cache, which fails or slows down reads and writes on demand
+    """
+
+    failing: bool = False
+    delay: float = 0.0
+    calls: int = 0
+
+    def _inject(self):
+        FaultInjectingCache.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.failing:
+            raise ConnectionError('Injected cache failure.')
+
+    def add(self, *args, **kwargs):
+        self._inject()
+        return super().add(*args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        self._inject()
+        return super().delete_many(*args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        self._inject()
+        return super().get(*args, **kwargs)
+
+    def get_many(self, *args, **kwargs):
+        self._inject()
+        return super().get_many(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        self._inject()
+        return super().incr(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        self._inject()
+        return super().set(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        self._inject()
+        return super().set_many(*args, **kwargs)
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-17 09:12
+
+import commontail.models.cache
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0062_comment_models_and_pagesubscription'),
+        ('tests', '0002_testhierarchyonlypage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheAwarePage',
+            fields=[
+                ('page_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='wagtailcore.page')),
+            ],
+            options={
+                'abstract': False,
+            },
+            bases=(commontail.models.cache.AbstractCacheAware, 'wagtailcore.page'),
+        ),
+    ]
@@ -1,2 +1,3 @@
 from .cache import *
 from .hierarchyonly import *
+from .links import *
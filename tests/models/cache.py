@@ -1,9 +1,9 @@
 from django.db import models
 
-from commontail.models import AbstractCacheAware, CacheSuffixMeta
+from commontail.models import AbstractCacheAware, AbstractCacheAwarePage, CacheSuffixMeta
 
 
-__all__ = ['CacheAwareModel', ]
+__all__ = ['CacheAwareModel', 'CacheAwarePage', ]
 
 
 class CacheAwareModel(AbstractCacheAware, models.Model):
@@ -14,3 +14,16 @@ class CacheAwareModel(AbstractCacheAware, models.Model):
 
     def get_cache_prefix(self) -> str:
         return f'testmodel{self.pk}'
+
+
+class CacheAwarePage(AbstractCacheAwarePage):
+
+    cache_suffixes = AbstractCacheAwarePage.cache_suffixes + {
+        'title': CacheSuffixMeta('default', 300),
+    }
+
+    def get_cache_data_callables(self, request=None):
+        return {
+            **super().get_cache_data_callables(request),
+            'title': lambda: self.title,
+        }
@@ -0,0 +1,26 @@
+from django.db import models
+
+from modelcluster.models import ParentalKey
+
+from commontail.models import AbstractPageLink, LinksOwnerPage
+
+
+__all__ = ['LinksPage', 'LinksPageLink', 'OtherLinksPage', 'OtherLinksPageLink', ]
+
+
+class LinksPage(LinksOwnerPage):
+    pass
+
+
+class LinksPageLink(AbstractPageLink):
+
+    page = ParentalKey(LinksPage, on_delete=models.CASCADE, related_name='page_links')
+
+
+class OtherLinksPage(LinksOwnerPage):
+    pass
+
+
+class OtherLinksPageLink(AbstractPageLink):
+
+    page = ParentalKey(OtherLinksPage, on_delete=models.CASCADE, related_name='page_links')
@@ -1,9 +1,34 @@
-from django.test import TestCase
-from django.core.cache import InvalidCacheBackendError, cache
+import asyncio
+import os
+import tempfile
+import threading
+import time
 
-from commontail.models.cache import AbstractCacheAware, CacheSuffixDict, CacheSuffixMeta, UnknownCacheSuffixException
+from collections import Counter
+from io import StringIO
+from unittest import mock
 
-from ..models import CacheAwareModel
+from asgiref.sync import sync_to_async
+
+from django.core.cache import InvalidCacheBackendError, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import RequestFactory, TestCase, override_settings
+
+from wagtail.core.models import Page, Site
+
+from commontail.management.commands import commontail_warm_cache
+from commontail.models.cache import CACHED_NONE, AbstractCacheAware, AbstractCacheAwarePage, CacheCircuitBreaker, \
+    CacheEnvelope, CacheInvalidationBatch, CacheShardRing, CacheSuffixDict, CacheSuffixMeta, CacheMetricLabels, \
+    JSONCacheSerializer, LocalCache, MarshalCacheSerializer, PickleCacheSerializer, UnknownCacheSuffixException, \
+    ZlibCacheSerializer, get_cache_alias, get_cache_circuit_breaker, get_cache_dependency_key, get_cache_metrics_sink, \
+    get_local_cache, make_dummy_request, register_cache_dependency
+from commontail.signals.cache import cache_aware_signals_disabled, cache_invalidation_batch, get_cache_aware_models
+from commontail.views import cache_metrics
+
+from ..cache import FaultInjectingCache
+from ..models import CacheAwareModel, CacheAwarePage, TestHierarchyOnlyPage
 
 
 class TestCacheAware(AbstractCacheAware):
@@ -11,12 +36,60 @@ class TestCacheAware(AbstractCacheAware):
     cache_suffixes = AbstractCacheAware.cache_suffixes + {
         'test1': CacheSuffixMeta('default', 300),
         'test2': CacheSuffixMeta('nonexistent', 300),
+        'single_flight': CacheSuffixMeta('default', 300, single_flight=True, lock_wait=2.0),
+        'swr': CacheSuffixMeta('default', 300, soft_lifetime=60),
+        'negative': CacheSuffixMeta('default', 300, negative_lifetime=0),
+        'jitter': CacheSuffixMeta('default', 300, lifetime_jitter=0.5),
+        'marshal': CacheSuffixMeta('default', 300, serializer=ZlibCacheSerializer(MarshalCacheSerializer(), 64)),
+        'json': CacheSuffixMeta('default', 300, soft_lifetime=60, serializer=JSONCacheSerializer()),
+        'site': CacheSuffixMeta('default', 300, dependency_models=('wagtailcore.Site', )),
     }
 
     def get_cache_prefix(self) -> str:
         return 'test'
 
 
+class TestVersionedCacheAware(AbstractCacheAware):
+
+    cache_suffixes = AbstractCacheAware.cache_suffixes + {
+        'test1': CacheSuffixMeta('default', 300),
+        'test2': CacheSuffixMeta('default', 300),
+        'local': CacheSuffixMeta('default', 300, local_lifetime=60),
+        'site': CacheSuffixMeta('default', 300, dependency_models=('wagtailcore.Site', )),
+    }
+
+    cache_versioned = True
+
+    def __init__(self, pk):
+        self.pk = pk
+
+    def get_cache_prefix(self) -> str:
+        return f'versioned{self.pk}'
+
+
+class TestFaultyCacheAware(AbstractCacheAware):
+
+    cache_suffixes = AbstractCacheAware.cache_suffixes + {
+        'faulty': CacheSuffixMeta('faulty', 300),
+    }
+
+    def get_cache_prefix(self) -> str:
+        return 'faulty'
+
+
+class TestShardedCacheAware(AbstractCacheAware):
+
+    cache_suffixes = AbstractCacheAware.cache_suffixes + {
+        'sharded': CacheSuffixMeta('sharded', 300),
+    }
+
+    def __init__(self, pk):
+        self.pk = pk
+
+    def get_cache_prefix(self) -> str:
+        return f'sharded{self.pk}'
+
+
 class TestCache(TestCase):
 
     def test_cache_suffix_dict(self):
@@ -54,11 +127,733 @@ class TestCache(TestCase):
             cache_aware.get_cache_meta('nonexistent')
 
     def test_cache_signals(self):
-        cache_aware_instance = CacheAwareModel.objects.create()
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_aware_instance = CacheAwareModel.objects.create()
         cache_aware_instance.set_cache_data('test', cache_aware_instance.pk)
         self.assertEqual(cache.get(f'testmodel{cache_aware_instance.pk}__test'), cache_aware_instance.pk)
-        cache_aware_instance.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_aware_instance.save()
         self.assertIsNone(cache.get(f'testmodel{cache_aware_instance.pk}__test'))
         cache_aware_instance.set_cache_data('test', cache_aware_instance.pk)
         cache_aware_instance = CacheAwareModel.objects.all().first()
         self.assertEqual(cache_aware_instance.get_cache_data('test'), cache_aware_instance.pk)
+
+        self.assertIn(CacheAwareModel, get_cache_aware_models())
+        self.assertNotIn(TestHierarchyOnlyPage, get_cache_aware_models())
+        with self.captureOnCommitCallbacks(execute=True), cache_aware_signals_disabled():
+            cache_aware_instance.save()
+        self.assertEqual(cache_aware_instance.get_cache_data('test'), cache_aware_instance.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_aware_instance.save()
+        self.assertIsNone(cache_aware_instance.get_cache_data('test'))
+
+    def _run_concurrently(self, target, count: int) -> list:
+        barrier = threading.Barrier(count)
+        results = [None] * count
+
+        def worker(i):
+            barrier.wait()
+            results[i] = target()
+
+        threads = [threading.Thread(target=worker, args=(i, )) for i in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        return results
+
+    def test_single_flight(self):
+        cache_aware = TestCacheAware()
+        cache_aware.delete_cache_suffix('single_flight')
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'computed'
+
+        results = self._run_concurrently(lambda: cache_aware.get_or_set_cache_data('single_flight', compute), 10)
+
+        self.assertEqual(['computed'] * 10, results)
+        self.assertEqual(1, len(calls))
+        self.assertIsNone(cache.get(cache_aware.get_cache_lock_key('single_flight')))
+
+        # a caller, which missed just before the previous holder released the lock, doesn't recompute
+        self.assertEqual('computed', cache_aware._get_or_set_cache_data_single_flight(
+            'single_flight', cache_aware.get_cache_meta('single_flight'), compute
+        ))
+        self.assertEqual(1, len(calls))
+
+    def test_single_flight_wait_timeout(self):
+        cache_aware = TestCacheAware()
+        cache_aware.delete_cache_suffix('single_flight')
+        cache.set(cache_aware.get_cache_lock_key('single_flight'), 'someone else', 60)
+
+        started = time.monotonic()
+        self.assertEqual('direct', cache_aware.get_or_set_cache_data('single_flight', lambda: 'direct'))
+        self.assertGreaterEqual(time.monotonic() - started, 2.0)
+        self.assertIsNone(cache_aware.get_cache_data('single_flight'))
+        cache.delete(cache_aware.get_cache_lock_key('single_flight'))
+
+    def _wait_for(self, condition, timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+
+        return False
+
+    def test_stale_while_revalidate(self):
+        cache_aware = TestCacheAware()
+        cache_aware.set_cache_data('swr', 'fresh')
+        entry = cache.get(cache_aware.get_cache_key('swr'))
+        self.assertIsInstance(entry, CacheEnvelope)
+        self.assertEqual('fresh', cache_aware.get_cache_data('swr'))
+        self.assertEqual('fresh', cache_aware.get_or_set_cache_data('swr', lambda: 'new'))
+
+        cache.set(cache_aware.get_cache_key('swr'), CacheEnvelope('stale', time.time() - 1), 300)
+        refreshed = threading.Event()
+
+        def refresh():
+            refreshed.wait(5)
+            return 'new'
+
+        self.assertEqual('stale', cache_aware.get_or_set_cache_data('swr', refresh))
+        # refresh is already scheduled - the second stale read must not schedule another one
+        self.assertEqual('stale', cache_aware.get_or_set_cache_data('swr', lambda: 'duplicate'))
+        refreshed.set()
+        self.assertTrue(self._wait_for(lambda: cache_aware.get_cache_data('swr') == 'new'))
+        self.assertTrue(self._wait_for(lambda: cache.get(cache_aware.get_cache_lock_key('swr')) is None))
+
+        cache_aware.delete_cache_suffix('swr')
+        self.assertIsNone(cache_aware.get_cache_data('swr'))
+
+    def test_versioned(self):
+        first, second = TestVersionedCacheAware(1), TestVersionedCacheAware(2)
+        for cache_aware in (first, second):
+            cache_aware.set_cache_data('test1', cache_aware.pk)
+            cache_aware.set_cache_data('test2', cache_aware.pk)
+        key = first.get_cache_key('test1')
+        self.assertEqual(1, cache.get(key))
+
+        first.clear_cache()
+        self.assertNotEqual(key, first.get_cache_key('test1'))
+        self.assertIsNone(first.get_cache_data('test1'))
+        self.assertIsNone(TestVersionedCacheAware(1).get_cache_data('test2'))
+        self.assertEqual(2, TestVersionedCacheAware(2).get_cache_data('test1'))
+
+        first.set_cache_data('test1', 1)
+        TestVersionedCacheAware.clear_cache_for_suffix('test1')
+        first, second = TestVersionedCacheAware(1), TestVersionedCacheAware(2)
+        self.assertIsNone(first.get_cache_data('test1'))
+        self.assertIsNone(second.get_cache_data('test1'))
+        self.assertEqual(2, second.get_cache_data('test2'))
+
+        TestVersionedCacheAware.clear_cache_for_model()
+        self.assertIsNone(TestVersionedCacheAware(2).get_cache_data('test2'))
+
+    def test_versioned_evicted_generation(self):
+        cache_aware = TestVersionedCacheAware(3)
+        cache_aware.set_cache_data('test1', 'old')
+        cache.delete(cache_aware.get_cache_generation_key())
+        time.sleep(0.002)
+        self.assertIsNone(TestVersionedCacheAware(3).get_cache_data('test1'))
+
+    def test_prefetch(self):
+        instances = [TestVersionedCacheAware(pk) for pk in range(10, 15)]
+        instances[0].set_cache_data('test1', 'cached')
+        instances = [TestVersionedCacheAware(pk) for pk in range(10, 15)]
+        calls = []
+
+        def compute(instance):
+            calls.append(instance.pk)
+            return f'computed{instance.pk}'
+
+        TestVersionedCacheAware.prefetch_cache_data(instances, {'test1': compute, 'test2': None}, max_workers=2)
+        self.assertEqual([11, 12, 13, 14], sorted(calls))
+        self.assertEqual('computed11', cache.get(instances[1].get_cache_key('test1')))
+
+        for instance in instances:
+            cache.delete(instance.get_cache_key('test1'))
+        self.assertEqual('cached', instances[0].get_or_set_cache_data('test1', lambda: 'not prefetched'))
+        self.assertEqual('computed14', instances[4].get_cache_data('test1'))
+        self.assertIsNone(instances[4].get_cache_data('test2'))
+        self.assertEqual('test2', instances[4].get_or_set_cache_data('test2', lambda: 'test2'))
+        self.assertEqual('test2', cache.get(instances[4].get_cache_key('test2')))
+
+        instances[3].delete_cache_suffix('test1')
+        self.assertIsNone(instances[3].get_cache_data('test1'))
+
+    def test_local_cache(self):
+        local_cache = LocalCache(2)
+        local_cache.set('a', 1, 60)
+        local_cache.set('b', 2, 60)
+        self.assertEqual(1, local_cache.get('a'))
+        local_cache.set('c', 3, 60)
+        self.assertIsNone(local_cache.get('b'))
+        local_cache.set('d', 4, -1)
+        self.assertIsNone(local_cache.get('d'))
+        self.assertEqual({'hits': 1, 'misses': 2, 'size': 1, 'max_entries': 2}, local_cache.stats())
+
+    def test_local_cache_tier(self):
+        get_local_cache().clear()
+        cache_aware = TestVersionedCacheAware(20)
+        cache_aware.set_cache_data('local', 'value')
+        cache.delete(cache_aware.get_cache_key('local'))
+        self.assertEqual('value', cache_aware.get_cache_data('local'))
+        self.assertEqual(1, get_local_cache().stats()['hits'])
+
+        cache_aware.delete_cache_suffix('local')
+        cache.set(cache_aware.get_cache_key('local'), 'shared', 300)
+        self.assertEqual('shared', cache_aware.get_cache_data('local'))
+        cache.set(cache_aware.get_cache_key('local'), 'changed elsewhere', 300)
+        self.assertEqual('shared', cache_aware.get_cache_data('local'))
+
+        # invalidations in other processes change versioned keys, so local copies aren't served
+        TestVersionedCacheAware(20).clear_cache()
+        self.assertIsNone(TestVersionedCacheAware(20).get_cache_data('local'))
+        cache_aware = TestVersionedCacheAware(20)
+        cache_aware.set_cache_data('local', 'value')
+        TestVersionedCacheAware.clear_cache_for_model()
+        self.assertIsNone(TestVersionedCacheAware(20).get_cache_data('local'))
+
+        # generation counters are kept locally too, so hits don't touch the cache at all
+        TestVersionedCacheAware(20).set_cache_data('local', 'value')
+        with mock.patch.object(cache, 'get_many', side_effect=AssertionError), \
+                mock.patch.object(cache, 'get', side_effect=AssertionError):
+            self.assertEqual('value', TestVersionedCacheAware(20).get_cache_data('local'))
+
+        # increments made by other processes are seen when local copies of counters expire
+        cache.incr(TestVersionedCacheAware(20).get_cache_generation_key())
+        self.assertEqual('value', TestVersionedCacheAware(20).get_cache_data('local'))
+        get_local_cache().clear()
+        self.assertIsNone(TestVersionedCacheAware(20).get_cache_data('local'))
+
+        with self.assertRaises(TypeError):
+            type('TestLocalCacheAware', (AbstractCacheAware,), {
+                'cache_suffixes': AbstractCacheAware.cache_suffixes + {
+                    'local': CacheSuffixMeta('default', 300, local_lifetime=60),
+                },
+            })
+
+    def test_negative_caching(self):
+        cache_aware = TestCacheAware()
+        cache_aware.delete_cache_suffix('test1')
+        calls = []
+
+        def compute():
+            calls.append(1)
+
+        self.assertIsNone(cache_aware.get_or_set_cache_data('test1', compute))
+        self.assertIsNone(cache_aware.get_or_set_cache_data('test1', compute))
+        self.assertEqual(1, len(calls))
+        self.assertIs(CACHED_NONE, cache.get(cache_aware.get_cache_key('test1')))
+        self.assertIsNone(cache_aware.get_cache_data('test1'))
+
+        self.assertIsNone(cache_aware.get_or_set_cache_data('negative', compute))
+        self.assertIsNone(cache_aware.get_or_set_cache_data('negative', compute))
+        self.assertEqual(3, len(calls))
+
+    def test_cache_signals_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = CacheAwareModel.objects.create(), CacheAwareModel.objects.create()
+        for instance in (first, second):
+            instance.set_cache_data('test', instance.pk)
+
+        with mock.patch.object(LocMemCache, 'delete_many', autospec=True,
+                               side_effect=LocMemCache.delete_many) as delete_many:
+            with self.captureOnCommitCallbacks(execute=True):
+                first.save()
+                first.save()
+                second.save()
+                self.assertEqual(first.pk, first.get_cache_data('test'))
+            self.assertIsNone(first.get_cache_data('test'))
+            self.assertIsNone(second.get_cache_data('test'))
+            self.assertEqual(1, delete_many.call_count)
+
+            # invalidations of rolled back transactions aren't executed by following ones
+            first.set_cache_data('test', first.pk)
+            second.set_cache_data('test', second.pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        first.save()
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                second.save()
+            self.assertEqual(first.pk, first.get_cache_data('test'))
+            self.assertIsNone(second.get_cache_data('test'))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                with cache_invalidation_batch():
+                    first.save()
+                    second_pk = second.pk
+                    second.set_cache_data('test', second_pk)
+                    second.delete()
+                    self.assertEqual(first.pk, first.get_cache_data('test'))
+            self.assertIsNone(first.get_cache_data('test'))
+            self.assertIsNone(cache.get(f'testmodel{second_pk}__test'))
+            self.assertEqual(3, delete_many.call_count)
+
+    def test_cache_page_policies(self):
+        home = Site.objects.get(is_default_site=True).root_page
+        with self.captureOnCommitCallbacks(execute=True):
+            page = home.add_child(instance=CacheAwarePage(title='Published', slug='published'))
+            target = home.add_child(instance=CacheAwarePage(title='Target', slug='target'))
+        page.set_cache_data('title', 'Published')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            page.title = 'Draft'
+            revision = page.save_revision()
+        self.assertEqual('Published', page.get_cache_data('title'))
+
+        # direct saves of live pages, e.g. by imports or migrations, aren't drafts
+        target.set_cache_data('title', 'Target')
+        with self.captureOnCommitCallbacks(execute=True):
+            target.title = 'Saved'
+            target.save()
+        self.assertIsNone(target.get_cache_data('title'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            revision.publish()
+        self.assertEqual('Draft', cache.get(f'page{page.pk}__title'))
+
+        request = make_dummy_request(page)
+        self.assertEqual(('/published/', 'localhost'), (request.path, request.META['HTTP_HOST']))
+        with mock.patch.object(CacheAwarePage, 'get_cache_data_callables', side_effect=ValueError), \
+                self.assertLogs('commontail.signals.cache', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            page.save_revision().publish()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            page.unpublish()
+        self.assertIsNone(cache.get(f'page{page.pk}__title'))
+
+        page.set_cache_data('title', 'Draft')
+        with self.captureOnCommitCallbacks(execute=True):
+            page.move(target, 'last-child')
+        self.assertIsNone(cache.get(f'page{page.pk}__title'))
+
+    def test_cache_subtree_versioned(self):
+
+        def subtree_versioned(page):
+            page.cache_versioned = page.cache_subtree_versioned = True
+            return page
+
+        home = Site.objects.get(is_default_site=True).root_page
+        with self.captureOnCommitCallbacks(execute=True):
+            section = home.add_child(instance=CacheAwarePage(title='Section', slug='section'))
+            other = home.add_child(instance=CacheAwarePage(title='Other', slug='other'))
+            child = section.add_child(instance=CacheAwarePage(title='Child', slug='child'))
+            grandchild = subtree_versioned(child.add_child(instance=CacheAwarePage(title='Grandchild',
+                                                                                   slug='grandchild')))
+            outsider = subtree_versioned(other.add_child(instance=CacheAwarePage(title='Outsider', slug='outsider')))
+        grandchild.set_cache_data('title', 'Grandchild')
+        outsider.set_cache_data('title', 'Outsider')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            section.title = 'Renamed section'
+            section.save_revision().publish()
+
+        self.assertIsNone(subtree_versioned(CacheAwarePage.objects.get(pk=grandchild.pk)).get_cache_data('title'))
+        self.assertEqual('Outsider',
+                         subtree_versioned(CacheAwarePage.objects.get(pk=outsider.pk)).get_cache_data('title'))
+
+        outsider.set_cache_data('title', 'Outsider')
+        with self.captureOnCommitCallbacks(execute=True):
+            other.move(section, 'last-child')
+        self.assertIsNone(subtree_versioned(CacheAwarePage.objects.get(pk=outsider.pk)).get_cache_data('title'))
+
+    def test_cache_dependencies(self):
+        site = Site.objects.get(is_default_site=True)
+        instance = TestCacheAware()
+        cache.clear()
+
+        self.assertEqual('explicit', instance.get_or_set_cache_data('test1', lambda: 'explicit', [site]))
+
+        def computed():
+            register_cache_dependency(site)
+            return 'collected'
+
+        local_instance = TestVersionedCacheAware(30)
+        self.assertEqual('collected', local_instance.get_or_set_cache_data('local', computed))
+        self.assertEqual(2, len(cache.get(get_cache_dependency_key(f'wagtailcore.site:{site.pk}'))))
+
+        # e.g. loaddata
+        with self.captureOnCommitCallbacks(execute=True):
+            site.save_base(raw=True)
+        self.assertEqual('explicit', instance.get_cache_data('test1'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            site.save()
+            self.assertEqual('explicit', instance.get_cache_data('test1'))
+
+        self.assertIsNone(instance.get_cache_data('test1'))
+        self.assertIsNone(local_instance.get_cache_data('local'))
+        self.assertIsNone(cache.get(get_cache_dependency_key(f'wagtailcore.site:{site.pk}')))
+
+    @override_settings(COMMONTAIL_CACHE_DEPENDENCY_INDEX_MAX_KEYS=2)
+    def test_cache_dependencies_bounded(self):
+        site = Site.objects.get(is_default_site=True)
+        instances = [TestVersionedCacheAware(pk) for pk in range(3)]
+        for instance in instances:
+            instance.get_or_set_cache_data('test1', lambda: 'data', [site])
+
+        # the oldest key is dropped from the index, but its entry is kept
+        self.assertEqual('data', instances[0].get_cache_data('test1'))
+        self.assertEqual([('default', i.get_cache_key('test1')) for i in instances[1:]],
+                         cache.get(get_cache_dependency_key(f'wagtailcore.site:{site.pk}')))
+
+    def test_cache_dependency_models(self):
+        site = Site.objects.get(is_default_site=True)
+        cache.clear()
+        instances = [TestCacheAware(), TestVersionedCacheAware(40)]
+
+        def computed():
+            register_cache_dependency(site)
+            return 'site'
+
+        for instance in instances:
+            self.assertEqual('site', instance.get_or_set_cache_data('site', computed))
+            self.assertEqual('site', instance.get_cache_data('site'))
+        # dependencies on models of dependency_models aren't indexed
+        self.assertIsNone(cache.get(get_cache_dependency_key(f'wagtailcore.site:{site.pk}')))
+
+        # creation of an instance can't invalidate anything
+        with self.captureOnCommitCallbacks(execute=True):
+            Site.objects.create(hostname='other', root_page=site.root_page)
+        self.assertTrue(all(i.get_cache_data('site') == 'site' for i in instances))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            site.save()
+        self.assertIsNone(TestCacheAware().get_cache_data('site'))
+        self.assertIsNone(TestVersionedCacheAware(40).get_cache_data('site'))
+
+    def _test_cache_metrics(self):
+        sink = get_cache_metrics_sink()
+        sink.reset()
+        instance = TestCacheAware()
+        instance.clear_cache()
+        instance.get_or_set_cache_data('test1', lambda: 'x' * 2000)
+        instance.get_or_set_cache_data('test1', lambda: 'x' * 2000)
+        instance.get_cache_data('test1')
+
+        labels = CacheMetricLabels(f'{__name__}.TestCacheAware', 'test1', 'default')
+        counters, histograms = sink.get_metrics()
+        self.assertEqual(2, counters[(labels, 'hits')])
+        self.assertEqual(1, counters[(labels, 'misses')])
+        self.assertEqual(1, counters[(labels, 'invalidations')])
+        self.assertEqual(1, sum(histograms[(labels, 'recompute_seconds')].counts))
+        self.assertEqual(1, sum(histograms[(labels, 'set_seconds')].counts))
+        self.assertEqual([0, 0, 1, 0, 0, 0, 0, 0], histograms[(labels, 'payload_bytes')].counts)
+
+        response = cache_metrics(RequestFactory().get('/metrics/'))
+        self.assertIn(
+            f'commontail_cache_hits_total{{model="{labels.model}",suffix="test1",alias="default"}} 2',
+            response.content.decode()
+        )
+        self.assertIn(
+            f'commontail_cache_payload_bytes_bucket{{model="{labels.model}",suffix="test1",alias="default",'
+            f'le="+Inf"}} 1',
+            response.content.decode()
+        )
+
+        output = StringIO()
+        call_command('commontail_cache_stats', '--reset', stdout=output)
+        self.assertIn('66.7', output.getvalue())
+        self.assertEqual(({}, {}), sink.get_metrics())
+
+        # payloads, which aren't serialized yet, are measured with sampling
+        with override_settings(COMMONTAIL_CACHE_PAYLOAD_SAMPLE_RATE=0.0):
+            instance.set_cache_data('test1', ['x' * 2000])
+        self.assertNotIn((labels, 'payload_bytes'), sink.get_metrics()[1])
+        with override_settings(COMMONTAIL_CACHE_PAYLOAD_SAMPLE_RATE=1.0):
+            instance.set_cache_data('test1', ['x' * 2000])
+        self.assertEqual(1, sum(sink.get_metrics()[1][(labels, 'payload_bytes')].counts))
+
+    def test_cache_metrics(self):
+        self._test_cache_metrics()
+
+    @override_settings(COMMONTAIL_CACHE_METRICS_SINK='commontail.models.cache.CacheBackendMetricsSink')
+    def test_cache_metrics_shared(self):
+        self._test_cache_metrics()
+
+    def test_warm_cache_command(self):
+        home = Site.objects.get(is_default_site=True).root_page
+        first = home.add_child(instance=CacheAwarePage(title='First', slug='first'))
+        second = home.add_child(instance=CacheAwarePage(title='Second', slug='second'))
+        home.add_child(instance=CacheAwarePage(title='Draft', slug='draft', live=False))
+        first.clear_cache()
+        second.clear_cache()
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'checkpoint')
+            with open(checkpoint, 'w') as f:
+                f.write(str(first.pk))
+
+            output = StringIO()
+            call_command('commontail_warm_cache', '--checkpoint', checkpoint, '--chunk-size', '1', stdout=output)
+            self.assertIn('1/1 pages processed', output.getvalue())
+            self.assertIsNone(first.get_cache_data('title'))
+            self.assertEqual('Second', second.get_cache_data('title'))
+
+            os.remove(checkpoint)
+            call_command('commontail_warm_cache', '--root', str(home.pk), '--content-type', 'tests.cacheawarepage',
+                         stdout=StringIO())
+            self.assertEqual('First', first.get_cache_data('title'))
+
+        # process pools read pks in batches, closing connections before workers are forked
+        queryset = Page.objects.filter(pk__in=[first.pk, second.pk]).order_by('pk')
+        with mock.patch.object(commontail_warm_cache, '_PKS_BATCH_SIZE', 1), \
+                mock.patch.object(connections, 'close_all') as close_all:
+            chunks = commontail_warm_cache.Command._get_chunks(queryset, 1, close_connections=True)
+            self.assertEqual([first.pk], next(chunks))
+            self.assertEqual(1, close_all.call_count)
+            self.assertEqual([[second.pk]], list(chunks))
+            self.assertEqual(3, close_all.call_count)
+
+    def test_clear_cache_bulk(self):
+        home = Site.objects.get(is_default_site=True).root_page
+        pages = [home.add_child(instance=CacheAwarePage(title=f'Page {i}', slug=f'page-{i}')) for i in range(5)]
+        for page in pages:
+            page.set_cache_data('title', page.title)
+
+        with mock.patch.object(LocMemCache, 'delete_many', autospec=True,
+                               side_effect=LocMemCache.delete_many) as delete_many, self.assertNumQueries(1):
+            self.assertEqual(5, CacheAwarePage.clear_cache_bulk(
+                CacheAwarePage.objects.filter(pk__in=[p.pk for p in pages]), chunk_size=2
+            ))
+        self.assertEqual(3, delete_many.call_count)
+        self.assertTrue(all(p.get_cache_data('title') is None for p in pages))
+
+        # specific classes are resolved, so their own suffixes are invalidated and abstract classes may be used
+        for page in pages:
+            page.set_cache_data('title', page.title)
+        self.assertEqual(5, AbstractCacheAwarePage.clear_cache_bulk(
+            Page.objects.filter(pk__in=[home.pk] + [p.pk for p in pages])
+        ))
+        self.assertTrue(all(p.get_cache_data('title') is None for p in pages))
+
+        # pages of classes with own prefixes are loaded
+        with mock.patch.object(CacheAwarePage, 'get_cache_prefix', lambda self: f'titled{self.pk}{self.slug}'):
+            for page in pages:
+                page.set_cache_data('title', page.title)
+            with self.assertNumQueries(2):
+                CacheAwarePage.clear_cache_bulk(CacheAwarePage.objects.filter(pk__in=[p.pk for p in pages]))
+            self.assertTrue(all(p.get_cache_data('title') is None for p in pages))
+
+        versioned = [TestVersionedCacheAware(pk) for pk in range(3)]
+        for instance in versioned:
+            instance.set_cache_data('test1', instance.pk)
+        generations = cache.get_many([i.get_cache_generation_key() for i in versioned])
+        self.assertEqual(3, TestVersionedCacheAware.clear_cache_bulk(versioned))
+        self.assertEqual({k: v + 1 for k, v in generations.items()}, cache.get_many(list(generations.keys())))
+        self.assertTrue(all(TestVersionedCacheAware(i.pk).get_cache_data('test1') is None for i in versioned))
+
+    def test_lifetime_jitter(self):
+        meta = CacheSuffixMeta('default', 86400, lifetime_jitter=0.1)
+        keys = [f'page{pk}__opengraph' for pk in range(10000)]
+        lifetimes = [AbstractCacheAware._get_cache_lifetime(meta, 'data', key) for key in keys]
+
+        self.assertEqual(lifetimes, [AbstractCacheAware._get_cache_lifetime(meta, 'data', key) for key in keys])
+        self.assertTrue(all(86400 * 0.9 <= lifetime <= 86400 for lifetime in lifetimes))
+        histogram = Counter(lifetimes)
+        self.assertEqual(100, len(histogram))
+        self.assertLess(max(histogram.values()), 10000 / 100 * 1.5)
+        self.assertEqual({86400: 10000}, Counter(
+            AbstractCacheAware._get_cache_lifetime(meta._replace(lifetime_jitter=None), 'data', key) for key in keys
+        ))
+
+        cache_aware = TestCacheAware()
+        with mock.patch.object(LocMemCache, 'set') as cache_set:
+            cache_aware.set_cache_data('jitter', 'data')
+        self.assertEqual(
+            AbstractCacheAware._get_cache_lifetime(cache_aware.get_cache_meta('jitter'), 'data',
+                                                   cache_aware.get_cache_key('jitter')),
+            cache_set.call_args[0][2]
+        )
+
+    async def test_async(self):
+        cache.clear()
+        cache_aware = TestCacheAware()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return 'async'
+
+        self.assertEqual(['async', 'async'], await asyncio.gather(
+            cache_aware.aget_or_set_cache_data('single_flight', compute),
+            cache_aware.aget_or_set_cache_data('single_flight', compute),
+        ))
+        self.assertEqual(1, len(calls))
+        self.assertEqual('async', await cache_aware.aget_cache_data('single_flight'))
+
+        self.assertEqual('sync', await cache_aware.aget_or_set_cache_data('test1', lambda: 'sync'))
+        self.assertEqual('sync', await cache_aware.aget_or_set_cache_data('test1', compute))
+        await cache_aware.aset_cache_data('test1', 'set')
+        self.assertEqual('set', cache_aware.get_cache_data('test1'))
+
+        versioned = TestVersionedCacheAware(1)
+        await versioned.aset_cache_data('test1', 'versioned')
+        await versioned.aclear_cache()
+        self.assertIsNone(await versioned.aget_cache_data('test1'))
+
+        site = await sync_to_async(Site.objects.get)(is_default_site=True)
+
+        async def dependent():
+            register_cache_dependency(site)
+            return 'dependent'
+
+        self.assertEqual('dependent', await cache_aware.aget_or_set_cache_data('negative', dependent))
+        self.assertEqual(1, len(cache.get(get_cache_dependency_key(f'wagtailcore.site:{site.pk}'))))
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'faulty': {'BACKEND': 'tests.cache.FaultInjectingCache', 'LOCATION': 'faulty'},
+    }, COMMONTAIL_CACHE_CIRCUIT_BREAKER_FAILURES=2, COMMONTAIL_CACHE_CIRCUIT_BREAKER_SLOW_CALL=0.05,
+        COMMONTAIL_CACHE_CIRCUIT_BREAKER_COOLDOWN=0.2)
+    def test_circuit_breaker(self):
+        cache_aware = TestFaultyCacheAware()
+        breaker = get_cache_circuit_breaker('faulty')
+        FaultInjectingCache.calls = 0
+        try:
+            FaultInjectingCache.failing = True
+            with self.assertLogs('commontail.models.cache', 'WARNING') as logs:
+                self.assertEqual('computed', cache_aware.get_or_set_cache_data('faulty', lambda: 'computed'))
+            self.assertEqual(CacheCircuitBreaker.OPEN, breaker.state)
+            self.assertIn('skipping it for 0.2 seconds', logs.output[-1])
+            self.assertEqual(2, FaultInjectingCache.calls)
+
+            self.assertEqual('direct', cache_aware.get_or_set_cache_data('faulty', lambda: 'direct'))
+            self.assertEqual(2, FaultInjectingCache.calls)
+
+            FaultInjectingCache.failing = False
+            time.sleep(0.25)
+            with self.assertLogs('commontail.models.cache', 'INFO') as logs:
+                self.assertEqual('recovered', cache_aware.get_or_set_cache_data('faulty', lambda: 'recovered'))
+            self.assertEqual(CacheCircuitBreaker.CLOSED, breaker.state)
+            self.assertIn('recovered', logs.output[-1])
+            self.assertEqual('recovered', cache_aware.get_cache_data('faulty'))
+
+            # invalidations executed after commit are logged instead of being raised
+            FaultInjectingCache.failing = True
+            batch = CacheInvalidationBatch()
+            batch.add_key('faulty', cache_aware.get_cache_key('faulty'))
+            with self.assertLogs('commontail.models.cache', 'ERROR'):
+                self.assertFalse(batch.flush())
+            FaultInjectingCache.failing = False
+
+            FaultInjectingCache.delay = 0.1
+            with self.assertLogs('commontail.models.cache', 'WARNING'):
+                cache_aware.get_cache_data('faulty')
+                cache_aware.get_cache_data('faulty')
+            self.assertEqual(CacheCircuitBreaker.OPEN, breaker.state)
+        finally:
+            FaultInjectingCache.failing = False
+            FaultInjectingCache.delay = 0.0
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'faulty': {'BACKEND': 'tests.cache.FaultInjectingCache', 'LOCATION': 'faulty'},
+    }, COMMONTAIL_CACHE_METRICS_SINK='commontail.models.cache.CacheBackendMetricsSink',
+        COMMONTAIL_CACHE_METRICS_ALIAS='faulty', COMMONTAIL_CACHE_CIRCUIT_BREAKER_FAILURES=2)
+    def test_faulty_metrics(self):
+        cache_aware = TestCacheAware()
+        cache_aware.clear_cache()
+        FaultInjectingCache.calls = 0
+        try:
+            FaultInjectingCache.failing = True
+            with self.assertLogs('commontail.models.cache', 'WARNING'):
+                self.assertEqual('computed', cache_aware.get_or_set_cache_data('test1', lambda: 'computed'))
+                self.assertEqual('computed', cache_aware.get_cache_data('test1'))
+            self.assertEqual(CacheCircuitBreaker.OPEN, get_cache_circuit_breaker('faulty').state)
+            self.assertEqual(2, FaultInjectingCache.calls)
+        finally:
+            FaultInjectingCache.failing = False
+
+    def test_serializers(self):
+        data = [('og:type', 'website'), ('og:title', 'Title ' * 50), ('og:image:width', 1200)]
+        for serializer in (PickleCacheSerializer(), MarshalCacheSerializer(), ZlibCacheSerializer(threshold=64),
+                           ZlibCacheSerializer(MarshalCacheSerializer(), threshold=1024)):
+            self.assertEqual(data, serializer.decode(serializer.encode(data)))
+        self.assertEqual([list(t) for t in data], JSONCacheSerializer().decode(JSONCacheSerializer().encode(data)))
+        self.assertLess(len(ZlibCacheSerializer(threshold=64).encode(data)), len(PickleCacheSerializer().encode(data)))
+        with self.assertRaises(ValueError):
+            MarshalCacheSerializer().decode(PickleCacheSerializer().encode(data))
+
+        cache_aware = TestCacheAware()
+        cache_aware.set_cache_data('marshal', data)
+        self.assertTrue(cache.get(cache_aware.get_cache_key('marshal')).startswith(b'zlib-marshal'))
+        self.assertEqual(data, cache_aware.get_cache_data('marshal'))
+        cache_aware.prefetch_cache_data([cache_aware], {'marshal': None})
+        self.assertEqual(data, cache_aware.get_cache_data('marshal'))
+
+        cache_aware.set_cache_data('json', {'a': 1})
+        self.assertIsInstance(cache.get(cache_aware.get_cache_key('json')), CacheEnvelope)
+        self.assertEqual({'a': 1}, cache_aware.get_cache_data('json'))
+        cache_aware.set_cache_data('json', None)
+        self.assertIsNone(cache_aware.get_or_set_cache_data('json', lambda: 'not computed'))
+
+        # entries failing to encode are returned but not cached
+        cache.delete(cache_aware.get_cache_key('json'))
+        with self.assertLogs('commontail.models.cache', 'WARNING'):
+            self.assertEqual({1, 2}, cache_aware.get_or_set_cache_data('json', lambda: {1, 2}))
+        self.assertIsNone(cache.get(cache_aware.get_cache_key('json')))
+        with self.assertLogs('commontail.models.cache', 'WARNING'):
+            cache_aware.prefetch_cache_data([cache_aware], {'json': lambda _: {1, 2}})
+        self.assertIsNone(cache.get(cache_aware.get_cache_key('json')))
+
+        # entries stored in another format are misses
+        cache_aware = TestCacheAware()
+        cache.set(cache_aware.get_cache_key('marshal'), data)
+        self.assertIsNone(cache_aware.get_cache_data('marshal'))
+        self.assertEqual('recomputed', cache_aware.get_or_set_cache_data('marshal', lambda: 'recomputed'))
+
+    def test_shard_ring(self):
+        keys = [f'page{pk}__opengraph' for pk in range(10000)]
+        ring = CacheShardRing(['a', 'b', 'c'], 160)
+        before = {key: ring.get_alias(key) for key in keys}
+        shares = Counter(before.values())
+        self.assertTrue(all(2500 < shares[alias] < 4200 for alias in 'abc'))
+
+        after = {key: CacheShardRing(['a', 'b', 'c', 'd'], 160).get_alias(key) for key in keys}
+        moved = [key for key in keys if before[key] != after[key]]
+        self.assertLess(len(moved), 10000 * 0.35)
+        self.assertTrue(all(after[key] == 'd' for key in moved))
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shard1': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shard1'},
+        'shard2': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shard2'},
+    }, COMMONTAIL_CACHE_SHARD_GROUPS={'sharded': ['shard1', 'shard2']})
+    def test_sharding(self):
+        instances = [TestShardedCacheAware(pk) for pk in range(20)]
+        for instance in instances:
+            instance.set_cache_data('sharded', instance.pk)
+
+        aliases = set()
+        for instance in instances:
+            key = instance.get_cache_key('sharded')
+            alias = get_cache_alias('sharded', key)
+            aliases.add(alias)
+            self.assertEqual(instance.pk, caches[alias].get(key))
+            self.assertIsNone(caches[{'shard1': 'shard2', 'shard2': 'shard1'}[alias]].get(key))
+            self.assertEqual(instance.pk, instance.get_cache_data('sharded'))
+        self.assertEqual({'shard1', 'shard2'}, aliases)
+
+        TestShardedCacheAware.prefetch_cache_data(instances, {'sharded': None})
+        self.assertEqual([i.pk for i in instances], [i.get_cache_data('sharded') for i in instances])
+
+        batch = CacheInvalidationBatch()
+        for instance in instances:
+            instance.clear_cache(batch)
+        with mock.patch.object(LocMemCache, 'delete_many', autospec=True,
+                               side_effect=LocMemCache.delete_many) as delete_many:
+            batch.flush()
+        self.assertEqual(2, delete_many.call_count)
+        self.assertTrue(all(i.get_cache_data('sharded') is None for i in instances))
@@ -0,0 +1,266 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models.signals import post_init
+from django.test import TestCase, override_settings
+
+from wagtail.core.models import Page, Site
+
+from commontail.models import InheritedPageLink, InheritedPageLinksState, LinkedPageRecord, LinksOwnerPage, \
+    PageLinkCategory, PageLinkCategoryGroup, PageLinkCategoryToPageLinkCategoryGroup, PageLinksCollector
+
+from ..models import LinksPage, LinksPageLink, OtherLinksPage, OtherLinksPageLink
+
+
+class TestLinks(TestCase):
+
+    def setUp(self):
+        # invalidations of the fixture are flushed as if it was committed
+        with self.captureOnCommitCallbacks(execute=True):
+            PageLinkCategoryGroup.objects.create(title='All', handle='all')
+            self.related = PageLinkCategory.objects.create(title='Related')
+            self.other = PageLinkCategory.objects.create(title='Other')
+            PageLinkCategoryToPageLinkCategoryGroup.objects.create(
+                category=self.related,
+                group=PageLinkCategoryGroup.objects.create(title='Related only', handle='related'), sort_order=0
+            )
+
+            home = Site.objects.get(is_default_site=True).root_page
+            self.targets = [home.add_child(instance=Page(title=f'Target {i}', slug=f'target-{i}')) for i in range(6)]
+            self.section = home.add_child(instance=LinksPage(title='Section', slug='section'))
+            self.subsection = self.section.add_child(instance=OtherLinksPage(title='Subsection', slug='subsection'))
+            self.draft = self.subsection.add_child(instance=LinksPage(title='Draft', slug='draft', live=False))
+            self.plain = self.draft.add_child(instance=Page(title='Plain', slug='plain'))
+            self.page = self.plain.add_child(instance=LinksPage(title='Page', slug='page'))
+
+            t = self.targets
+            self._link(self.section, t[0], t[1], t[2], t[3])
+            self._link(self.section, t[5], inherit=False)
+            self._link(self.subsection, t[2], t[4], t[1])
+            self._link(self.subsection, t[0], category=self.other)
+            self._link(self.draft, t[5])
+            self._link(self.page, t[4], t[3])
+
+    def _link(self, owner, *targets, inherit=True, category=None):
+        link_model = OtherLinksPageLink if isinstance(owner, OtherLinksPage) else LinksPageLink
+        start = link_model.objects.filter(page=owner).count()
+        for i, target in enumerate(targets):
+            link_model.objects.create(page=owner, target=target, category=category or self.related, inherit=inherit,
+                                      sort_order=start + i)
+
+    def _targets(self, links):
+        return [self.targets.index(link.target) for link in links]
+
+    def test_collect_from_ancestors(self):
+        self.assertEqual([(LinksPageLink, 'page'), (OtherLinksPageLink, 'page')],
+                         sorted(PageLinksCollector.get_link_relations('page_links'), key=lambda r: r[0].__name__))
+
+        self.assertEqual([4, 3, 2, 1, 0], self._targets(self.page.get_linked_pages()))
+        self.assertEqual([4, 3, 2, 1, 0], self._targets(self.page.get_linked_pages(ancestors_depth=2)))
+        self.assertEqual([4, 3, 2, 1, 0], self._targets(self.page.get_linked_pages(ancestors_depth=1)))
+        self.assertEqual([4, 3, 2, 1], self._targets(self.page.get_linked_pages('related', ancestors_depth=1)))
+        self.assertEqual([4, 3, 0, 1, 2], self._targets(self.page.get_linked_pages(ancestors_depth=0)))
+        self.assertEqual([4, 3], self._targets(self.page.get_linked_pages(ancestors_depth=None)))
+        self.assertEqual([4, 3, 2], self._targets(self.page.get_linked_pages(count=3)))
+        self.assertEqual([2, 4, 1, 0, 3], self._targets(self.subsection.get_linked_pages(handle='all')))
+
+        grouped = self.subsection.get_linked_pages(handle='all', group=True)
+        self.assertEqual(['Related', 'Other'], list(grouped.keys()))
+        self.assertEqual([0], self._targets(grouped['Other']))
+
+        collector = PageLinksCollector(self.page, 'page_links', 'target_id', ancestors_depth=3)
+        with self.assertNumQueries(2):  # one per link model
+            links = collector.collect_from_ancestors([self.targets[4].pk], {'inherit': True}, None, ['target'])
+        self.assertEqual([2, 1, 0, 3], self._targets(links))
+
+    def test_collect_limit(self):
+        instances = []
+
+        def count_links(sender, instance, **kwargs):
+            if isinstance(instance, (LinksPageLink, OtherLinksPageLink)):
+                instances.append(instance)
+
+        self.assertEqual([0, 1, 2, 3, 5, 4], self._targets(self.section.get_linked_pages(include_descendants=True)))
+
+        post_init.connect(count_links)
+        try:
+            with self.assertNumQueries(2):  # group and links of the page itself
+                links = self.section.get_linked_pages(count=2, include_descendants=True)
+            self.assertEqual([0, 1], self._targets(links))
+            self.assertEqual(2, len(instances))
+
+            instances.clear()
+            with self.assertNumQueries(6):  # group, the page itself, ancestors and descendants per link model
+                self.assertEqual([0, 1, 2, 3, 5, 4],
+                                 self._targets(self.section.get_linked_pages(count=6, include_descendants=True)))
+            self.assertEqual(7, len(instances))  # budget of one link per link model is left for descendants
+        finally:
+            post_init.disconnect(count_links)
+
+    def test_exists(self):
+        with self.assertNumQueries(2):  # group and links
+            self.assertTrue(self.page.has_linked_pages())
+        with self.assertNumQueries(2):
+            self.assertTrue(self.section.has_linked_pages('related', excludes={'inherit': True}))
+        self.assertFalse(self.section.has_linked_pages(filters={'target': self.targets[4]}))
+        with self.assertNumQueries(2):
+            self.assertTrue(
+                self.section.has_linked_pages(filters={'target': self.targets[4]}, include_descendants=True)
+            )
+        self.assertFalse(self.page.has_linked_pages(filters={'target': self.targets[5]}))
+        self.assertFalse(self.page.has_linked_pages(filters={'target': self.targets[0]}, ancestors_depth=None))
+        self.assertTrue(self.page.has_linked_pages(filters={'target': self.targets[0]}, ancestors_depth=1))
+        self.assertFalse(self.page.has_linked_pages('related', filters={'target': self.targets[0]}, ancestors_depth=1))
+        self.assertTrue(self.page.has_linked_pages('related', filters={'target': self.targets[0]}))
+        with self.assertNumQueries(1):
+            self.assertTrue(self.page.has_linked_items('page_links', filters={'target': self.targets[1]}))
+
+    def test_bulk(self):
+        pages = [self.section, self.subsection, self.draft, self.page]
+        for kwargs in ({}, {'count': 3}, {'ancestors_depth': 1}, {'ancestors_depth': 0}, {'ancestors_depth': None},
+                       {'include_descendants': True}, {'include_descendants': True, 'handle': 'related'},
+                       {'excludes': {'target': self.targets[2]}}):
+            bulk = LinksPage.get_linked_pages_bulk(pages, **kwargs)
+            for page in pages:
+                self.assertEqual(self._targets(page.get_linked_pages(**kwargs)), self._targets(bulk[page.pk]), kwargs)
+
+        # group, ancestors, links of pages, ancestors and descendants per link model, categories
+        with self.assertNumQueries(10):
+            grouped = LinksPage.get_linked_pages_bulk(pages, group=True, include_descendants=True)
+        self.assertEqual(['Related', 'Other'], list(grouped[self.subsection.pk].keys()))
+        self.assertEqual([0], self._targets(grouped[self.subsection.pk]['Other']))
+
+    def test_cached_linked_pages(self):
+        cache.clear()
+        generation_key = LinksOwnerPage.get_linked_pages_generation_key()
+        records = self.page.get_cached_linked_pages(count=3)
+        self.assertEqual([LinkedPageRecord(t.pk, t.url, t.title, self.related.pk) for t in self.targets[4:1:-1]],
+                         records)
+        with self.assertNumQueries(0):
+            self.assertEqual(records, self.page.get_cached_linked_pages(count=3))
+        self.assertEqual([0, 1, 2, 3, 5], [self.targets.index(Page.objects.get(pk=r.target_id))
+                                           for r in self.section.get_cached_linked_pages('related')])
+        grouped = self.subsection.get_cached_linked_pages(group=True)
+        self.assertEqual(['Related', 'Other'], list(grouped.keys()))
+        self.assertEqual([self.targets[0].pk], [r.target_id for r in grouped['Other']])
+
+        self.section.get_cached_linked_pages(include_descendants=True)
+        descendants_key = LinksOwnerPage.get_linked_pages_descendants_generation_key(self.section.path)
+        descendants_generation = cache.get(descendants_key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._link(self.page, self.targets[0])
+        self.assertEqual(self.targets[0].pk, self.page.get_cached_linked_pages(count=3)[2].target_id)
+        # owner's ancestors are invalidated only for results with descendants
+        with self.assertNumQueries(0):
+            self.section.get_cached_linked_pages('related')
+        self.assertNotEqual(descendants_generation, cache.get(descendants_key))
+        with self.captureOnCommitCallbacks(execute=True):
+            Page.objects.get(pk=self.page.pk).specific.save_revision().publish()
+        with self.assertNumQueries(0):
+            self.section.get_cached_linked_pages('related')
+
+        generation = cache.get(generation_key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plain.save_revision().publish()
+        self.assertEqual(generation, cache.get(generation_key))  # neither a target nor an owner
+        self.targets[1].title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.targets[1].save_revision().publish()
+        self.assertEqual('Renamed', self.section.get_cached_linked_pages('related')[1].title)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PageLinkCategoryToPageLinkCategoryGroup.objects.filter(category=self.related,
+                                                                   group__handle='related').delete()
+        self.assertEqual([], self.section.get_cached_linked_pages('related'))
+
+        # paths are resolved once per transaction, not per saved link or event
+        with self.captureOnCommitCallbacks() as callbacks:
+            for target in self.targets[:3]:
+                self._link(self.page, target)
+            self.targets[0].save_revision().publish()
+            self.targets[1].save_revision().publish()
+        with self.assertNumQueries(3):
+            for callback in callbacks:
+                callback()
+
+    def test_materialized(self):
+        pages = [self.section, self.subsection, self.draft, self.page]
+        kwargs_list = ({}, {'count': 3}, {'handle': 'related'}, {'live_only': False})
+        expected = {(page.pk, i): self._targets(page.get_linked_pages(**kwargs))
+                    for page in pages for i, kwargs in enumerate(kwargs_list)}
+
+        with override_settings(COMMONTAIL_PAGE_LINKS_MATERIALIZED=True):
+            # pages, which haven't been materialized yet, are served by the collector
+            self.assertEqual(expected[(self.page.pk, 0)], self._targets(self.page.get_linked_pages()))
+
+            call_command('commontail_rebuild_inherited_links', stdout=StringIO())
+            self.assertEqual(5, InheritedPageLink.objects.filter(page_id=self.page.pk, group__handle='all').count())
+            for page in pages:
+                for i, kwargs in enumerate(kwargs_list):
+                    self.assertEqual(expected[(page.pk, i)], self._targets(page.get_linked_pages(**kwargs)), kwargs)
+            with self.assertNumQueries(1):
+                self.assertEqual([4, 3, 2, 1, 0], self._targets(self.page.get_linked_pages()))
+            grouped = self.subsection.get_linked_pages(handle='all', group=True)
+            self.assertEqual(['Related', 'Other'], list(grouped.keys()))
+            self.assertEqual([0], self._targets(grouped['Other']))
+            # other arguments are served by the collector
+            self.assertEqual([4, 3], self._targets(self.page.get_linked_pages(ancestors_depth=None)))
+            with self.assertRaises(ValueError):
+                self.page.get_linked_pages('unknown')
+
+            # results of the collector are compared with rows rebuilt incrementally
+            for change in (lambda: self._link(self.subsection, self.targets[3]), self.subsection.unpublish,
+                           lambda: self.page.move(self.section, 'last-child'),
+                           lambda: PageLinkCategoryToPageLinkCategoryGroup.objects.create(
+                               category=self.other, group=PageLinkCategoryGroup.objects.get(handle='related'),
+                               sort_order=1
+                           )):
+                with self.captureOnCommitCallbacks(execute=True):
+                    change()
+                for page in pages:
+                    materialized = self._targets(Page.objects.get(pk=page.pk).specific.get_linked_pages('related'))
+                    with override_settings(COMMONTAIL_PAGE_LINKS_MATERIALIZED=False):
+                        self.assertEqual(
+                            self._targets(Page.objects.get(pk=page.pk).specific.get_linked_pages('related')),
+                            materialized
+                        )
+            self.assertEqual([4, 3, 0, 1, 2], self._targets(self.page.get_linked_pages('related')))
+            self.assertEqual(len(pages), InheritedPageLinksState.objects.count())
+
+            # changes, which don't affect rows, don't rebuild them
+            rows = list(InheritedPageLink.objects.order_by('pk').values_list('pk', flat=True))
+            with self.captureOnCommitCallbacks(execute=True):
+                Page.objects.get(pk=self.section.pk).specific.save_revision().publish()
+                self.other.title = 'Renamed'
+                self.other.save()
+                relation = PageLinkCategoryToPageLinkCategoryGroup.objects.get(category=self.other,
+                                                                               group__handle='related')
+                relation.sort_order = 2
+                relation.save()
+            self.assertEqual(rows, list(InheritedPageLink.objects.order_by('pk').values_list('pk', flat=True)))
+
+            # big subtrees are left to the command
+            with override_settings(COMMONTAIL_PAGE_LINKS_MATERIALIZED_SYNC_LIMIT=1), \
+                    self.assertLogs('commontail.signals.links', 'WARNING'), \
+                    self.captureOnCommitCallbacks(execute=True):
+                self._link(Page.objects.get(pk=self.section.pk).specific, self.targets[4])
+            self.assertFalse(InheritedPageLinksState.objects.exists())
+            with override_settings(COMMONTAIL_PAGE_LINKS_MATERIALIZED=False):
+                expected = self._targets(self.subsection.get_linked_pages())
+            self.assertEqual(expected, self._targets(self.subsection.get_linked_pages()))
+
+            # failed rebuilds don't fail committed changes, the subtree is served by the collector
+            call_command('commontail_rebuild_inherited_links', stdout=StringIO())
+            with mock.patch.object(InheritedPageLink, 'rebuild', side_effect=RuntimeError), \
+                    self.assertLogs('commontail.signals.links', 'ERROR'), \
+                    self.captureOnCommitCallbacks(execute=True):
+                self._link(Page.objects.get(pk=self.subsection.pk).specific, self.targets[5])
+            subtree = Page.objects.get(pk=self.subsection.pk).path
+            self.assertFalse(InheritedPageLinksState.objects.filter(page__path__startswith=subtree).exists())
+            self.assertFalse(InheritedPageLink.objects.filter(page__path__startswith=subtree).exists())
+            self.assertTrue(InheritedPageLinksState.objects.filter(page=self.section).exists())
+            with override_settings(COMMONTAIL_PAGE_LINKS_MATERIALIZED=False):
+                expected = self._targets(self.subsection.get_linked_pages())
+            self.assertEqual(expected, self._targets(self.subsection.get_linked_pages()))